@@ -4,11 +4,32 @@
 UI/UX Pro Max Core - BM25 search engine for UI/UX style guides
 """
 
+import base64
+import bisect
 import csv
+import hashlib
+import heapq
+import io
+import json
+import logging
+import math
+import mmap
+import os
+import random
 import re
+import sys
+import tempfile
+import threading
+import tracemalloc
+from array import array
+from itertools import accumulate, chain, groupby
+from time import perf_counter_ns, time
+from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from math import log
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 
 # ============ CONFIGURATION ============
 DATA_DIR = Path(__file__).parent.parent / "data"
@@ -94,9 +115,235 @@ _STACK_COLS = {
 }
 
 AVAILABLE_STACKS = list(STACK_CONFIG.keys())
+MAX_STACK_WORKERS = 8
+
+# External data packs: drop <name>.csv (optional <name>.json with search_cols/output_cols)
+PACKS_DIR = Path(os.environ.get("UIPRO_PACKS_DIR", DATA_DIR / "packs"))
+SEGMENT_MAX_COUNT = 8
+POSTING_TF_MAX = 255
+# Pack files above PACK_STREAM_BYTES are indexed with bounded memory via spill files
+PACK_STREAM_BYTES = 32 * 1024 * 1024
+STREAM_CHUNK_ROWS = 20000
+SEGMENT_MERGER_IDLE_S = 5.0
+
+# Corpus manifest: per-corpus Bloom filters consulted before an index is built
+MANIFEST_FILE = DATA_DIR / ".index-manifest.json"
+MANIFEST_VERSION = 2
+BLOOM_FP_RATE = 0.01
+# Domain routing: keyword hits pick the domain; corpus statistics (weighting first-search-column
+# evidence by ROUTE_TITLE_WEIGHT) only break ties and route queries no keyword matches
+ROUTE_TITLE_WEIGHT = 2.0
+DOMAIN_KEYWORDS = {
+    "color": ["color", "palette", "hex", "#", "rgb"],
+    "chart": ["chart", "graph", "visualization", "trend", "bar", "pie", "scatter", "heatmap", "funnel"],
+    "landing": ["landing", "page", "cta", "conversion", "hero", "testimonial", "pricing", "section"],
+    "product": ["saas", "ecommerce", "e-commerce", "fintech", "healthcare", "gaming", "portfolio", "crypto", "dashboard"],
+    "prompt": ["prompt", "css", "implementation", "variable", "checklist", "tailwind"],
+    "style": ["style", "design", "ui", "minimalism", "glassmorphism", "neumorphism", "brutalism", "dark mode", "flat", "aurora"],
+    "ux": ["ux", "usability", "accessibility", "wcag", "touch", "scroll", "animation", "keyboard", "navigation", "mobile"],
+    "typography": ["font", "typography", "heading", "serif", "sans"],
+    "icons": ["icon", "icons", "lucide", "heroicons", "symbol", "glyph", "pictogram", "svg icon"],
+    "react": ["react", "next.js", "nextjs", "suspense", "memo", "usecallback", "useeffect", "rerender", "bundle", "waterfall", "barrel", "dynamic import", "rsc", "server component"],
+    "web": ["aria", "focus", "outline", "semantic", "virtualize", "autocomplete", "form", "input type", "preconnect"]
+}
+
+# Query log: anonymized JSON lines, rotated at QUERY_LOG_MAX_BYTES (enable via env or enable_query_log)
+QUERY_LOG_ENV = "UIPRO_QUERY_LOG"
+QUERY_LOG_MAX_BYTES = 5 * 1024 * 1024
+QUERY_LOG_BACKUPS = 3
+
+# Snippets: fields longer than SNIPPET_MIN_CHARS get token offsets at index time,
+# shorter ones are tokenized on demand when highlighted
+SNIPPET_WINDOW = 300
+SNIPPET_MIN_CHARS = 80
+HIGHLIGHT_MARK = "**"
+
+# "More like this": the source row's top tf-idf terms form the similarity query
+SIMILAR_TERMS = 12
+
+# Near-duplicates: MinHash signatures of MINHASH_PERMS values banded LSH_BANDS ways
+# (r = perms/bands rows per band; candidate pairs start to appear around Jaccard (1/bands)^(1/r) ~ 0.5)
+MINHASH_PERMS = 64
+LSH_BANDS = 16
+DEDUP_THRESHOLD = 0.6
+DEDUP_OVERFETCH = 3
+
+
+# ============ INSTRUMENTATION ============
+class Timings:
+    """Per-stage call counts and wall time collected from span() blocks"""
+
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, elapsed_ns):
+        with self._lock:
+            stage = self.stages.setdefault(name, [0, 0])
+            stage[0] += 1
+            stage[1] += elapsed_ns
+
+    def report(self):
+        """Return {stage: {calls, total_ms, mean_ms}} in first-seen order"""
+        return {
+            name: {
+                "calls": calls,
+                "total_ms": round(total / 1e6, 3),
+                "mean_ms": round(total / calls / 1e6, 3)
+            }
+            for name, (calls, total) in self.stages.items()
+        }
+
+
+class _Span:
+    __slots__ = ("timings", "name", "start")
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.add(self.name, perf_counter_ns() - self.start)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+_TIMINGS = None
+
+
+def enable_timings():
+    """Start collecting span timings; returns the fresh Timings collector"""
+    global _TIMINGS
+    _TIMINGS = Timings()
+    return _TIMINGS
+
+
+def disable_timings():
+    """Stop collecting span timings"""
+    global _TIMINGS
+    _TIMINGS = None
+
+
+def span(name):
+    """Time a pipeline stage; a shared no-op object when timings are off"""
+    timings = _TIMINGS
+    if timings is None:
+        return _NULL_SPAN
+    return _Span(timings, name)
+
+
+@contextmanager
+def capture_profile(cprofile_path=None, tracemalloc_path=None):
+    """Optionally dump cProfile stats and tracemalloc top allocations to files"""
+    profiler = None
+    if cprofile_path:
+        import cProfile
+        profiler = cProfile.Profile()
+    if tracemalloc_path:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+        if tracemalloc_path:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(tracemalloc_path, 'w', encoding='utf-8') as f:
+                f.write(f"current={current} peak={peak}\n")
+                for stat in snapshot.statistics("lineno")[:50]:
+                    f.write(f"{stat}\n")
+
+
+# ============ QUERY LOG ============
+_QUERY_LOGGER = None
+_EMAIL_RE = re.compile(r'\S+@\S+')
+_URL_RE = re.compile(r'\b(?:https?|ftp)://\S+')
+_NUMBER_RE = re.compile(r'\d{4,}')
+
+
+def _anonymize_query(query):
+    """Lowercase, collapse whitespace, and mask emails, URLs and long numbers"""
+    query = _URL_RE.sub("<url>", str(query).lower())
+    query = _EMAIL_RE.sub("<email>", query)
+    query = _NUMBER_RE.sub("<num>", query)
+    return " ".join(query.split())
+
+
+def enable_query_log(path, max_bytes=QUERY_LOG_MAX_BYTES, backups=QUERY_LOG_BACKUPS):
+    """Append one JSON record per search/search_stack call to a rolling log at path"""
+    global _QUERY_LOGGER
+    disable_query_log()
+    logger = logging.getLogger("uipro.querylog")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    _QUERY_LOGGER = logger
+
+
+def disable_query_log():
+    """Stop query logging and close the log file"""
+    global _QUERY_LOGGER
+    logger = logging.getLogger("uipro.querylog")
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    _QUERY_LOGGER = None
+
+
+def _log_query(kind, query, domain, stack, k, elapsed_ns, ids, routed=None):
+    """Write one anonymized query record (never raises into the search path).
+
+    domain is what the caller asked for (None when auto-routed), so a replay routes
+    again; routed is the domain the search actually ran against.
+    """
+    logger = _QUERY_LOGGER
+    if logger is None:
+        return
+    record = {
+        "ts": int(time()),
+        "kind": kind,
+        "query": _anonymize_query(query),
+        "domain": domain,
+        "routed": routed,
+        "stack": stack,
+        "k": k,
+        "latency_ms": round(elapsed_ns / 1e6, 3),
+        "ids": ids
+    }
+    try:
+        logger.info(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+    except Exception:
+        pass
 
 
 # ============ BM25 IMPLEMENTATION ============
+def tokenize(text):
+    """Lowercase, split, remove punctuation, filter short words"""
+    text = re.sub(r'[^\w\s]', ' ', str(text).lower())
+    return [w for w in text.split() if len(w) > 2]
+
+
 class BM25:
     """BM25 ranking algorithm for text search"""
 
@@ -112,131 +359,1414 @@ class BM25:
 
     def tokenize(self, text):
         """Lowercase, split, remove punctuation, filter short words"""
-        text = re.sub(r'[^\w\s]', ' ', str(text).lower())
-        return [w for w in text.split() if len(w) > 2]
+        return tokenize(text)
 
     def fit(self, documents):
-        """Build BM25 index from documents"""
-        self.corpus = [self.tokenize(doc) for doc in documents]
-        self.N = len(self.corpus)
-        if self.N == 0:
-            return
-        self.doc_lengths = [len(doc) for doc in self.corpus]
-        self.avgdl = sum(self.doc_lengths) / self.N
-
-        for doc in self.corpus:
-            seen = set()
-            for word in doc:
-                if word not in seen:
-                    self.doc_freqs[word] += 1
-                    seen.add(word)
+        """Build BM25 index from documents.
 
-        for word, freq in self.doc_freqs.items():
-            self.idf[word] = log((self.N - freq + 0.5) / (freq + 0.5) + 1)
+        Statistics are built into fresh objects and assigned at the end, so refitting
+        never mutates structures a previous fit handed out (the search path uses
+        IndexSnapshot instead of sharing a BM25 across threads).
+        """
+        with span("tokenize"):
+            corpus = [self.tokenize(doc) for doc in documents]
+        if not corpus:
+            self.corpus, self.N = corpus, 0
+            return
+        with span("fit"):
+            doc_lengths = [len(doc) for doc in corpus]
+            doc_freqs = defaultdict(int)
+            for doc in corpus:
+                for word in set(doc):
+                    doc_freqs[word] += 1
+            n = len(corpus)
+            idf = {word: log((n - freq + 0.5) / (freq + 0.5) + 1) for word, freq in doc_freqs.items()}
+        self.corpus, self.doc_lengths, self.avgdl = corpus, doc_lengths, sum(doc_lengths) / n
+        self.doc_freqs, self.idf, self.N = doc_freqs, idf, n
 
     def score(self, query):
         """Score all documents against query"""
         query_tokens = self.tokenize(query)
         scores = []
 
-        for idx, doc in enumerate(self.corpus):
-            score = 0
-            doc_len = self.doc_lengths[idx]
-            term_freqs = defaultdict(int)
-            for word in doc:
-                term_freqs[word] += 1
+        with span("score"):
+            for idx, doc in enumerate(self.corpus):
+                score = 0
+                doc_len = self.doc_lengths[idx]
+                term_freqs = defaultdict(int)
+                for word in doc:
+                    term_freqs[word] += 1
+
+                for token in query_tokens:
+                    if token in self.idf:
+                        tf = term_freqs[token]
+                        idf = self.idf[token]
+                        numerator = tf * (self.k1 + 1)
+                        denominator = tf + self.k1 * (1 - self.b + self.b * doc_len / self.avgdl)
+                        score += idf * numerator / denominator
+
+                scores.append((idx, score))
+
+        with span("sort"):
+            return sorted(scores, key=lambda x: x[1], reverse=True)
+
+
+# ============ POSTINGS ============
+# A posting list is one bytes object: varint(count), count tf bytes (quantized to
+# POSTING_TF_MAX), then count varint doc-id deltas.
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_postings(pairs):
+    """Encode ascending (doc_id, tf) pairs as delta/varint bytes"""
+    out = bytearray()
+    _write_varint(out, len(pairs))
+    out.extend(min(tf, POSTING_TF_MAX) for _, tf in pairs)
+    prev = 0
+    for doc_id, _ in pairs:
+        _write_varint(out, doc_id - prev)
+        prev = doc_id
+    return bytes(out)
+
+
+def decode_postings(buf):
+    """Decode encode_postings() output into an iterator of (doc_id, tf) pairs"""
+    count = buf[0]
+    pos = 1
+    if count >= 0x80:
+        count, shift = count & 0x7F, 7
+        while True:
+            byte = buf[pos]
+            pos += 1
+            count |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+    tfs = buf[pos:pos + count]
+    deltas = buf[pos + count:]
+    # Fast path: every delta fit in one byte, so the doc ids are a running sum in C
+    if len(deltas) == count:
+        return zip(accumulate(deltas), tfs)
+
+    doc_ids = []
+    doc_id = 0
+    value = shift = 0
+    for byte in deltas:
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            doc_id += value
+            doc_ids.append(doc_id)
+            value = shift = 0
+        else:
+            shift += 7
+    return zip(doc_ids, tfs)
+
+
+def _nearest_rank(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values), max(1, int(round(pct / 100 * len(sorted_values))))) - 1]
+
+
+def _deep_sizeof(obj, seen):
+    """sys.getsizeof of obj and every container, str and bytes it references"""
+    size = 0
+    pending = [obj]
+    while pending:
+        item = pending.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            pending.extend(item)
+    return size
+
+
+# ============ SEGMENTED INDEX ============
+class Segment:
+    """Immutable slice of a segmented index: rows plus their compressed postings and stats"""
+
+    __slots__ = ("rows", "doc_lengths", "postings", "doc_freqs", "total_length", "vectors")
+
+    def __init__(self, rows, doc_lengths, postings, doc_freqs, vectors):
+        self.rows = rows
+        self.doc_lengths = doc_lengths
+        self.postings = postings
+        self.doc_freqs = doc_freqs
+        self.total_length = sum(doc_lengths)
+        # Per-doc term vector: (terms, tf bytes) with tf capped like the postings
+        self.vectors = vectors
+
+    @classmethod
+    def build(cls, rows, search_cols, tokenize):
+        """Tokenize rows into a new segment with term -> encoded (doc, tf) postings"""
+        with span("tokenize"):
+            corpus = [tokenize(" ".join(str(row.get(col, "")) for col in search_cols)) for row in rows]
+        with span("fit"):
+            doc_lengths = array('I', map(len, corpus))
+            postings = defaultdict(list)
+            vectors = []
+            for doc_id, tokens in enumerate(corpus):
+                term_freqs = defaultdict(int)
+                for token in tokens:
+                    term_freqs[token] += 1
+                for token, tf in term_freqs.items():
+                    postings[token].append((doc_id, tf))
+                vectors.append((tuple(term_freqs), bytes(min(tf, POSTING_TF_MAX) for tf in term_freqs.values())))
+            doc_freqs = {term: len(plist) for term, plist in postings.items()}
+            postings = {term: encode_postings(plist) for term, plist in postings.items()}
+        return cls(rows, doc_lengths, postings, doc_freqs, vectors)
+
+    @classmethod
+    def merge(cls, first, second):
+        """Concatenate two adjacent segments, shifting the second one's doc ids"""
+        shift = len(first.rows)
+        postings = dict(first.postings)
+        for term, buf in second.postings.items():
+            shifted = [(doc_id + shift, tf) for doc_id, tf in decode_postings(buf)]
+            if term in postings:
+                shifted = list(decode_postings(postings[term])) + shifted
+            postings[term] = encode_postings(shifted)
+        doc_freqs = dict(first.doc_freqs)
+        for term, freq in second.doc_freqs.items():
+            doc_freqs[term] = doc_freqs.get(term, 0) + freq
+        return cls(first.rows + second.rows, first.doc_lengths + second.doc_lengths, postings, doc_freqs,
+                   first.vectors + second.vectors)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def postings_size(self):
+        """(posting count, encoded bytes) for this segment"""
+        return sum(self.doc_freqs.values()), sum(len(buf) for buf in self.postings.values())
+
+
+class SegmentedIndex:
+    """Append-friendly BM25 index: new rows land in small immutable segments that a
+    background thread compacts, while queries fan out using global idf statistics."""
+
+    def __init__(self, search_cols, k1=1.5, b=0.75, max_segments=SEGMENT_MAX_COUNT):
+        self.search_cols = list(search_cols)
+        self.k1 = k1
+        self.b = b
+        self.max_segments = max_segments
+        self._tokenize = tokenize
+        # (segments, doc_freqs, N, total_length) swapped as one tuple so readers never lock
+        self._state = ((), {}, 0, 0)
+        self._write_lock = threading.Lock()
+        self._merge_wanted = threading.Event()
+        self._merger_lock = threading.Lock()
+        self._merger = None
+        # Time spent tokenizing and building segments for this index
+        self.build_ns = 0
+
+    @property
+    def segments(self):
+        return self._state[0]
+
+    @property
+    def doc_freqs(self):
+        return self._state[1]
+
+    @property
+    def N(self):
+        return self._state[2]
+
+    def add_rows(self, rows):
+        """Index rows as a new segment; existing segments are left untouched"""
+        rows = list(rows)
+        if not rows:
+            return
+        start = perf_counter_ns()
+        segment = Segment.build(rows, self.search_cols, self._tokenize)
+        self.build_ns += perf_counter_ns() - start
+        self.add_segment(segment)
 
+    def add_segment(self, segment):
+        """Publish a prebuilt segment (in-memory Segment or DiskSegment)"""
+        with self._write_lock:
+            segments, doc_freqs, n, total_length = self._state
+            doc_freqs = dict(doc_freqs)
+            for term, freq in segment.doc_freqs.items():
+                doc_freqs[term] = doc_freqs.get(term, 0) + freq
+            self._state = (segments + (segment,), doc_freqs, n + len(segment), total_length + segment.total_length)
+            needs_merge = len(self._state[0]) > self.max_segments
+        if needs_merge:
+            self._schedule_merge()
+
+    def _schedule_merge(self):
+        with self._merger_lock:
+            self._merge_wanted.set()
+            if self._merger is None:
+                self._merger = threading.Thread(target=self._merge_loop, name="segment-merger", daemon=True)
+                self._merger.start()
+
+    def _merge_loop(self):
+        """Background compaction; the thread exits after SEGMENT_MERGER_IDLE_S without work"""
+        while True:
+            if not self._merge_wanted.wait(timeout=SEGMENT_MERGER_IDLE_S):
+                with self._merger_lock:
+                    if not self._merge_wanted.is_set():
+                        self._merger = None
+                        return
+            self._merge_wanted.clear()
+            while self.merge_once():
+                pass
+
+    def merge_once(self):
+        """Merge the adjacent in-memory pair with the fewest rows; False when no merge is needed"""
+        segments = self._state[0]
+        if len(segments) <= self.max_segments:
+            return False
+        pairs = [i for i in range(len(segments) - 1)
+                 if isinstance(segments[i], Segment) and isinstance(segments[i + 1], Segment)]
+        if not pairs:
+            return False
+        pos = min(pairs, key=lambda i: len(segments[i]) + len(segments[i + 1]))
+        first, second = segments[pos], segments[pos + 1]
+        merged = Segment.merge(first, second)
+        with self._write_lock:
+            current, doc_freqs, n, total_length = self._state
+            # Writers only append, so the pair is still at pos unless another merge ran
+            if current[pos] is not first or current[pos + 1] is not second:
+                return True
+            self._state = (current[:pos] + (merged,) + current[pos + 2:], doc_freqs, n, total_length)
+        return True
+
+    def compact(self):
+        """Synchronously merge everything into a single segment"""
+        max_segments, self.max_segments = self.max_segments, 1
+        try:
+            while self.merge_once():
+                pass
+        finally:
+            self.max_segments = max_segments
+
+    def score(self, query, max_results=MAX_RESULTS):
+        """Top (row_id, score, row) with score > 0 across all segments"""
+        return self.score_terms({}, max_results, self._tokenize(query))
+
+    def score_terms(self, weights, max_results=MAX_RESULTS, query_tokens=None):
+        """Top hits for a weighted bag of terms ({term: weight}); a weight scales that term's idf"""
+        segments, doc_freqs, n, total_length = self._state
+        if n == 0:
+            return []
+        avgdl = total_length / n
+        if query_tokens is None:
+            query_tokens = list(weights)
+        idf = {t: weights.get(t, 1) * log((n - doc_freqs[t] + 0.5) / (doc_freqs[t] + 0.5) + 1)
+               for t in query_tokens if t in doc_freqs}
+
+        with span("score"):
+            hits = self._score_segments(segments, query_tokens, idf, avgdl)
+
+        with span("sort"):
+            top = heapq.nsmallest(max_results, hits, key=lambda h: (-h[0], h[1]))
+        return [(row_id, score, segment.rows[doc_id]) for score, row_id, segment, doc_id in top]
+
+    def _score_segments(self, segments, query_tokens, idf, avgdl):
+        """(score, row_id, segment, local_doc) for every doc with a positive score"""
+        hits = []
+        base = 0
+        k1, b = self.k1, self.b
+        for segment in segments:
+            scores = defaultdict(float)
+            doc_lengths = segment.doc_lengths
+            # Sum per query token in order so results match BM25.score exactly
             for token in query_tokens:
-                if token in self.idf:
-                    tf = term_freqs[token]
-                    idf = self.idf[token]
-                    numerator = tf * (self.k1 + 1)
-                    denominator = tf + self.k1 * (1 - self.b + self.b * doc_len / self.avgdl)
-                    score += idf * numerator / denominator
+                if token not in idf:
+                    continue
+                token_idf = idf[token]
+                buf = segment.postings.get(token)
+                if buf is None:
+                    continue
+                for doc_id, tf in decode_postings(buf):
+                    denominator = tf + k1 * (1 - b + b * doc_lengths[doc_id] / avgdl)
+                    scores[doc_id] += token_idf * (tf * (k1 + 1)) / denominator
+            hits.extend((score, base + doc_id, segment, doc_id) for doc_id, score in scores.items() if score > 0)
+            base += len(segment)
+        return hits
+
+    def idf(self, term):
+        """BM25 idf of a term under the current global statistics (0 when unseen)"""
+        _, doc_freqs, n, _ = self._state
+        df = doc_freqs.get(term)
+        return log((n - df + 0.5) / (df + 0.5) + 1) if df else 0.0
+
+    def term_vector(self, row_id):
+        """(term, tf) pairs for a row: stored for in-memory segments, re-tokenized for disk ones"""
+        if row_id < 0:
+            raise IndexError(row_id)
+        for segment in self._state[0]:
+            if row_id < len(segment):
+                break
+            row_id -= len(segment)
+        else:
+            raise IndexError(row_id)
+        if isinstance(segment, Segment):
+            terms, tfs = segment.vectors[row_id]
+            return list(zip(terms, tfs))
+        row = segment.rows[row_id]
+        term_freqs = defaultdict(int)
+        for token in self._tokenize(" ".join(str(row.get(col, "")) for col in self.search_cols)):
+            term_freqs[token] += 1
+        return list(term_freqs.items())
+
+    def stats(self):
+        """Size report: rows, segments, vocabulary, postings and bytes per posting"""
+        segments, doc_freqs, n, total_length = self._state
+        postings = 0
+        postings_bytes = 0
+        for segment in segments:
+            count, size = segment.postings_size()
+            postings += count
+            postings_bytes += size
+        return {
+            "rows": n,
+            "segments": len(segments),
+            "vocabulary": len(doc_freqs),
+            "postings": postings,
+            "postings_bytes": postings_bytes,
+            "bytes_per_posting": round(postings_bytes / postings, 3) if postings else 0.0
+        }
+
+    def describe(self, top_terms=10):
+        """stats() plus average doc length, postings-length distribution, extreme terms and build time"""
+        report = self.stats()
+        _, doc_freqs, n, total_length = self._state
+        lengths = sorted(doc_freqs.values())
+        histogram = {}
+        for length in lengths:
+            low = 1 << (length.bit_length() - 1)
+            label = str(low) if low == 1 else f"{low}-{2 * low - 1}"
+            histogram[label] = histogram.get(label, 0) + 1
+        report["avg_doc_length"] = round(total_length / n, 2) if n else 0.0
+        report["postings_length"] = {
+            "min": lengths[0] if lengths else 0,
+            "p50": _nearest_rank(lengths, 50),
+            "p90": _nearest_rank(lengths, 90),
+            "p99": _nearest_rank(lengths, 99),
+            "max": lengths[-1] if lengths else 0,
+            "histogram": histogram
+        }
+        report["singleton_terms"] = histogram.get("1", 0)
+        # Rarest first, longest first among ties: long one-off tokens are usually tokenization bloat
+        rare = heapq.nsmallest(top_terms, doc_freqs.items(), key=lambda item: (item[1], -len(item[0]), item[0]))
+        common = heapq.nsmallest(top_terms, doc_freqs.items(), key=lambda item: (-item[1], item[0]))
+        report["top_idf_terms"] = [{"term": t, "df": df, "idf": round(self.idf(t), 3)} for t, df in rare]
+        report["top_df_terms"] = [{"term": t, "df": df, "idf": round(self.idf(t), 3)} for t, df in common]
+        report["build_ms"] = round(self.build_ns / 1e6, 3)
+        return report
+
+    def memory_usage(self, seen=None):
+        """Estimated bytes per index structure (sys.getsizeof, shared objects counted once)"""
+        seen = set() if seen is None else seen
+        segments, doc_freqs, _, _ = self._state
+        memory = {
+            "postings": sum(_deep_sizeof(segment.postings, seen) for segment in segments
+                            if isinstance(segment, Segment)),
+            "doc_freqs": _deep_sizeof(doc_freqs, seen) + sum(_deep_sizeof(segment.doc_freqs, seen)
+                                                              for segment in segments),
+            "doc_lengths": sum(_deep_sizeof(segment.doc_lengths, seen) for segment in segments),
+            "term_vectors": sum(_deep_sizeof(segment.vectors, seen) for segment in segments
+                                if isinstance(segment, Segment))
+        }
+        memory["total"] = sum(memory.values())
+        return memory
+
+
+# ============ STREAMING INGESTION ============
+def _iter_csv_records(f):
+    """Yield (byte offset, values) per CSV record from a binary file, tracking where
+    each (possibly multi-line) record starts so rows can be re-read later by seek."""
+    starts = {}
+
+    def lines():
+        line_no = 0
+        pos = f.tell()
+        for raw in iter(f.readline, b""):
+            starts[line_no] = pos
+            pos += len(raw)
+            line_no += 1
+            yield raw.decode('utf-8-sig' if starts[line_no - 1] == 0 else 'utf-8')
+
+    reader = csv.reader(lines())
+    consumed = 0
+    for values in reader:
+        offset = starts.pop(consumed)
+        for line_no in range(consumed + 1, reader.line_num):
+            starts.pop(line_no, None)
+        consumed = reader.line_num
+        if values:
+            yield offset, values
+
+
+def _read_csv_record(filepath, offset, fieldnames):
+    """Re-read the single CSV record that starts at a byte offset"""
+    with open(filepath, 'rb') as f:
+        f.seek(offset)
+        for _, values in _iter_csv_records(f):
+            # Same short/long row handling as csv.DictReader
+            row = dict(zip(fieldnames, values))
+            for name in fieldnames[len(values):]:
+                row[name] = None
+            if len(values) > len(fieldnames):
+                row[None] = values[len(fieldnames):]
+            return row
+    return {}
+
+
+class _CsvRows:
+    """Read-only row sequence backed by record offsets into a CSV file"""
+
+    __slots__ = ("filepath", "fieldnames", "offsets")
+
+    def __init__(self, filepath, fieldnames, offsets):
+        self.filepath = filepath
+        self.fieldnames = fieldnames
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, idx):
+        return _read_csv_record(self.filepath, self.offsets[idx], self.fieldnames)
+
+
+class _DiskPostings:
+    """term -> encoded postings, read from an mmap of the merged postings file"""
+
+    __slots__ = ("lexicon", "buffer")
+
+    def __init__(self, lexicon, buffer):
+        self.lexicon = lexicon
+        self.buffer = buffer
+
+    def get(self, term, default=None):
+        entry = self.lexicon.get(term)
+        if entry is None:
+            return default
+        start, size = entry
+        return self.buffer[start:start + size]
+
+
+class DiskSegment:
+    """Immutable segment whose postings live in a file and rows stay in the source CSV.
+
+    Built by build_streaming_index(); plugs into SegmentedIndex like Segment but is
+    never merged, so resident memory is the lexicon plus per-row offsets and lengths."""
+
+    __slots__ = ("rows", "doc_lengths", "postings", "doc_freqs", "total_length", "end_offset", "_file", "_bytes")
+
+    def __init__(self, rows, doc_lengths, lexicon, doc_freqs, postings_file, end_offset):
+        self.rows = rows
+        self.end_offset = end_offset
+        self.doc_lengths = doc_lengths
+        self.doc_freqs = doc_freqs
+        self.total_length = sum(doc_lengths)
+        self._file = postings_file
+        postings_file.seek(0, os.SEEK_END)
+        self._bytes = postings_file.tell()
+        buffer = mmap.mmap(postings_file.fileno(), 0, access=mmap.ACCESS_READ) if self._bytes else b""
+        self.postings = _DiskPostings(lexicon, buffer)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def postings_size(self):
+        return sum(self.doc_freqs.values()), self._bytes
+
+    def close(self):
+        """Release the postings mmap and its temp file; the segment is unusable afterwards"""
+        if isinstance(self.postings.buffer, mmap.mmap):
+            self.postings.buffer.close()
+        self._file.close()
+
+
+def _write_spill(spill_dir, chunk_no, chunk_postings):
+    """Write one chunk's postings sorted by term: 'term<TAB>doc:tf,doc:tf' per line"""
+    path = Path(spill_dir) / f"spill-{chunk_no:06d}.tsv"
+    with open(path, 'w', encoding='utf-8') as f:
+        for term in sorted(chunk_postings):
+            f.write(term + "\t" + ",".join(f"{doc}:{tf}" for doc, tf in chunk_postings[term]) + "\n")
+    return path
+
+
+def _read_spill(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            term, _, plist = line.rstrip("\n").partition("\t")
+            yield term, plist
+
+
+def build_streaming_index(filepath, search_cols=None, chunk_rows=STREAM_CHUNK_ROWS, spill_dir=None):
+    """Index an arbitrarily large CSV with bounded memory.
+
+    Rows are read in chunks of chunk_rows, tokenized into partial postings that are
+    spilled to sorted temp files, then k-way merged into one compressed postings file.
+    search_cols follows the CSV_CONFIG declarations (default: every column); output
+    columns are applied by the caller when projecting hits. Returns a SegmentedIndex.
+    """
+    start = perf_counter_ns()
+    filepath = Path(filepath)
+    doc_lengths = array('I')
+    row_offsets = array('Q')
+    spills = []
+
+    with tempfile.TemporaryDirectory(dir=spill_dir, prefix="uipro-spill-") as tmp:
+        with span("stream_spill"), open(filepath, 'rb') as f:
+            records = _iter_csv_records(f)
+            header = next(records, None)
+            fieldnames = header[1] if header else []
+            cols = [fieldnames.index(c) for c in (search_cols or fieldnames) if c in fieldnames]
+            chunk = defaultdict(list)
+            chunk_docs = 0
+            for offset, values in records:
+                doc_id = len(row_offsets)
+                row_offsets.append(offset)
+                tokens = tokenize(" ".join(values[i] for i in cols if i < len(values)))
+                doc_lengths.append(len(tokens))
+                term_freqs = defaultdict(int)
+                for token in tokens:
+                    term_freqs[token] += 1
+                for token, tf in term_freqs.items():
+                    chunk[token].append((doc_id, tf))
+                chunk_docs += 1
+                if chunk_docs >= chunk_rows:
+                    spills.append(_write_spill(tmp, len(spills), chunk))
+                    chunk = defaultdict(list)
+                    chunk_docs = 0
+            if chunk:
+                spills.append(_write_spill(tmp, len(spills), chunk))
+            end_offset = f.tell()
+
+        # heapq.merge is stable, so equal terms arrive in chunk order with ascending doc ids
+        lexicon = {}
+        doc_freqs = {}
+        postings_file = tempfile.TemporaryFile(dir=spill_dir, prefix="uipro-postings-")
+        with span("stream_merge"):
+            merged = heapq.merge(*(_read_spill(p) for p in spills), key=lambda item: item[0])
+            pos = 0
+            for term, group in groupby(merged, key=lambda item: item[0]):
+                pairs = []
+                for _, plist in group:
+                    for pair in plist.split(","):
+                        doc, _, tf = pair.partition(":")
+                        pairs.append((int(doc), int(tf)))
+                buf = encode_postings(pairs)
+                postings_file.write(buf)
+                lexicon[term] = (pos, len(buf))
+                doc_freqs[term] = len(pairs)
+                pos += len(buf)
+            postings_file.flush()
+
+    segment = DiskSegment(_CsvRows(filepath, fieldnames, row_offsets), doc_lengths, lexicon, doc_freqs,
+                          postings_file, end_offset)
+    index = SegmentedIndex(search_cols or fieldnames)
+    index.add_segment(segment)
+    index.build_ns = perf_counter_ns() - start
+    return index
+
+
+# ============ CORPUS MANIFEST ============
+class BloomFilter:
+    """Compact set-membership sketch over a corpus vocabulary (no false negatives)"""
+
+    __slots__ = ("bits", "size", "hashes")
+
+    def __init__(self, size, hashes, bits=None):
+        self.size = size
+        self.hashes = hashes
+        self.bits = bits if bits is not None else bytearray((size + 7) // 8)
+
+    @classmethod
+    def for_terms(cls, terms, fp_rate=BLOOM_FP_RATE):
+        """Size a filter for the given terms at the target false-positive rate"""
+        terms = set(terms)
+        n = max(1, len(terms))
+        size = max(64, int(math.ceil(-n * log(fp_rate) / (log(2) ** 2))))
+        bloom = cls(size, max(1, int(round(size / n * log(2)))))
+        for term in terms:
+            bloom.add(term)
+        return bloom
+
+    def _positions(self, term):
+        digest = hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest()
+        h1 = int.from_bytes(digest[:4], 'little')
+        h2 = int.from_bytes(digest[4:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, term):
+        for pos in self._positions(term):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, term):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(term))
+
+    def to_dict(self):
+        return {"size": self.size, "hashes": self.hashes, "bits": base64.b64encode(bytes(self.bits)).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["size"], data["hashes"], bytearray(base64.b64decode(data["bits"])))
+
+
+# {corpus key: entry}; entries are rebuilt when the CSV size or mtime changes
+_MANIFEST = None
+_MANIFEST_LOCK = threading.Lock()
+_MANIFEST_SAVE_FAILED = False
+# Nesting depth of manifest_batch() blocks, and whether entries changed since the last save
+_MANIFEST_BATCH = 0
+_MANIFEST_DIRTY = False
+_BLOOMS = {}
+
+
+def _corpus_key(filepath, search_cols):
+    try:
+        name = Path(filepath).relative_to(DATA_DIR).as_posix()
+    except ValueError:
+        name = str(filepath)
+    return name + "|" + "|".join(search_cols)
+
+
+def _load_manifest():
+    global _MANIFEST
+    if _MANIFEST is None:
+        try:
+            with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            _MANIFEST = data.get("corpora", {}) if data.get("version") == MANIFEST_VERSION else {}
+        except (OSError, ValueError):
+            _MANIFEST = {}
+    return _MANIFEST
+
+
+def _save_manifest(manifest):
+    """Write the manifest atomically; a read-only DATA_DIR just keeps it in memory"""
+    global _MANIFEST_SAVE_FAILED, _MANIFEST_DIRTY
+    _MANIFEST_DIRTY = False
+    try:
+        fd, tmp = tempfile.mkstemp(dir=MANIFEST_FILE.parent, prefix=".manifest-")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({"version": MANIFEST_VERSION, "corpora": manifest}, f, separators=(",", ":"))
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, MANIFEST_FILE)
+    except OSError:
+        _MANIFEST_SAVE_FAILED = True
+
+
+def _manifest_persists():
+    """True when rebuilt manifest entries are saved for later processes (DATA_DIR is writable)"""
+    return not _MANIFEST_SAVE_FAILED and os.access(MANIFEST_FILE.parent, os.W_OK)
+
+
+def _fresh_entry(manifest, key, stat):
+    entry = manifest.get(key)
+    if entry is not None and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+        return entry
+    return None
+
+
+def _manifest_entry(stat, rows, search_cols, doc_freqs):
+    title_freqs = defaultdict(int)
+    for row in rows:
+        for term in set(tokenize(str(row.get(search_cols[0], "")))):
+            title_freqs[term] += 1
+    return {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "rows": len(rows),
+        "terms": len(doc_freqs),
+        "bloom": BloomFilter.for_terms(doc_freqs).to_dict(),
+        "df": dict(doc_freqs),
+        "title_df": dict(title_freqs)
+    }
+
+
+def _store_entry(manifest, key, entry):
+    """Caller holds _MANIFEST_LOCK; inside manifest_batch() the write waits for the batch to end"""
+    global _MANIFEST_DIRTY
+    manifest[key] = entry
+    _BLOOMS.pop(key, None)
+    _MANIFEST_DIRTY = True
+    if not _MANIFEST_BATCH:
+        _save_manifest(manifest)
+
+
+@contextmanager
+def manifest_batch():
+    """Defer manifest writes for a multi-corpus operation and save once at the outermost exit"""
+    global _MANIFEST_BATCH
+    with _MANIFEST_LOCK:
+        _MANIFEST_BATCH += 1
+    try:
+        yield
+    finally:
+        with _MANIFEST_LOCK:
+            _MANIFEST_BATCH -= 1
+            if not _MANIFEST_BATCH and _MANIFEST_DIRTY:
+                _save_manifest(_load_manifest())
+
+
+def _corpus_entry(filepath, search_cols):
+    """Manifest entry for a corpus, (re)built from its search columns when stale"""
+    key = _corpus_key(filepath, search_cols)
+    stat = filepath.stat()
+    manifest = _load_manifest()
+    entry = _fresh_entry(manifest, key, stat)
+    if entry is not None:
+        return key, entry
 
-            scores.append((idx, score))
+    with _MANIFEST_LOCK:
+        entry = _fresh_entry(manifest, key, stat)
+        if entry is not None:
+            return key, entry
+        with span("manifest_build"):
+            # Reuse a current index snapshot rather than parsing the CSV again
+            snapshot = _INDEX_CACHE.get((str(filepath), tuple(search_cols)))
+            if snapshot is not None and snapshot.mtime == stat.st_mtime_ns:
+                rows, doc_freqs = snapshot.rows, snapshot.index.doc_freqs
+            else:
+                rows = _load_csv(filepath)
+                doc_freqs = defaultdict(int)
+                for row in rows:
+                    for term in set(tokenize(" ".join(str(row.get(col, "")) for col in search_cols))):
+                        doc_freqs[term] += 1
+            entry = _manifest_entry(stat, rows, search_cols, doc_freqs)
+        _store_entry(manifest, key, entry)
+    return key, entry
 
-        return sorted(scores, key=lambda x: x[1], reverse=True)
+
+def _record_entry(filepath, search_cols, mtime, rows, doc_freqs):
+    """Refresh a stale manifest entry from the rows an index build already loaded"""
+    key = _corpus_key(filepath, search_cols)
+    stat = filepath.stat()
+    manifest = _load_manifest()
+    # A file rewritten during the build may not match the rows that were read
+    if stat.st_mtime_ns != mtime or _fresh_entry(manifest, key, stat) is not None:
+        return
+    with span("manifest_build"):
+        entry = _manifest_entry(stat, rows, search_cols, doc_freqs)
+    with _MANIFEST_LOCK:
+        _store_entry(manifest, key, entry)
+
+
+def _bloom_may_match(key, entry, query_tokens):
+    bloom = _BLOOMS.get(key)
+    if bloom is None or bloom.size != entry["bloom"]["size"]:
+        bloom = _BLOOMS[key] = BloomFilter.from_dict(entry["bloom"])
+    return any(token in bloom for token in query_tokens)
+
+
+def corpus_may_match(filepath, search_cols, query_tokens):
+    """False only when no query token can occur in the corpus search columns"""
+    if not query_tokens:
+        return False
+    key, entry = _corpus_entry(filepath, search_cols)
+    return _bloom_may_match(key, entry, query_tokens)
+
+
+def _index_is_cached(filepath, search_cols):
+    snapshot = _INDEX_CACHE.get((str(filepath), tuple(search_cols)))
+    return snapshot is not None and snapshot.mtime == filepath.stat().st_mtime_ns
+
+
+# ============ NEAR-DUPLICATES ============
+_MINHASH_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_MINHASH_PARAMS = [(_rng.randrange(1, _MINHASH_PRIME), _rng.randrange(0, _MINHASH_PRIME))
+                   for _ in range(MINHASH_PERMS)]
+del _rng
+
+
+def minhash_signature(terms):
+    """MinHash signature of a term set; None when there are no terms"""
+    terms = set(terms)
+    if not terms:
+        return None
+    hashes = [int.from_bytes(hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest(), 'little')
+              for term in terms]
+    prime = _MINHASH_PRIME
+    return tuple(min((a * h + b) % prime for h in hashes) for a, b in _MINHASH_PARAMS)
+
+
+def estimate_jaccard(first, second):
+    """Fraction of agreeing MinHash slots, an unbiased estimate of term-set Jaccard"""
+    if first is None or second is None:
+        return 0.0
+    return sum(x == y for x, y in zip(first, second)) / len(first)
+
+
+class LshIndex:
+    """Banded MinHash buckets: keys whose signatures agree on a whole band become candidates"""
+
+    def __init__(self, bands=LSH_BANDS):
+        self.bands = bands
+        self.buckets = defaultdict(list)
+
+    def _band_keys(self, signature):
+        width = len(signature) // self.bands
+        return ((band, signature[band * width:(band + 1) * width]) for band in range(self.bands))
+
+    def add(self, key, signature):
+        if signature is not None:
+            for band_key in self._band_keys(signature):
+                self.buckets[band_key].append(key)
+
+    def candidate_pairs(self):
+        """Distinct (key, key) pairs sharing at least one bucket"""
+        pairs = set()
+        for keys in self.buckets.values():
+            for i in range(len(keys)):
+                for j in range(i + 1, len(keys)):
+                    pairs.add((keys[i], keys[j]))
+        return pairs
+
+
+# Signatures per (file, search columns), from the index term vectors; rebuilt with the index
+_SIGNATURES = {}
+
+
+def corpus_signatures(filepath, search_cols):
+    """MinHash signature per row of a corpus, computed once per indexed file version"""
+    key = (str(filepath), tuple(search_cols))
+    data, index, _ = _get_index(filepath, search_cols)
+    entry = _SIGNATURES.get(key)
+    if entry is not None and entry[0] is index:
+        return entry[1]
+    with span("minhash"):
+        signatures = [minhash_signature(term for term, _ in index.term_vector(i)) for i in range(len(data))]
+    _SIGNATURES[key] = (index, signatures)
+    return signatures
+
+
+def _all_corpora():
+    """(label, filepath, search_cols) for every domain and stack CSV on disk, deduplicated by file"""
+    corpora = []
+    seen = set()
+    for label, config, search_cols in ([(d, c, c["search_cols"]) for d, c in CSV_CONFIG.items()] +
+                                       [(f"stack:{s}", c, _STACK_COLS["search_cols"]) for s, c in STACK_CONFIG.items()]):
+        filepath = DATA_DIR / config["file"]
+        if filepath.exists() and (filepath, tuple(search_cols)) not in seen:
+            seen.add((filepath, tuple(search_cols)))
+            corpora.append((label, filepath, search_cols))
+    return corpora
+
+
+@manifest_batch()
+def find_near_duplicates(threshold=DEDUP_THRESHOLD, corpora=None):
+    """Near-duplicate row pairs across corpora via MinHash LSH; candidates are verified
+    with the exact term-set Jaccard. Returns [(jaccard, (label, row_id), (label, row_id))]."""
+    corpora = corpora if corpora is not None else _all_corpora()
+    lsh = LshIndex()
+    term_sets = {}
+    for label, filepath, search_cols in corpora:
+        _, index, _ = _get_index(filepath, search_cols)
+        for row_id, signature in enumerate(corpus_signatures(filepath, search_cols)):
+            lsh.add((label, row_id), signature)
+        term_sets[label] = index
+
+    pairs = []
+    with span("lsh_verify"):
+        for first, second in lsh.candidate_pairs():
+            a = {term for term, _ in term_sets[first[0]].term_vector(first[1])}
+            b = {term for term, _ in term_sets[second[0]].term_vector(second[1])}
+            jaccard = len(a & b) / len(a | b)
+            if jaccard >= threshold:
+                pairs.append((jaccard, min(first, second), max(first, second)))
+    pairs.sort(key=lambda p: (-p[0], p[1], p[2]))
+    return pairs
+
+
+def _collapse_near_duplicates(hits, signature_of, max_results, threshold=DEDUP_THRESHOLD):
+    """Keep hits in rank order, dropping any whose signature is within threshold of a kept hit"""
+    kept = []
+    kept_signatures = []
+    for hit in hits:
+        signature = signature_of(hit)
+        if any(estimate_jaccard(signature, other) >= threshold for other in kept_signatures):
+            continue
+        kept.append(hit)
+        kept_signatures.append(signature)
+        if len(kept) >= max_results:
+            break
+    return kept
 
 
 # ============ SEARCH FUNCTIONS ============
 def _load_csv(filepath):
     """Load CSV and return list of dicts"""
-    with open(filepath, 'r', encoding='utf-8') as f:
+    with span("file_open"):
+        f = open(filepath, 'r', encoding='utf-8')
+    with f, span("csv_parse"):
         return list(csv.DictReader(f))
 
 
-def _search_csv(filepath, search_cols, output_cols, query, max_results):
+_WORD_RE = re.compile(r'\w+')
+
+
+def _field_offsets(text):
+    """(start, end, token) triples for a field, using the BM25.tokenize rules"""
+    offsets = []
+    for m in _WORD_RE.finditer(text):
+        token = m.group().lower()
+        if len(token) > 2:
+            offsets.append((m.start(), m.end(), token))
+    return tuple(offsets)
+
+
+def _row_offsets(row):
+    """Token offsets for every long field of a row, keyed by column"""
+    return {col: _field_offsets(value) for col, value in row.items()
+            if isinstance(value, str) and len(value) > SNIPPET_MIN_CHARS}
+
+
+def make_snippet(text, offsets, query_terms, window=SNIPPET_WINDOW, highlight=False):
+    """Return the window of text with the densest run of query-term matches"""
+    text = str(text)
+    if len(text) <= window and not highlight:
+        return text
+    if offsets is None:
+        offsets = _field_offsets(text)
+    matches = [(start, end) for start, end, token in offsets if token in query_terms]
+    if not matches:
+        return text if len(text) <= window else text[:window] + "..."
+
+    # Slide over matches: window anchored at match i covering as many later matches as fit
+    best_i, best_j, best_count = 0, 0, 0
+    j = 0
+    for i, (start, _) in enumerate(matches):
+        j = max(j, i)
+        while j + 1 < len(matches) and matches[j + 1][1] - start <= window:
+            j += 1
+        if j - i + 1 > best_count:
+            best_i, best_j, best_count = i, j, j - i + 1
+
+    # Center the matched span inside the window, then snap to word boundaries
+    span_start, span_end = matches[best_i][0], matches[best_j][1]
+    begin = max(0, span_start - max(0, window - (span_end - span_start)) // 2)
+    end = min(len(text), begin + window)
+    begin = max(0, end - window)
+    if begin > 0:
+        space = text.find(" ", begin, span_start)
+        begin = space + 1 if space != -1 else begin
+    if end < len(text):
+        space = text.rfind(" ", span_end, end)
+        end = space if space != -1 else end
+
+    if highlight:
+        parts = []
+        pos = begin
+        for start, end_ in matches:
+            if start >= begin and end_ <= end:
+                parts.append(text[pos:start])
+                parts.append(f"{HIGHLIGHT_MARK}{text[start:end_]}{HIGHLIGHT_MARK}")
+                pos = end_
+        parts.append(text[pos:end])
+        snippet = "".join(parts)
+    else:
+        snippet = text[begin:end]
+    return ("..." if begin > 0 else "") + snippet + ("..." if end < len(text) else "")
+
+
+# Immutable per-file index version; rows and offsets are tuples and the index is never appended to
+IndexSnapshot = namedtuple("IndexSnapshot", ["mtime", "rows", "index", "offsets"])
+
+# Current snapshot per (file, search columns), replaced by a single assignment
+_INDEX_CACHE = {}
+_INDEX_LOCKS = {}
+_INDEX_LOCKS_GUARD = threading.Lock()
+
+
+def _build_snapshot(filepath, search_cols, mtime):
+    """Load and index a CSV off to the side of any snapshot readers are using"""
+    data = tuple(_load_csv(filepath))
+    index = SegmentedIndex(search_cols)
+    index.add_rows(data)
+    _record_entry(filepath, search_cols, mtime, data, index.doc_freqs)
+    with span("offsets"):
+        offsets = tuple(_row_offsets(row) for row in data)
+    return IndexSnapshot(mtime, data, index, offsets)
+
+
+def _index_lock(key):
+    with _INDEX_LOCKS_GUARD:
+        return _INDEX_LOCKS.setdefault(key, threading.Lock())
+
+
+def _get_index(filepath, search_cols):
+    """Return (rows, index, offsets) from the current snapshot of a CSV, rebuilt per file version.
+
+    Readers never wait on a rebuild: when the file changed, one caller builds the new
+    snapshot while concurrent callers keep using the previous one. Only a cold start,
+    with no snapshot to serve, waits for the build.
+    """
+    key = (str(filepath), tuple(search_cols))
+    mtime = filepath.stat().st_mtime_ns
+    snapshot = _INDEX_CACHE.get(key)
+    if snapshot is not None and snapshot.mtime == mtime:
+        return snapshot[1:]
+
+    lock = _index_lock(key)
+    if not lock.acquire(blocking=snapshot is None):
+        return snapshot[1:]
+    try:
+        current = _INDEX_CACHE.get(key)
+        if current is not None and current.mtime == mtime:
+            return current[1:]
+        snapshot = _build_snapshot(filepath, search_cols, mtime)
+        _INDEX_CACHE[key] = snapshot
+        return snapshot[1:]
+    finally:
+        lock.release()
+
+
+@manifest_batch()
+def reload_indexes():
+    """Rebuild every cached index from disk and hot-swap it in; returns the number reloaded.
+
+    For data deploys that keep file mtimes (e.g. rsync -t) or to rebuild on demand;
+    in-flight queries finish on the snapshot they started with.
+    """
+    reloaded = 0
+    for key in list(_INDEX_CACHE):
+        filepath, search_cols = Path(key[0]), key[1]
+        if not filepath.exists():
+            continue
+        with _index_lock(key):
+            _INDEX_CACHE[key] = _build_snapshot(filepath, list(search_cols), filepath.stat().st_mtime_ns)
+        reloaded += 1
+    return reloaded
+
+
+def _iter_ranked(filepath, search_cols, output_cols, query, max_results, snippet_window=None, highlight=False):
+    """Yield top (row_id, score, row) with score > 0, in rank order, using the cached index"""
+    # Skip corpora whose vocabulary cannot contain any query term without loading them;
+    # a stale manifest entry is refreshed by the index build from the rows it loads anyway
+    if not _index_is_cached(filepath, search_cols):
+        with span("bloom_check"):
+            query_tokens = tokenize(query)
+            if not query_tokens:
+                return
+            key = _corpus_key(filepath, search_cols)
+            entry = _fresh_entry(_load_manifest(), key, filepath.stat())
+            if entry is not None and not _bloom_may_match(key, entry, query_tokens):
+                return
+    with span("index_lookup"):
+        data, index, offsets = _get_index(filepath, search_cols)
+    hits = index.score(query, max_results)
+    query_terms = set(tokenize(query)) if snippet_window else None
+
+    for idx, score, row in hits:
+        with span("select"):
+            result = {col: row.get(col, "") for col in output_cols if col in row}
+            if snippet_window:
+                row_offsets = offsets[idx]
+                for col, value in result.items():
+                    result[col] = make_snippet(value, row_offsets.get(col), query_terms, snippet_window, highlight)
+        yield idx, score, result
+
+
+def _rank_csv(filepath, search_cols, output_cols, query, max_results, snippet_window=None, highlight=False,
+              dedup=False):
+    """Return top (row_id, score, row) triples with score > 0 using the cached index.
+
+    With dedup, extra hits are ranked and near-identical ones collapsed into the
+    best-scoring copy before cutting to max_results.
+    """
+    if not dedup:
+        return list(_iter_ranked(filepath, search_cols, output_cols, query, max_results, snippet_window, highlight))
+    hits = list(_iter_ranked(filepath, search_cols, output_cols, query, max_results * DEDUP_OVERFETCH,
+                             snippet_window, highlight))
+    if not hits:
+        return hits
+    signatures = corpus_signatures(filepath, search_cols)
+    return _collapse_near_duplicates(hits, lambda hit: signatures[hit[0]], max_results)
+
+
+def _search_csv(filepath, search_cols, output_cols, query, max_results, snippet_window=None, highlight=False):
     """Core search function using BM25"""
     if not filepath.exists():
         return []
 
-    data = _load_csv(filepath)
+    return [row for _, _, row in _rank_csv(filepath, search_cols, output_cols, query, max_results,
+                                        snippet_window, highlight)]
+
 
-    # Build documents from search columns
-    documents = [" ".join(str(row.get(col, "")) for col in search_cols) for row in data]
+def _with_snippet_info(result, snippet_window, highlight):
+    """Record snippet settings on a result dict so formatters skip re-truncation"""
+    if snippet_window:
+        result["snippet_window"] = snippet_window
+        result["highlight"] = highlight
+    return result
 
-    # BM25 search
-    bm25 = BM25()
-    bm25.fit(documents)
-    ranked = bm25.score(query)
 
-    # Get top results with score > 0
-    results = []
-    for idx, score in ranked[:max_results]:
-        if score > 0:
-            row = data[idx]
-            results.append({col: row.get(col, "") for col in output_cols if col in row})
+@manifest_batch()
+def _route_table():
+    """Per-domain (rows, df, title_df, header terms) from the manifest, for domains with data.
 
-    return results
+    None when statistics would have to be rebuilt from the CSVs without being saved
+    (a read-only DATA_DIR lacking fresh entries), so routing never parses every CSV
+    in every process.
+    """
+    persists = _manifest_persists()
+    manifest = _load_manifest()
+    table = {}
+    for domain, config in CSV_CONFIG.items():
+        filepath = DATA_DIR / config["file"]
+        if not filepath.exists():
+            continue
+        if persists:
+            _, entry = _corpus_entry(filepath, config["search_cols"])
+        else:
+            entry = _fresh_entry(manifest, _corpus_key(filepath, config["search_cols"]), filepath.stat())
+            if entry is None:
+                return None
+        # Column names and the domain itself count as occurring in every row
+        headers = set(tokenize(" ".join(config["search_cols"] + [filepath.stem, domain])))
+        table[domain] = (entry["rows"], entry["df"], entry["title_df"], headers)
+    return table
+
+
+def _corpus_route_scores(tokens):
+    """{domain: score} from corpus statistics; {} when no manifest table is available.
+
+    Each term scores log(1 + p_d / p) per domain, where p_d is the fraction of the
+    domain's rows containing it and p the rate across all domains, so terms that
+    are concentrated in one corpus dominate and terms common everywhere wash out.
+    """
+    table = _route_table() if tokens else None
+    if not table:
+        return {}
+    total_rows = sum(rows for rows, _, _, _ in table.values())
+    if not total_rows:
+        return {}
+    scores = dict.fromkeys(table, 0.0)
+    for token in tokens:
+        freqs = {domain: (rows if token in headers else df.get(token, 0))
+                 for domain, (rows, df, _, headers) in table.items()}
+        title_freqs = {domain: title_df.get(token, 0) for domain, (_, _, title_df, _) in table.items()}
+        for counts, weight in ((freqs, 1.0), (title_freqs, ROUTE_TITLE_WEIGHT)):
+            background = sum(counts.values()) / total_rows
+            if not background:
+                continue
+            for domain, count in counts.items():
+                if count:
+                    scores[domain] += weight * log(1 + count / table[domain][0] / background)
+    return scores
+
+
+def route_domains(query, k=2):
+    """Rank domains for a query; returns up to k domains, best first.
+
+    DOMAIN_KEYWORDS hits are the primary evidence. Corpus statistics from the
+    manifest order domains with equal keyword hits and route queries that match
+    no keyword; remaining ties keep DOMAIN_KEYWORDS order. Only domains with as
+    many keyword hits as the best one are returned, so search()'s runner-up
+    fallback never overrides keyword evidence.
+    """
+    query_lower = query.lower()
+    with span("route"):
+        keyword_scores = {domain: sum(1 for kw in keywords if kw in query_lower)
+                          for domain, keywords in DOMAIN_KEYWORDS.items()}
+        corpus_scores = _corpus_route_scores(tokenize(query))
+        candidates = [d for d in DOMAIN_KEYWORDS if keyword_scores[d] or corpus_scores.get(d, 0) > 0]
+        ranked = sorted(candidates, key=lambda d: (keyword_scores[d], corpus_scores.get(d, 0.0)), reverse=True)
+    return [d for d in ranked if keyword_scores[d] == keyword_scores[ranked[0]]][:k]
 
 
 def detect_domain(query):
     """Auto-detect the most relevant domain from query"""
-    query_lower = query.lower()
+    ranked = route_domains(query, 1)
+    return ranked[0] if ranked else "style"
+
+
+# (manifest versions, sorted vocabulary, term -> {domain: df}) for prefix completion
+_SUGGEST_VOCAB = (None, [], {})
 
-    domain_keywords = {
-        "color": ["color", "palette", "hex", "#", "rgb"],
-        "chart": ["chart", "graph", "visualization", "trend", "bar", "pie", "scatter", "heatmap", "funnel"],
-        "landing": ["landing", "page", "cta", "conversion", "hero", "testimonial", "pricing", "section"],
-        "product": ["saas", "ecommerce", "e-commerce", "fintech", "healthcare", "gaming", "portfolio", "crypto", "dashboard"],
-        "prompt": ["prompt", "css", "implementation", "variable", "checklist", "tailwind"],
-        "style": ["style", "design", "ui", "minimalism", "glassmorphism", "neumorphism", "brutalism", "dark mode", "flat", "aurora"],
-        "ux": ["ux", "usability", "accessibility", "wcag", "touch", "scroll", "animation", "keyboard", "navigation", "mobile"],
-        "typography": ["font", "typography", "heading", "serif", "sans"],
-        "icons": ["icon", "icons", "lucide", "heroicons", "symbol", "glyph", "pictogram", "svg icon"],
-        "react": ["react", "next.js", "nextjs", "suspense", "memo", "usecallback", "useeffect", "rerender", "bundle", "waterfall", "barrel", "dynamic import", "rsc", "server component"],
-        "web": ["aria", "focus", "outline", "semantic", "virtualize", "autocomplete", "form", "input type", "preconnect"]
+
+@manifest_batch()
+def _suggest_vocabulary():
+    """Sorted vocabulary of all domains from the manifest, rebuilt when any corpus changes"""
+    global _SUGGEST_VOCAB
+    entries = []
+    for domain, config in CSV_CONFIG.items():
+        filepath = DATA_DIR / config["file"]
+        if filepath.exists():
+            entries.append((domain, _corpus_entry(filepath, config["search_cols"])[1]))
+    version = tuple((domain, entry["mtime_ns"], entry["size"]) for domain, entry in entries)
+    vocabulary = _SUGGEST_VOCAB
+    if vocabulary[0] != version:
+        freqs = defaultdict(dict)
+        for domain, entry in entries:
+            for term, df in entry["df"].items():
+                freqs[term][domain] = df
+        vocabulary = _SUGGEST_VOCAB = (version, sorted(freqs), dict(freqs))
+    return vocabulary
+
+
+def suggest(text, domain=None, k=10):
+    """Complete the last word of text from corpus vocabularies, most frequent terms first"""
+    words = re.sub(r'[^\w\s]', ' ', str(text).lower()).split()
+    if not words:
+        return {"query": text, "prefix": "", "suggestions": []}
+    prefix = words[-1]
+    _, terms, freqs = _suggest_vocabulary()
+
+    matches = []
+    for term in terms[bisect.bisect_left(terms, prefix):]:
+        if not term.startswith(prefix):
+            break
+        by_domain = freqs[term]
+        df = by_domain.get(domain, 0) if domain else sum(by_domain.values())
+        if df:
+            matches.append((df, term, by_domain))
+    top = heapq.nsmallest(k, matches, key=lambda m: (-m[0], m[1]))
+    return {
+        "query": text,
+        "prefix": prefix,
+        "suggestions": [{
+            "term": term,
+            "completion": " ".join(words[:-1] + [term]),
+            "df": df,
+            "domains": sorted(by_domain, key=lambda d: (-by_domain[d], d))
+        } for df, term, by_domain in top]
     }
 
-    scores = {domain: sum(1 for kw in keywords if kw in query_lower) for domain, keywords in domain_keywords.items()}
-    best = max(scores, key=scores.get)
-    return best if scores[best] > 0 else "style"
 
+def _route_and_rank(query, domain, rank):
+    """Rank query with rank(config) in the given or auto-routed domain; returns (domain, config, hits).
 
-def search(query, domain=None, max_results=MAX_RESULTS):
-    """Main search function with auto-domain detection"""
+    When the top routed domain has no hits (it only matched on column names), the
+    runner-up is tried before giving up. hits is None if the domain's file is missing.
+    """
+    routed = []
     if domain is None:
-        domain = detect_domain(query)
+        routed = route_domains(query)
+        domain = routed[0] if routed else "style"
 
     config = CSV_CONFIG.get(domain, CSV_CONFIG["style"])
+    if not (DATA_DIR / config["file"]).exists():
+        return domain, config, None
+
+    hits = rank(config)
+    if not hits and len(routed) > 1:
+        fallback = CSV_CONFIG[routed[1]]
+        fallback_hits = rank(fallback)
+        if fallback_hits:
+            domain, config, hits = routed[1], fallback, fallback_hits
+    return domain, config, hits
+
+
+def search(query, domain=None, max_results=MAX_RESULTS, snippet_window=None, highlight=False, dedup=False):
+    """Main search function with auto-domain detection.
+
+    With snippet_window, long fields are cut to the window around the densest
+    query-term matches (optionally wrapped in HIGHLIGHT_MARK). With dedup,
+    near-duplicate hits are collapsed (see _rank_csv).
+    """
+    start = perf_counter_ns()
+    requested = domain
+    domain, config, hits = _route_and_rank(
+        query, domain, lambda config: _rank_csv(DATA_DIR / config["file"], config["search_cols"],
+                                                config["output_cols"], query, max_results, snippet_window,
+                                                highlight, dedup))
+    if hits is None:
+        return {"error": f"File not found: {DATA_DIR / config['file']}", "domain": domain}
+    ids = [idx for idx, _, _ in hits]
+    if _QUERY_LOGGER is not None:
+        _log_query("search", query, requested, None, max_results, perf_counter_ns() - start, ids, domain)
+
+    return _with_snippet_info({
+        "domain": domain,
+        "query": query,
+        "file": config["file"],
+        "count": len(hits),
+        "results": [row for _, _, row in hits],
+        "ids": ids
+    }, snippet_window, highlight)
+
+
+def search_many(queries, domain, max_results=MAX_RESULTS):
+    """Run several queries against one domain; returns a search() result per query, in order.
+
+    The domain's snapshot is looked up once, so every query ranks against the same
+    index version, and repeated queries are ranked once.
+    """
+    config = CSV_CONFIG.get(domain)
+    if config is None:
+        return [{"error": f"Unknown domain: {domain}. Available: {', '.join(CSV_CONFIG)}"} for _ in queries]
     filepath = DATA_DIR / config["file"]
+    if not filepath.exists():
+        return [{"error": f"File not found: {filepath}", "domain": domain} for _ in queries]
+
+    with span("index_lookup"):
+        _, index, _ = _get_index(filepath, config["search_cols"])
+    ranked = {}
+    for query in queries:
+        if query in ranked:
+            continue
+        start = perf_counter_ns()
+        hits = index.score(query, max_results)
+        ids = [idx for idx, _, _ in hits]
+        if _QUERY_LOGGER is not None:
+            _log_query("search", query, domain, None, max_results, perf_counter_ns() - start, ids, domain)
+        ranked[query] = (ids, [{col: row.get(col, "") for col in config["output_cols"] if col in row}
+                               for _, _, row in hits])
 
+    return [{
+        "domain": domain,
+        "query": query,
+        "file": config["file"],
+        "count": len(ranked[query][0]),
+        "results": [dict(row) for row in ranked[query][1]],
+        "ids": list(ranked[query][0])
+    } for query in queries]
+
+
+def similar(domain, row_id, k=MAX_RESULTS):
+    """Rows most like row_id in a domain, ranked by a query of the row's top tf-idf terms"""
+    config = CSV_CONFIG.get(domain)
+    if config is None:
+        return {"error": f"Unknown domain: {domain}. Available: {', '.join(CSV_CONFIG)}"}
+    filepath = DATA_DIR / config["file"]
     if not filepath.exists():
         return {"error": f"File not found: {filepath}", "domain": domain}
 
-    results = _search_csv(filepath, config["search_cols"], config["output_cols"], query, max_results)
+    data, index, _ = _get_index(filepath, config["search_cols"])
+    if not 0 <= row_id < len(data):
+        return {"error": f"Row id {row_id} out of range for {config['file']} (0-{len(data) - 1})", "domain": domain}
+
+    # Weight each term by its tf in the source row, as if it were repeated in the query
+    vector = sorted(index.term_vector(row_id), key=lambda item: (-item[1] * index.idf(item[0]), item[0]))
+    weights = dict(vector[:SIMILAR_TERMS])
+    hits = [hit for hit in index.score_terms(weights, k + 1) if hit[0] != row_id][:k]
+
+    def project(row):
+        return {col: row.get(col, "") for col in config["output_cols"] if col in row}
 
     return {
         "domain": domain,
-        "query": query,
+        "query": " ".join(weights),
         "file": config["file"],
-        "count": len(results),
-        "results": results
+        "source_id": row_id,
+        "source": project(data[row_id]),
+        "count": len(hits),
+        "results": [project(row) for _, _, row in hits],
+        "ids": [idx for idx, _, _ in hits]
     }
 
 
-def search_stack(query, stack, max_results=MAX_RESULTS):
+def search_stack(query, stack, max_results=MAX_RESULTS, snippet_window=None, highlight=False, dedup=False):
     """Search stack-specific guidelines"""
     if stack not in STACK_CONFIG:
         return {"error": f"Unknown stack: {stack}. Available: {', '.join(AVAILABLE_STACKS)}"}
@@ -246,13 +1776,319 @@ def search_stack(query, stack, max_results=MAX_RESULTS):
     if not filepath.exists():
         return {"error": f"Stack file not found: {filepath}", "stack": stack}
 
-    results = _search_csv(filepath, _STACK_COLS["search_cols"], _STACK_COLS["output_cols"], query, max_results)
+    start = perf_counter_ns()
+    hits = _rank_csv(filepath, _STACK_COLS["search_cols"], _STACK_COLS["output_cols"], query, max_results,
+                     snippet_window, highlight, dedup)
+    ids = [idx for idx, _, _ in hits]
+    if _QUERY_LOGGER is not None:
+        _log_query("stack", query, None, stack, max_results, perf_counter_ns() - start, ids)
 
-    return {
+    return _with_snippet_info({
         "domain": "stack",
         "stack": stack,
         "query": query,
         "file": STACK_CONFIG[stack]["file"],
+        "count": len(hits),
+        "results": [row for _, _, row in hits],
+        "ids": ids
+    }, snippet_window, highlight)
+
+
+def _rank_stack(query, stack, max_results, snippet_window=None, highlight=False, dedup=False):
+    """Rank one stack corpus, returning (stack, [(row_id, score, row), ...])"""
+    filepath = DATA_DIR / STACK_CONFIG[stack]["file"]
+    if not filepath.exists():
+        return stack, []
+    return stack, _rank_csv(filepath, _STACK_COLS["search_cols"], _STACK_COLS["output_cols"], query, max_results,
+                            snippet_window, highlight, dedup)
+
+
+@manifest_batch()
+def search_stacks(query, stacks=None, max_results=MAX_RESULTS, snippet_window=None, highlight=False, dedup=False):
+    """Search several stacks concurrently; merged ranking plus per-stack top hits.
+
+    With dedup, near-duplicates are collapsed within each stack and across the merged ranking.
+    """
+    stacks = list(stacks) if stacks else list(AVAILABLE_STACKS)
+    unknown = [s for s in stacks if s not in STACK_CONFIG]
+    if unknown:
+        return {"error": f"Unknown stack: {', '.join(unknown)}. Available: {', '.join(AVAILABLE_STACKS)}"}
+
+    start = perf_counter_ns()
+    workers = min(len(stacks), MAX_STACK_WORKERS)
+    # Deduplicated merges draw on a deeper per-stack ranking so collapsed slots get refilled
+    depth = max_results * DEDUP_OVERFETCH if dedup else max_results
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        ranked = list(pool.map(lambda s: _rank_stack(query, s, depth, snippet_window, highlight, dedup), stacks))
+
+    per_stack = {}
+    merged = []
+    for stack, hits in ranked:
+        merged.extend((score, stack, idx, row) for idx, score, row in hits)
+        hits = hits[:max_results]
+        per_stack[stack] = {
+            "file": STACK_CONFIG[stack]["file"],
+            "count": len(hits),
+            "results": [row for _, _, row in hits],
+            "ids": [idx for idx, _, _ in hits]
+        }
+
+    # Stable sort keeps the requested stack order for equal scores
+    merged.sort(key=lambda x: x[0], reverse=True)
+    if dedup:
+        signature_of = lambda hit: corpus_signatures(DATA_DIR / STACK_CONFIG[hit[1]]["file"],
+                                                     _STACK_COLS["search_cols"])[hit[2]]
+        merged = _collapse_near_duplicates(merged, signature_of, max_results)
+    merged = merged[:max_results]
+    results = [{"Stack": stack, **row} for _, stack, _, row in merged]
+    ids = [f"{stack}:{idx}" for _, stack, idx, _ in merged]
+    if _QUERY_LOGGER is not None:
+        _log_query("stacks", query, None, ",".join(stacks), max_results, perf_counter_ns() - start, ids)
+
+    return _with_snippet_info({
+        "domain": "stack",
+        "stack": ",".join(stacks),
+        "stacks": stacks,
+        "query": query,
+        "file": ", ".join(STACK_CONFIG[s]["file"] for s in stacks),
         "count": len(results),
-        "results": results
+        "results": results,
+        "ids": ids,
+        "per_stack": per_stack
+    }, snippet_window, highlight)
+
+
+# ============ INDEX STATS ============
+@manifest_batch()
+def index_stats(top_terms=10):
+    """Per-corpus index report for every domain and stack CSV, building indexes not yet cached.
+
+    Memory is a sys.getsizeof estimate of the index plus the rows and snippet
+    offsets it keeps resident; while tracemalloc is tracing, bytes allocated by
+    each fresh build are reported as traced_build_bytes.
+    """
+    report = {}
+    for label, filepath, search_cols in _all_corpora():
+        traced = tracemalloc.is_tracing() and not _index_is_cached(filepath, search_cols)
+        before = tracemalloc.get_traced_memory()[0] if traced else 0
+        data, index, offsets = _get_index(filepath, search_cols)
+        after = tracemalloc.get_traced_memory()[0] if traced else 0
+
+        stats = index.describe(top_terms)
+        seen = set()
+        memory = index.memory_usage(seen)
+        index_total = memory.pop("total")
+        memory["rows"] = _deep_sizeof(data, seen)
+        memory["offsets"] = _deep_sizeof(offsets, seen)
+        memory["total"] = index_total + memory["rows"] + memory["offsets"]
+        stats["memory_bytes"] = memory
+        if traced:
+            stats["traced_build_bytes"] = after - before
+        report[label] = {"file": filepath.relative_to(DATA_DIR).as_posix(), **stats}
+    return report
+
+
+# ============ DATA PACKS ============
+def _pack_config(filepath):
+    """search/output columns for a pack: <name>.json sidecar, else every CSV column"""
+    sidecar = filepath.with_suffix(".json")
+    if sidecar.exists():
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return config.get("search_cols"), config.get("output_cols")
+    return None, None
+
+
+class PackIndex:
+    """Segmented index over one pack CSV that ingests appended rows incrementally"""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.index = None
+        self.header = b""
+        self.fieldnames = None
+        self.output_cols = None
+        self.offset = 0
+        self.sidecar_mtime = None
+
+    def refresh(self):
+        """Ingest rows appended since the last refresh; rebuild if the file was rewritten"""
+        with self.lock:
+            sidecar = self.filepath.with_suffix(".json")
+            sidecar_mtime = sidecar.stat().st_mtime_ns if sidecar.exists() else None
+            size = self.filepath.stat().st_size
+            with open(self.filepath, 'rb') as f:
+                header = f.read(len(self.header))
+            if size < self.offset or header != self.header or sidecar_mtime != self.sidecar_mtime:
+                self._reset()
+            if self.index is not None and size == self.offset:
+                return self
+
+            if self.offset == 0 and size > PACK_STREAM_BYTES:
+                self._build_streaming(sidecar_mtime)
+                return self
+
+            with span("pack_ingest"), open(self.filepath, 'rb') as f:
+                if self.offset == 0:
+                    self.header = f.readline()
+                f.seek(self.offset)
+                chunk = f.read()
+                # Appends only ingest complete lines; a partially written row waits for the next refresh
+                end = len(chunk) if self.offset == 0 else chunk.rfind(b"\n") + 1
+                if end == 0:
+                    return self
+                text = chunk[:end].decode('utf-8-sig' if self.offset == 0 else 'utf-8')
+                if self.index is None:
+                    reader = csv.DictReader(io.StringIO(text, newline=''))
+                    rows = list(reader)
+                    self.fieldnames = reader.fieldnames or []
+                    search_cols, output_cols = _pack_config(self.filepath)
+                    self.index = SegmentedIndex(search_cols or self.fieldnames)
+                    self.output_cols = output_cols or self.fieldnames
+                    self.sidecar_mtime = sidecar_mtime
+                else:
+                    rows = list(csv.DictReader(io.StringIO(text, newline=''), fieldnames=self.fieldnames))
+                self.index.add_rows(rows)
+                self.offset += end
+        return self
+
+    def _build_streaming(self, sidecar_mtime):
+        """Initial bounded-memory build for oversized packs; later appends go to memory segments"""
+        with open(self.filepath, 'rb') as f:
+            self.header = f.readline()
+        search_cols, output_cols = _pack_config(self.filepath)
+        self.index = build_streaming_index(self.filepath, search_cols)
+        base = self.index.segments[0]
+        self.fieldnames = base.rows.fieldnames
+        self.output_cols = output_cols or self.fieldnames
+        self.sidecar_mtime = sidecar_mtime
+        self.offset = base.end_offset
+
+
+_PACK_INDEXES = {}
+_PACK_INDEXES_GUARD = threading.Lock()
+
+
+def list_packs():
+    """Names of the CSV data packs dropped into PACKS_DIR"""
+    if not PACKS_DIR.is_dir():
+        return []
+    return sorted(p.stem for p in PACKS_DIR.glob("*.csv"))
+
+
+def _get_pack(pack):
+    filepath = PACKS_DIR / f"{pack}.csv"
+    with _PACK_INDEXES_GUARD:
+        pack_index = _PACK_INDEXES.get(pack)
+        if pack_index is None:
+            pack_index = _PACK_INDEXES[pack] = PackIndex(filepath)
+    return pack_index.refresh()
+
+
+def _rank_pack(pack, query, max_results):
+    """Top (row_id, score, row) for a pack, projected onto its output columns"""
+    pack_index = _get_pack(pack)
+    if pack_index.index is None:
+        return []
+    output_cols = pack_index.output_cols
+    return [(row_id, score, {col: row.get(col, "") for col in output_cols if col in row})
+            for row_id, score, row in pack_index.index.score(query, max_results)]
+
+
+def search_pack(query, pack, max_results=MAX_RESULTS):
+    """Search an external data pack (PACKS_DIR/<pack>.csv)"""
+    filepath = PACKS_DIR / f"{pack}.csv"
+    if not filepath.exists():
+        return {"error": f"Unknown pack: {pack}. Available: {', '.join(list_packs()) or 'none'}"}
+
+    hits = _rank_pack(pack, query, max_results)
+    return {
+        "domain": "pack",
+        "pack": pack,
+        "query": query,
+        "file": f"{PACKS_DIR.name}/{filepath.name}",
+        "count": len(hits),
+        "results": [row for _, _, row in hits],
+        "ids": [row_id for row_id, _, _ in hits]
+    }
+
+
+# ============ STREAMING SEARCH ============
+def _hit_record(domain, stack, file, rank, row_id, score, row):
+    """One self-contained hit with a fixed key order for line-oriented output"""
+    return {
+        "domain": domain,
+        "stack": stack,
+        "file": file,
+        "rank": rank,
+        "id": row_id,
+        "score": round(score, 4),
+        "result": row
     }
+
+
+def _peek(iterator):
+    """The iterator with its first item pushed back, or () if it is empty"""
+    first = next(iterator, None)
+    return () if first is None else chain((first,), iterator)
+
+
+def iter_search(query, domain=None, max_results=MAX_RESULTS, snippet_window=None, highlight=False):
+    """Yield hit records for a domain search one at a time, in rank order (routed like search())"""
+    start = perf_counter_ns()
+    requested = domain
+    domain, config, hits = _route_and_rank(
+        query, domain, lambda config: _peek(_iter_ranked(DATA_DIR / config["file"], config["search_cols"],
+                                                         config["output_cols"], query, max_results,
+                                                         snippet_window, highlight)))
+    if hits is None:
+        yield {"error": f"File not found: {DATA_DIR / config['file']}", "domain": domain}
+        return
+
+    ids = []
+    for rank, (idx, score, row) in enumerate(hits, 1):
+        ids.append(idx)
+        yield _hit_record(domain, None, config["file"], rank, idx, score, row)
+    if _QUERY_LOGGER is not None:
+        _log_query("search", query, requested, None, max_results, perf_counter_ns() - start, ids, domain)
+
+
+def iter_search_stacks(query, stacks=None, max_results=MAX_RESULTS, snippet_window=None, highlight=False):
+    """Yield hit records per stack as soon as each stack corpus finishes ranking"""
+    stacks = list(stacks) if stacks else list(AVAILABLE_STACKS)
+    unknown = [s for s in stacks if s not in STACK_CONFIG]
+    if unknown:
+        yield {"error": f"Unknown stack: {', '.join(unknown)}. Available: {', '.join(AVAILABLE_STACKS)}"}
+        return
+
+    start = perf_counter_ns()
+    ids = []
+    workers = min(len(stacks), MAX_STACK_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_rank_stack, query, s, max_results, snippet_window, highlight) for s in stacks]
+        for future in as_completed(futures):
+            stack, hits = future.result()
+            for rank, (idx, score, row) in enumerate(hits, 1):
+                ids.append(f"{stack}:{idx}")
+                yield _hit_record("stack", stack, STACK_CONFIG[stack]["file"], rank, idx, score, row)
+    if _QUERY_LOGGER is not None:
+        _log_query("stacks", query, None, ",".join(stacks), max_results, perf_counter_ns() - start, ids)
+
+
+def iter_search_pack(query, pack, max_results=MAX_RESULTS):
+    """Yield hit records for an external data pack, in rank order"""
+    filepath = PACKS_DIR / f"{pack}.csv"
+    if not filepath.exists():
+        yield {"error": f"Unknown pack: {pack}. Available: {', '.join(list_packs()) or 'none'}"}
+        return
+    file = f"{PACKS_DIR.name}/{filepath.name}"
+    for rank, (row_id, score, row) in enumerate(_rank_pack(pack, query, max_results), 1):
+        yield _hit_record("pack", pack, file, rank, row_id, score, row)
+
+
+if os.environ.get(QUERY_LOG_ENV):
+    enable_query_log(os.environ[QUERY_LOG_ENV])
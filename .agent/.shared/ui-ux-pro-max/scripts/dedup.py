@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Near-Duplicate Finder - reports near-identical rows across the guideline CSVs
+using MinHash signatures and LSH banding (sub-quadratic in the number of rows).
+
+Usage: python dedup.py [--threshold 0.6] [--corpus ux,web,stack:react] [--json]
+
+Corpora are labelled by domain (style, ux, ...) or as stack:<name>. Candidate
+pairs from LSH are verified with the exact Jaccard similarity of their term sets.
+Collapse duplicates at search time with: python search.py "<query>" --dedup
+"""
+
+import argparse
+import json
+import sys
+
+import core
+
+PREVIEW_CHARS = 70
+
+
+def preview(filepath, search_cols, row_id):
+    """Short text of a row's first two search columns"""
+    data, _, _ = core._get_index(filepath, search_cols)
+    text = " ".join(" | ".join(str(data[row_id].get(col, "")) for col in search_cols[:2]).split())
+    return text if len(text) <= PREVIEW_CHARS else text[:PREVIEW_CHARS] + "..."
+
+
+def format_report(pairs, corpora, threshold):
+    """Format duplicate pairs for the terminal"""
+    files = {label: (filepath, search_cols) for label, filepath, search_cols in corpora}
+    output = [f"## Near-Duplicate Rows (Jaccard >= {threshold})",
+              f"**Corpora:** {len(corpora)} | **Pairs:** {len(pairs)}\n"]
+    for jaccard, first, second in pairs:
+        output.append(f"### {jaccard:.2f}  {first[0]}:{first[1]} ~ {second[0]}:{second[1]}")
+        for label, row_id in (first, second):
+            filepath, search_cols = files[label]
+            output.append(f"- **{filepath.name}:{row_id}** {preview(filepath, search_cols, row_id)}")
+        output.append("")
+    return "\n".join(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find near-duplicate rows across UI Pro Max corpora")
+    parser.add_argument("--threshold", "-t", type=float, default=core.DEDUP_THRESHOLD,
+                        help=f"Minimum term-set Jaccard similarity (default: {core.DEDUP_THRESHOLD})")
+    parser.add_argument("--corpus", type=str, default=None,
+                        help="Comma-separated corpus labels to compare (default: all domains and stacks)")
+    parser.add_argument("--json", action="store_true", help="Output pairs as JSON")
+    args = parser.parse_args()
+
+    corpora = core._all_corpora()
+    if args.corpus:
+        wanted = [c.strip() for c in args.corpus.split(",") if c.strip()]
+        unknown = [c for c in wanted if c not in {label for label, _, _ in corpora}]
+        if unknown:
+            print(f"Error: unknown corpus: {', '.join(unknown)}", file=sys.stderr)
+            sys.exit(1)
+        corpora = [c for c in corpora if c[0] in wanted]
+
+    pairs = core.find_near_duplicates(args.threshold, corpora)
+    if args.json:
+        print(json.dumps([{"jaccard": round(j, 4), "a": {"corpus": a[0], "id": a[1]}, "b": {"corpus": b[0], "id": b[1]}}
+                          for j, a, b in pairs], indent=2))
+    else:
+        print(format_report(pairs, corpora, args.threshold))
@@ -11,18 +11,38 @@ Usage:
     # With persistence (Master + Overrides pattern)
     result = generate_design_system("SaaS dashboard", "My Project", persist=True)
     result = generate_design_system("SaaS dashboard", "My Project", persist=True, page="dashboard")
+    result = generate_design_system("SaaS dashboard", "My Project", persist=True, pages=["dashboard", "checkout"])
 """
 
 import csv
+import hashlib
 import json
+import multiprocessing
 import os
+import re
+import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from enum import Enum
+from functools import lru_cache
 from pathlib import Path
-from core import search, DATA_DIR
+from core import search, search_many, manifest_batch, CSV_CONFIG, DATA_DIR, _get_index
 
 
 # ============ CONFIGURATION ============
 REASONING_FILE = "ui-reasoning.csv"
+# Page type and layout heuristics for page overrides (see PageClassifier)
+PAGE_RULES_FILE = "page-rules.csv"
+DEFAULT_PAGE_TYPE = "General"
+
+# Per-page searches behind each page override file
+PAGE_SEARCH_CONFIG = {
+    "style": {"max_results": 1},
+    "ux": {"max_results": 3},
+    "landing": {"max_results": 1}
+}
 
 SEARCH_CONFIG = {
     "product": {"max_results": 1},
@@ -32,58 +52,285 @@ SEARCH_CONFIG = {
     "typography": {"max_results": 2}
 }
 
+# Generated design systems cached on disk, keyed by normalized query, project and data version;
+# least recently used entries are evicted beyond either limit
+DESIGN_CACHE_DIR = Path(os.environ.get("UIPRO_DESIGN_CACHE_DIR", DATA_DIR / ".design-cache"))
+DESIGN_CACHE_MAX_ENTRIES = 512
+DESIGN_CACHE_MAX_BYTES = 16 * 1024 * 1024
+DESIGN_CACHE_VERSION = 2
+
+# Shared by all generators so warm fan-outs don't pay thread start-up per call
+FANOUT_THREADS = 16
+_FANOUT_POOL = None
+_FANOUT_POOL_LOCK = threading.Lock()
+
+
+def _fanout_pool() -> ThreadPoolExecutor:
+    global _FANOUT_POOL
+    if _FANOUT_POOL is None:
+        with _FANOUT_POOL_LOCK:
+            if _FANOUT_POOL is None:
+                _FANOUT_POOL = ThreadPoolExecutor(max_workers=FANOUT_THREADS, thread_name_prefix="design-fanout")
+    return _FANOUT_POOL
+
+
+# ============ REASONING RULES ============
+class Severity(Enum):
+    """Rule severity; unknown or empty values fall back to MEDIUM."""
+    CRITICAL = "CRITICAL"
+    HIGH = "HIGH"
+    MEDIUM = "MEDIUM"
+    LOW = "LOW"
+
+    @classmethod
+    def parse(cls, value: str) -> "Severity":
+        try:
+            return cls(value.strip().upper())
+        except (AttributeError, ValueError):
+            return cls.MEDIUM
+
+
+class ReasoningRule:
+    """One ui-reasoning.csv row with its JSON and list fields parsed once."""
+
+    __slots__ = ("category", "pattern", "style_priority", "color_mood", "typography_mood",
+                 "key_effects", "anti_patterns", "decision_rules", "severity")
+
+    def __init__(self, row: dict):
+        self.category = row.get("UI_Category", "")
+        self.pattern = row.get("Recommended_Pattern", "")
+        self.style_priority = tuple(s.strip() for s in row.get("Style_Priority", "").split("+"))
+        self.color_mood = row.get("Color_Mood", "")
+        self.typography_mood = row.get("Typography_Mood", "")
+        self.key_effects = row.get("Key_Effects", "")
+        self.anti_patterns = row.get("Anti_Patterns", "")
+        try:
+            decision_rules = json.loads(row.get("Decision_Rules", "{}"))
+        except json.JSONDecodeError:
+            decision_rules = {}
+        self.decision_rules = decision_rules if isinstance(decision_rules, dict) else {}
+        self.severity = Severity.parse(row.get("Severity", "MEDIUM"))
+
+
+class ReasoningIndex:
+    """Compiled rules indexed for category lookup: exact-key map, keyword index and memo."""
+
+    __slots__ = ("rules", "keys", "keywords", "exact", "by_keyword", "_memo")
+
+    def __init__(self, rules: list):
+        self.rules = rules
+        # Normalized once: lowercased category and its "/"/"-"-separated keywords
+        self.keys = [rule.category.lower() for rule in rules]
+        self.keywords = [tuple(key.replace("/", " ").replace("-", " ").split()) for key in self.keys]
+        self.exact = {}
+        self.by_keyword = {}
+        for pos, key in enumerate(self.keys):
+            self.exact.setdefault(key, pos)
+            for keyword in self.keywords[pos]:
+                self.by_keyword.setdefault(keyword, pos)
+        self._memo = {}
+
+    def find(self, category: str) -> "ReasoningRule":
+        """First rule matching exactly, then by substring, then by keyword (file order); None if none."""
+        category_lower = category.lower()
+        pos = self.exact.get(category_lower)
+        if pos is None:
+            if category_lower in self._memo:
+                pos = self._memo[category_lower]
+            else:
+                pos = self._memo[category_lower] = self._search(category_lower)
+        return self.rules[pos] if pos is not None else None
+
+    def _search(self, category_lower: str):
+        for pos, key in enumerate(self.keys):
+            if key in category_lower or category_lower in key:
+                return pos
+
+        # A keyword equal to a category token is a guaranteed hit, so only earlier
+        # rules need the substring test
+        tokens = category_lower.replace("/", " ").replace("-", " ").split()
+        limit = min((self.by_keyword[t] for t in tokens if t in self.by_keyword), default=len(self.keys))
+        for pos in range(limit):
+            if any(keyword in category_lower for keyword in self.keywords[pos]):
+                return pos
+        return limit if limit < len(self.keys) else None
+
+
+# Compiled reasoning per file, shared by all generators: {path: (mtime_ns, rows, ReasoningIndex)}
+_REASONING_CACHE = {}
+_REASONING_LOCK = threading.Lock()
+
+
+def _load_reasoning_rows(filepath: Path) -> list:
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def load_reasoning(filepath: Path = None) -> tuple:
+    """(raw rows, ReasoningIndex) for the reasoning CSV, recompiled only when its mtime changes."""
+    filepath = filepath or DATA_DIR / REASONING_FILE
+    try:
+        mtime = filepath.stat().st_mtime_ns
+    except OSError:
+        return [], ReasoningIndex([])
+    entry = _REASONING_CACHE.get(filepath)
+    if entry is None or entry[0] != mtime:
+        with _REASONING_LOCK:
+            entry = _REASONING_CACHE.get(filepath)
+            if entry is None or entry[0] != mtime:
+                rows = _load_reasoning_rows(filepath)
+                entry = _REASONING_CACHE[filepath] = (mtime, rows, ReasoningIndex([ReasoningRule(row) for row in rows]))
+    return entry[1], entry[2]
+
+
+# ============ PAGE CLASSIFIER ============
+# Override sections a layout rule's Traits may fill
+PAGE_TRAIT_SECTIONS = ("layout", "spacing", "typography", "colors")
+
+
+class PageRule:
+    """One page-rules.csv row: a labelled keyword set within a rule group, plus override traits."""
+
+    __slots__ = ("group", "label", "keywords", "traits")
+
+    def __init__(self, row: dict):
+        self.group = row.get("Rule_Group", "").strip()
+        self.label = row.get("Label", "").strip()
+        self.keywords = tuple(kw.strip().lower() for kw in row.get("Keywords", "").split(",") if kw.strip())
+        try:
+            traits = json.loads(row.get("Traits") or "{}")
+        except json.JSONDecodeError:
+            traits = {}
+        self.traits = {section: dict(values) for section, values in traits.items()
+                       if section in PAGE_TRAIT_SECTIONS and isinstance(values, dict)} if isinstance(traits, dict) else {}
+
+
+def _trie_pattern(keywords) -> str:
+    """Regex alternation of keywords folded into a character trie; matches the longest keyword."""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in node.items() if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class PageClassifier:
+    """
+    Rule groups compiled into one regex each; match() scans the text once.
+
+    A rule matches when any of its keywords occurs as a substring, and the earliest
+    matching rule in file order wins. The keyword trie sits in a lookahead, so every
+    position reports its longest keyword, overlaps included; each keyword is ranked by
+    the best rule among it and its prefixes, which match at the same position.
+    A rule without keywords is the group's catch-all.
+    """
+
+    __slots__ = ("groups", "_compiled")
+
+    def __init__(self, rules: list):
+        self.groups = {}
+        for rule in rules:
+            self.groups.setdefault(rule.group, []).append(rule)
+        self._compiled = {}
+        for group, group_rules in self.groups.items():
+            owner = {}
+            for pos, rule in enumerate(group_rules):
+                for keyword in rule.keywords:
+                    owner.setdefault(keyword, pos)
+            owner = {keyword: min(pos for prefix, pos in owner.items() if keyword.startswith(prefix))
+                     for keyword in owner}
+            pattern = re.compile("(?=(" + _trie_pattern(owner) + "))") if owner else None
+            default = next((pos for pos, rule in enumerate(group_rules) if not rule.keywords), None)
+            self._compiled[group] = (pattern, owner, default)
+
+    def match(self, group: str, text: str) -> "PageRule":
+        """Earliest rule of group with a keyword in text, else the group's catch-all; None if neither."""
+        compiled = self._compiled.get(group)
+        if compiled is None:
+            return None
+        pattern, owner, default = compiled
+        best = min(map(owner.__getitem__, pattern.findall(text.lower())), default=None) if pattern else None
+        if best is None or (default is not None and default < best):
+            best = default
+        return self.groups[group][best] if best is not None else None
+
+
+_PAGE_RULES_CACHE = {}
+_PAGE_RULES_LOCK = threading.Lock()
+
+
+def load_page_rules(filepath: Path = None) -> PageClassifier:
+    """Compiled PageClassifier for the page rules CSV, recompiled only when its mtime changes."""
+    filepath = filepath or DATA_DIR / PAGE_RULES_FILE
+    try:
+        mtime = filepath.stat().st_mtime_ns
+    except OSError:
+        return PageClassifier([])
+    entry = _PAGE_RULES_CACHE.get(filepath)
+    if entry is None or entry[0] != mtime:
+        with _PAGE_RULES_LOCK:
+            entry = _PAGE_RULES_CACHE.get(filepath)
+            if entry is None or entry[0] != mtime:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    rules = [PageRule(row) for row in csv.DictReader(f)]
+                entry = _PAGE_RULES_CACHE[filepath] = (mtime, PageClassifier(rules))
+    return entry[1]
+
 
 # ============ DESIGN SYSTEM GENERATOR ============
 class DesignSystemGenerator:
     """Generates design system recommendations from aggregated searches."""
 
     def __init__(self):
-        self.reasoning_data = self._load_reasoning()
+        self.reasoning_data, self.reasoning_index = load_reasoning()
+        # Row ids each domain search returned in the last generate(), for provenance
+        self.sources = {}
 
     def _load_reasoning(self) -> list:
         """Load reasoning rules from CSV."""
-        filepath = DATA_DIR / REASONING_FILE
-        if not filepath.exists():
-            return []
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return list(csv.DictReader(f))
+        return load_reasoning()[0]
+
+    def _multi_domain_search(self, query: str, style_priority: list = None, done: dict = None) -> dict:
+        """Execute searches across multiple domains concurrently, merged in SEARCH_CONFIG order.
 
-    def _multi_domain_search(self, query: str, style_priority: list = None) -> dict:
-        """Execute searches across multiple domains."""
-        results = {}
+        Domains already in done (e.g. the product search from Step 1) are reused, not re-run.
+        """
+        done = done or {}
+        jobs = {}
         for domain, config in SEARCH_CONFIG.items():
+            if domain in done:
+                continue
             if domain == "style" and style_priority:
                 # For style, also search with priority keywords
                 priority_query = " ".join(style_priority[:2]) if style_priority else query
-                combined_query = f"{query} {priority_query}"
-                results[domain] = search(combined_query, domain, config["max_results"])
+                jobs[domain] = (f"{query} {priority_query}", domain, config["max_results"])
             else:
-                results[domain] = search(query, domain, config["max_results"])
-        return results
-
-    def _find_reasoning_rule(self, category: str) -> dict:
-        """Find matching reasoning rule for a category."""
-        category_lower = category.lower()
-
-        # Try exact match first
-        for rule in self.reasoning_data:
-            if rule.get("UI_Category", "").lower() == category_lower:
-                return rule
-
-        # Try partial match
-        for rule in self.reasoning_data:
-            ui_cat = rule.get("UI_Category", "").lower()
-            if ui_cat in category_lower or category_lower in ui_cat:
-                return rule
-
-        # Try keyword match
-        for rule in self.reasoning_data:
-            ui_cat = rule.get("UI_Category", "").lower()
-            keywords = ui_cat.replace("/", " ").replace("-", " ").split()
-            if any(kw in category_lower for kw in keywords):
-                return rule
+                jobs[domain] = (query, domain, config["max_results"])
+
+        # Threads build cold indexes into this process's cache, so later calls stay warm
+        if len(jobs) > 1:
+            pool = _fanout_pool()
+            with manifest_batch():
+                futures = {domain: pool.submit(search, *args) for domain, args in jobs.items()}
+                fetched = {domain: future.result() for domain, future in futures.items()}
+        else:
+            fetched = {domain: search(*args) for domain, args in jobs.items()}
+        return {domain: done[domain] if domain in done else fetched[domain]
+                for domain in SEARCH_CONFIG if domain in done or domain in fetched}
 
-        return {}
+    def _find_reasoning_rule(self, category: str) -> "ReasoningRule":
+        """Find matching reasoning rule for a category (None if no rule matches)."""
+        return self.reasoning_index.find(category)
 
     def _apply_reasoning(self, category: str, search_results: dict) -> dict:
         """Apply reasoning rules to search results."""
@@ -101,22 +348,16 @@ class DesignSystemGenerator:
                 "severity": "MEDIUM"
             }
 
-        # Parse decision rules JSON
-        decision_rules = {}
-        try:
-            decision_rules = json.loads(rule.get("Decision_Rules", "{}"))
-        except json.JSONDecodeError:
-            pass
-
+        # Copies, so callers can't mutate the shared compiled rule
         return {
-            "pattern": rule.get("Recommended_Pattern", ""),
-            "style_priority": [s.strip() for s in rule.get("Style_Priority", "").split("+")],
-            "color_mood": rule.get("Color_Mood", ""),
-            "typography_mood": rule.get("Typography_Mood", ""),
-            "key_effects": rule.get("Key_Effects", ""),
-            "anti_patterns": rule.get("Anti_Patterns", ""),
-            "decision_rules": decision_rules,
-            "severity": rule.get("Severity", "MEDIUM")
+            "pattern": rule.pattern,
+            "style_priority": list(rule.style_priority),
+            "color_mood": rule.color_mood,
+            "typography_mood": rule.typography_mood,
+            "key_effects": rule.key_effects,
+            "anti_patterns": rule.anti_patterns,
+            "decision_rules": dict(rule.decision_rules),
+            "severity": rule.severity.value
         }
 
     def _select_best_match(self, results: list, priority_keywords: list) -> dict:
@@ -173,9 +414,9 @@ class DesignSystemGenerator:
         reasoning = self._apply_reasoning(category, {})
         style_priority = reasoning.get("style_priority", [])
 
-        # Step 3: Multi-domain search with style priority hints
-        search_results = self._multi_domain_search(query, style_priority)
-        search_results["product"] = product_result  # Reuse product search
+        # Step 3: Multi-domain search with style priority hints (reusing the product search)
+        search_results = self._multi_domain_search(query, style_priority, {"product": product_result})
+        self.sources = {domain: result.get("ids", []) for domain, result in search_results.items()}
 
         # Step 4: Select best matches from each domain using priority
         style_results = self._extract_results(search_results.get("style", {}))
@@ -239,114 +480,166 @@ class DesignSystemGenerator:
 # ============ OUTPUT FORMATTERS ============
 BOX_WIDTH = 90  # Wider box for more content
 
-def format_ascii_box(design_system: dict) -> str:
-    """Format design system as ASCII box with emojis (MCP-style)."""
-    project = design_system.get("project_name", "PROJECT")
-    pattern = design_system.get("pattern", {})
-    style = design_system.get("style", {})
-    colors = design_system.get("colors", {})
-    typography = design_system.get("typography", {})
-    effects = design_system.get("key_effects", "")
-    anti_patterns = design_system.get("anti_patterns", "")
 
-    def wrap_text(text: str, prefix: str, width: int) -> list:
-        """Wrap long text into multiple lines."""
-        if not text:
-            return []
-        words = text.split()
-        lines = []
-        current_line = prefix
-        for word in words:
-            if len(current_line) + len(word) + 1 <= width - 2:
-                current_line += (" " if current_line != prefix else "") + word
+class Template:
+    """
+    A document compiled once from static text and section functions.
+
+    Adjacent static parts are merged at compile time; each section function takes the
+    design system and returns its text ("" to skip). render() streams the parts into
+    a writer, so a document never has to exist as one string. Every part ends its
+    lines with a newline, and the last one is dropped, as a "\\n".join of lines would.
+    """
+
+    __slots__ = ("parts",)
+
+    def __init__(self, *parts):
+        merged = []
+        for part in parts:
+            if isinstance(part, str) and merged and isinstance(merged[-1], str):
+                merged[-1] += part
             else:
-                if current_line != prefix:
-                    lines.append(current_line)
-                current_line = prefix + word
-        if current_line != prefix:
-            lines.append(current_line)
-        return lines
-
-    # Build sections from pattern
-    sections = pattern.get("sections", "").split(">")
-    sections = [s.strip() for s in sections if s.strip()]
+                merged.append(part)
+        if not (merged and isinstance(merged[-1], str) and merged[-1].endswith("\n")):
+            raise ValueError("a template must end with static text ending in a newline")
+        merged[-1] = merged[-1][:-1]
+        self.parts = tuple(merged)
+
+    def render(self, context, write):
+        """Write the document for context through write (e.g. stream.write)."""
+        for part in self.parts:
+            if isinstance(part, str):
+                write(part)
+            else:
+                text = part(context)
+                if text:
+                    write(text)
+
+    def render_str(self, context) -> str:
+        chunks = []
+        self.render(context, chunks.append)
+        return "".join(chunks)
 
-    # Build output lines
+
+def _box(text: str) -> str:
+    return text.ljust(BOX_WIDTH) + "|\n"
+
+
+def wrap_text(text: str, prefix: str, width: int) -> list:
+    """Wrap long text into multiple lines."""
+    if not text:
+        return []
+    words = text.split()
     lines = []
-    w = BOX_WIDTH - 1
+    current_line = prefix
+    for word in words:
+        if len(current_line) + len(word) + 1 <= width - 2:
+            current_line += (" " if current_line != prefix else "") + word
+        else:
+            if current_line != prefix:
+                lines.append(current_line)
+            current_line = prefix + word
+    if current_line != prefix:
+        lines.append(current_line)
+    return lines
+
 
-    lines.append("+" + "-" * w + "+")
-    lines.append(f"|  TARGET: {project} - RECOMMENDED DESIGN SYSTEM".ljust(BOX_WIDTH) + "|")
-    lines.append("+" + "-" * w + "+")
-    lines.append("|" + " " * BOX_WIDTH + "|")
+@lru_cache(maxsize=2048)
+def _boxed_wrap(text: str) -> str:
+    """Text wrapped into indented box lines; cached, as the same data rows recur across documents."""
+    return "".join(_box(line) for line in wrap_text(text, "|     ", BOX_WIDTH))
 
-    # Pattern section
-    lines.append(f"|  PATTERN: {pattern.get('name', '')}".ljust(BOX_WIDTH) + "|")
+
+_BOX_RULE = "+" + "-" * (BOX_WIDTH - 1) + "+\n"
+_BOX_BLANK = "|" + " " * BOX_WIDTH + "|\n"
+
+
+def _ascii_pattern(design_system: dict) -> str:
+    pattern = design_system.get("pattern", {})
+    sections = pattern.get("sections", "").split(">")
+    sections = [s.strip() for s in sections if s.strip()]
+    out = [_box(f"|  PATTERN: {pattern.get('name', '')}")]
     if pattern.get('conversion'):
-        lines.append(f"|     Conversion: {pattern.get('conversion', '')}".ljust(BOX_WIDTH) + "|")
+        out.append(_box(f"|     Conversion: {pattern.get('conversion', '')}"))
     if pattern.get('cta_placement'):
-        lines.append(f"|     CTA: {pattern.get('cta_placement', '')}".ljust(BOX_WIDTH) + "|")
-    lines.append("|     Sections:".ljust(BOX_WIDTH) + "|")
+        out.append(_box(f"|     CTA: {pattern.get('cta_placement', '')}"))
+    out.append(_box("|     Sections:"))
     for i, section in enumerate(sections, 1):
-        lines.append(f"|       {i}. {section}".ljust(BOX_WIDTH) + "|")
-    lines.append("|" + " " * BOX_WIDTH + "|")
+        out.append(_box(f"|       {i}. {section}"))
+    return "".join(out)
 
-    # Style section
-    lines.append(f"|  STYLE: {style.get('name', '')}".ljust(BOX_WIDTH) + "|")
+
+def _ascii_style(design_system: dict) -> str:
+    style = design_system.get("style", {})
+    out = [_box(f"|  STYLE: {style.get('name', '')}")]
     if style.get("keywords"):
-        for line in wrap_text(f"Keywords: {style.get('keywords', '')}", "|     ", BOX_WIDTH):
-            lines.append(line.ljust(BOX_WIDTH) + "|")
+        out.append(_boxed_wrap(f"Keywords: {style.get('keywords', '')}"))
     if style.get("best_for"):
-        for line in wrap_text(f"Best For: {style.get('best_for', '')}", "|     ", BOX_WIDTH):
-            lines.append(line.ljust(BOX_WIDTH) + "|")
+        out.append(_boxed_wrap(f"Best For: {style.get('best_for', '')}"))
     if style.get("performance") or style.get("accessibility"):
         perf_a11y = f"Performance: {style.get('performance', '')} | Accessibility: {style.get('accessibility', '')}"
-        lines.append(f"|     {perf_a11y}".ljust(BOX_WIDTH) + "|")
-    lines.append("|" + " " * BOX_WIDTH + "|")
-
-    # Colors section
-    lines.append("|  COLORS:".ljust(BOX_WIDTH) + "|")
-    lines.append(f"|     Primary:    {colors.get('primary', '')}".ljust(BOX_WIDTH) + "|")
-    lines.append(f"|     Secondary:  {colors.get('secondary', '')}".ljust(BOX_WIDTH) + "|")
-    lines.append(f"|     CTA:        {colors.get('cta', '')}".ljust(BOX_WIDTH) + "|")
-    lines.append(f"|     Background: {colors.get('background', '')}".ljust(BOX_WIDTH) + "|")
-    lines.append(f"|     Text:       {colors.get('text', '')}".ljust(BOX_WIDTH) + "|")
+        out.append(_box(f"|     {perf_a11y}"))
+    return "".join(out)
+
+
+def _ascii_colors(design_system: dict) -> str:
+    colors = design_system.get("colors", {})
+    out = [_box(f"|     Primary:    {colors.get('primary', '')}"),
+           _box(f"|     Secondary:  {colors.get('secondary', '')}"),
+           _box(f"|     CTA:        {colors.get('cta', '')}"),
+           _box(f"|     Background: {colors.get('background', '')}"),
+           _box(f"|     Text:       {colors.get('text', '')}")]
     if colors.get("notes"):
-        for line in wrap_text(f"Notes: {colors.get('notes', '')}", "|     ", BOX_WIDTH):
-            lines.append(line.ljust(BOX_WIDTH) + "|")
-    lines.append("|" + " " * BOX_WIDTH + "|")
+        out.append(_boxed_wrap(f"Notes: {colors.get('notes', '')}"))
+    return "".join(out)
+
 
-    # Typography section
-    lines.append(f"|  TYPOGRAPHY: {typography.get('heading', '')} / {typography.get('body', '')}".ljust(BOX_WIDTH) + "|")
+def _ascii_typography(design_system: dict) -> str:
+    typography = design_system.get("typography", {})
+    out = [_box(f"|  TYPOGRAPHY: {typography.get('heading', '')} / {typography.get('body', '')}")]
     if typography.get("mood"):
-        for line in wrap_text(f"Mood: {typography.get('mood', '')}", "|     ", BOX_WIDTH):
-            lines.append(line.ljust(BOX_WIDTH) + "|")
+        out.append(_boxed_wrap(f"Mood: {typography.get('mood', '')}"))
     if typography.get("best_for"):
-        for line in wrap_text(f"Best For: {typography.get('best_for', '')}", "|     ", BOX_WIDTH):
-            lines.append(line.ljust(BOX_WIDTH) + "|")
+        out.append(_boxed_wrap(f"Best For: {typography.get('best_for', '')}"))
     if typography.get("google_fonts_url"):
-        lines.append(f"|     Google Fonts: {typography.get('google_fonts_url', '')}".ljust(BOX_WIDTH) + "|")
+        out.append(_box(f"|     Google Fonts: {typography.get('google_fonts_url', '')}"))
     if typography.get("css_import"):
-        lines.append(f"|     CSS Import: {typography.get('css_import', '')[:70]}...".ljust(BOX_WIDTH) + "|")
-    lines.append("|" + " " * BOX_WIDTH + "|")
+        out.append(_box(f"|     CSS Import: {typography.get('css_import', '')[:70]}..."))
+    return "".join(out)
 
-    # Key Effects section
-    if effects:
-        lines.append("|  KEY EFFECTS:".ljust(BOX_WIDTH) + "|")
-        for line in wrap_text(effects, "|     ", BOX_WIDTH):
-            lines.append(line.ljust(BOX_WIDTH) + "|")
-        lines.append("|" + " " * BOX_WIDTH + "|")
-
-    # Anti-patterns section
-    if anti_patterns:
-        lines.append("|  AVOID (Anti-patterns):".ljust(BOX_WIDTH) + "|")
-        for line in wrap_text(anti_patterns, "|     ", BOX_WIDTH):
-            lines.append(line.ljust(BOX_WIDTH) + "|")
-        lines.append("|" + " " * BOX_WIDTH + "|")
-
-    # Pre-Delivery Checklist section
-    lines.append("|  PRE-DELIVERY CHECKLIST:".ljust(BOX_WIDTH) + "|")
-    checklist_items = [
+
+def _ascii_effects(design_system: dict) -> str:
+    effects = design_system.get("key_effects", "")
+    if not effects:
+        return ""
+    return _box("|  KEY EFFECTS:") + _boxed_wrap(effects) + _BOX_BLANK
+
+
+def _ascii_anti_patterns(design_system: dict) -> str:
+    anti_patterns = design_system.get("anti_patterns", "")
+    if not anti_patterns:
+        return ""
+    return _box("|  AVOID (Anti-patterns):") + _boxed_wrap(anti_patterns) + _BOX_BLANK
+
+
+_ASCII_TEMPLATE = Template(
+    _BOX_RULE,
+    lambda ds: _box(f"|  TARGET: {ds.get('project_name', 'PROJECT')} - RECOMMENDED DESIGN SYSTEM"),
+    _BOX_RULE,
+    _BOX_BLANK,
+    _ascii_pattern,
+    _BOX_BLANK,
+    _ascii_style,
+    _BOX_BLANK,
+    _box("|  COLORS:"),
+    _ascii_colors,
+    _BOX_BLANK,
+    _ascii_typography,
+    _BOX_BLANK,
+    _ascii_effects,
+    _ascii_anti_patterns,
+    _box("|  PRE-DELIVERY CHECKLIST:"),
+    *(_box(f"|     {item}") for item in [
         "[ ] No emojis as icons (use SVG: Heroicons/Lucide)",
         "[ ] cursor-pointer on all clickable elements",
         "[ ] Hover states with smooth transitions (150-300ms)",
@@ -354,113 +647,254 @@ def format_ascii_box(design_system: dict) -> str:
         "[ ] Focus states visible for keyboard nav",
         "[ ] prefers-reduced-motion respected",
         "[ ] Responsive: 375px, 768px, 1024px, 1440px"
-    ]
-    for item in checklist_items:
-        lines.append(f"|     {item}".ljust(BOX_WIDTH) + "|")
-    lines.append("|" + " " * BOX_WIDTH + "|")
+    ]),
+    _BOX_BLANK,
+    _BOX_RULE
+)
 
-    lines.append("+" + "-" * w + "+")
 
-    return "\n".join(lines)
+def format_ascii_box(design_system: dict) -> str:
+    """Format design system as ASCII box with emojis (MCP-style)."""
+    return _ASCII_TEMPLATE.render_str(design_system)
 
 
-def format_markdown(design_system: dict) -> str:
-    """Format design system as markdown."""
-    project = design_system.get("project_name", "PROJECT")
+def _markdown_pattern(design_system: dict) -> str:
     pattern = design_system.get("pattern", {})
-    style = design_system.get("style", {})
-    colors = design_system.get("colors", {})
-    typography = design_system.get("typography", {})
-    effects = design_system.get("key_effects", "")
-    anti_patterns = design_system.get("anti_patterns", "")
-
-    lines = []
-    lines.append(f"## Design System: {project}")
-    lines.append("")
-
-    # Pattern section
-    lines.append("### Pattern")
-    lines.append(f"- **Name:** {pattern.get('name', '')}")
+    out = [f"- **Name:** {pattern.get('name', '')}\n"]
     if pattern.get('conversion'):
-        lines.append(f"- **Conversion Focus:** {pattern.get('conversion', '')}")
+        out.append(f"- **Conversion Focus:** {pattern.get('conversion', '')}\n")
     if pattern.get('cta_placement'):
-        lines.append(f"- **CTA Placement:** {pattern.get('cta_placement', '')}")
+        out.append(f"- **CTA Placement:** {pattern.get('cta_placement', '')}\n")
     if pattern.get('color_strategy'):
-        lines.append(f"- **Color Strategy:** {pattern.get('color_strategy', '')}")
-    lines.append(f"- **Sections:** {pattern.get('sections', '')}")
-    lines.append("")
+        out.append(f"- **Color Strategy:** {pattern.get('color_strategy', '')}\n")
+    out.append(f"- **Sections:** {pattern.get('sections', '')}\n")
+    return "".join(out)
 
-    # Style section
-    lines.append("### Style")
-    lines.append(f"- **Name:** {style.get('name', '')}")
+
+def _markdown_style(design_system: dict) -> str:
+    style = design_system.get("style", {})
+    out = [f"- **Name:** {style.get('name', '')}\n"]
     if style.get('keywords'):
-        lines.append(f"- **Keywords:** {style.get('keywords', '')}")
+        out.append(f"- **Keywords:** {style.get('keywords', '')}\n")
     if style.get('best_for'):
-        lines.append(f"- **Best For:** {style.get('best_for', '')}")
+        out.append(f"- **Best For:** {style.get('best_for', '')}\n")
     if style.get('performance') or style.get('accessibility'):
-        lines.append(f"- **Performance:** {style.get('performance', '')} | **Accessibility:** {style.get('accessibility', '')}")
-    lines.append("")
+        out.append(f"- **Performance:** {style.get('performance', '')} | "
+                   f"**Accessibility:** {style.get('accessibility', '')}\n")
+    return "".join(out)
+
 
-    # Colors section
-    lines.append("### Colors")
-    lines.append(f"| Role | Hex |")
-    lines.append(f"|------|-----|")
-    lines.append(f"| Primary | {colors.get('primary', '')} |")
-    lines.append(f"| Secondary | {colors.get('secondary', '')} |")
-    lines.append(f"| CTA | {colors.get('cta', '')} |")
-    lines.append(f"| Background | {colors.get('background', '')} |")
-    lines.append(f"| Text | {colors.get('text', '')} |")
+def _markdown_colors(design_system: dict) -> str:
+    colors = design_system.get("colors", {})
+    out = [f"| Primary | {colors.get('primary', '')} |\n",
+           f"| Secondary | {colors.get('secondary', '')} |\n",
+           f"| CTA | {colors.get('cta', '')} |\n",
+           f"| Background | {colors.get('background', '')} |\n",
+           f"| Text | {colors.get('text', '')} |\n"]
     if colors.get("notes"):
-        lines.append(f"\n*Notes: {colors.get('notes', '')}*")
-    lines.append("")
+        out.append(f"\n*Notes: {colors.get('notes', '')}*\n")
+    return "".join(out)
+
 
-    # Typography section
-    lines.append("### Typography")
-    lines.append(f"- **Heading:** {typography.get('heading', '')}")
-    lines.append(f"- **Body:** {typography.get('body', '')}")
+def _markdown_typography(design_system: dict) -> str:
+    typography = design_system.get("typography", {})
+    out = [f"- **Heading:** {typography.get('heading', '')}\n",
+           f"- **Body:** {typography.get('body', '')}\n"]
     if typography.get("mood"):
-        lines.append(f"- **Mood:** {typography.get('mood', '')}")
+        out.append(f"- **Mood:** {typography.get('mood', '')}\n")
     if typography.get("best_for"):
-        lines.append(f"- **Best For:** {typography.get('best_for', '')}")
+        out.append(f"- **Best For:** {typography.get('best_for', '')}\n")
     if typography.get("google_fonts_url"):
-        lines.append(f"- **Google Fonts:** {typography.get('google_fonts_url', '')}")
+        out.append(f"- **Google Fonts:** {typography.get('google_fonts_url', '')}\n")
     if typography.get("css_import"):
-        lines.append(f"- **CSS Import:**")
-        lines.append(f"```css")
-        lines.append(f"{typography.get('css_import', '')}")
-        lines.append(f"```")
-    lines.append("")
+        out.append(f"- **CSS Import:**\n```css\n{typography.get('css_import', '')}\n```\n")
+    return "".join(out)
 
-    # Key Effects section
-    if effects:
-        lines.append("### Key Effects")
-        lines.append(f"{effects}")
-        lines.append("")
-
-    # Anti-patterns section
-    if anti_patterns:
-        lines.append("### Avoid (Anti-patterns)")
-        newline_bullet = '\n- '
-        lines.append(f"- {anti_patterns.replace(' + ', newline_bullet)}")
-        lines.append("")
-
-    # Pre-Delivery Checklist section
-    lines.append("### Pre-Delivery Checklist")
-    lines.append("- [ ] No emojis as icons (use SVG: Heroicons/Lucide)")
-    lines.append("- [ ] cursor-pointer on all clickable elements")
-    lines.append("- [ ] Hover states with smooth transitions (150-300ms)")
-    lines.append("- [ ] Light mode: text contrast 4.5:1 minimum")
-    lines.append("- [ ] Focus states visible for keyboard nav")
-    lines.append("- [ ] prefers-reduced-motion respected")
-    lines.append("- [ ] Responsive: 375px, 768px, 1024px, 1440px")
-    lines.append("")
 
-    return "\n".join(lines)
+def _markdown_effects(design_system: dict) -> str:
+    effects = design_system.get("key_effects", "")
+    return f"### Key Effects\n{effects}\n\n" if effects else ""
+
+
+def _markdown_anti_patterns(design_system: dict) -> str:
+    anti_patterns = design_system.get("anti_patterns", "")
+    if not anti_patterns:
+        return ""
+    newline_bullet = '\n- '
+    return f"### Avoid (Anti-patterns)\n- {anti_patterns.replace(' + ', newline_bullet)}\n\n"
+
+
+_MARKDOWN_TEMPLATE = Template(
+    lambda ds: f"## Design System: {ds.get('project_name', 'PROJECT')}\n",
+    "\n### Pattern\n",
+    _markdown_pattern,
+    "\n### Style\n",
+    _markdown_style,
+    "\n### Colors\n| Role | Hex |\n|------|-----|\n",
+    _markdown_colors,
+    "\n### Typography\n",
+    _markdown_typography,
+    "\n",
+    _markdown_effects,
+    _markdown_anti_patterns,
+    "### Pre-Delivery Checklist\n"
+    "- [ ] No emojis as icons (use SVG: Heroicons/Lucide)\n"
+    "- [ ] cursor-pointer on all clickable elements\n"
+    "- [ ] Hover states with smooth transitions (150-300ms)\n"
+    "- [ ] Light mode: text contrast 4.5:1 minimum\n"
+    "- [ ] Focus states visible for keyboard nav\n"
+    "- [ ] prefers-reduced-motion respected\n"
+    "- [ ] Responsive: 375px, 768px, 1024px, 1440px\n"
+    "\n"
+)
+
+
+def format_markdown(design_system: dict) -> str:
+    """Format design system as markdown."""
+    return _MARKDOWN_TEMPLATE.render_str(design_system)
+
+
+def render_design_system(design_system: dict, stream, output_format: str = "ascii"):
+    """Stream a formatted design system ("ascii", "markdown" or "master") into a text stream."""
+    template = {"ascii": _ASCII_TEMPLATE, "markdown": _MARKDOWN_TEMPLATE, "master": _MASTER_TEMPLATE}[output_format]
+    template.render(design_system, stream.write)
+
+
+# ============ RESULT CACHE ============
+# (size, mtime_ns, sha256) per file, so each file version is hashed once per process
+_FILE_DIGESTS = {}
+
+
+def _file_digest(path: Path) -> str:
+    try:
+        stat = path.stat()
+    except OSError:
+        return "missing"
+    cached = _FILE_DIGESTS.get(path)
+    if cached is None or cached[:2] != (stat.st_size, stat.st_mtime_ns):
+        with open(path, 'rb') as f:
+            cached = _FILE_DIGESTS[path] = (stat.st_size, stat.st_mtime_ns, hashlib.sha256(f.read()).hexdigest())
+    return cached[2]
+
+
+def data_version() -> str:
+    """Combined hash of every file a generated design system depends on (data and generator code)."""
+    files = ([DATA_DIR / CSV_CONFIG[domain]["file"] for domain in SEARCH_CONFIG] + [DATA_DIR / REASONING_FILE] +
+             [Path(__file__).resolve(), Path(__file__).resolve().with_name("core.py")])
+    combined = hashlib.sha256()
+    for path in files:
+        combined.update(f"{path.name}:{_file_digest(path)}\n".encode('utf-8'))
+    return combined.hexdigest()
+
+
+class DesignSystemCache:
+    """
+    Disk-backed LRU cache of generated design-system dicts, one JSON file per entry.
+
+    Hits refresh the entry's mtime; writes evict the least recently used entries past
+    max_entries / max_bytes. An unwritable directory just means every lookup misses.
+    """
+
+    def __init__(self, directory: Path = None, max_entries: int = DESIGN_CACHE_MAX_ENTRIES,
+                 max_bytes: int = DESIGN_CACHE_MAX_BYTES):
+        self.directory = Path(directory or DESIGN_CACHE_DIR)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query: str, project_name: str = None, version: str = None) -> str:
+        normalized = " ".join(query.lower().split())
+        payload = json.dumps([DESIGN_CACHE_VERSION, normalized, project_name or "", version or data_version()])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return value
+
+    def put(self, key: str, value: dict):
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            _atomic_write(self._path(key), json.dumps(value, ensure_ascii=False, separators=(",", ":")))
+            with self._lock:
+                self._evict()
+        except OSError:
+            pass
+
+    def _evict(self):
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        entries.sort(reverse=True)
+        total = 0
+        for i, (_, size, path) in enumerate(entries):
+            total += size
+            if i >= self.max_entries or total > self.max_bytes:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def clear(self) -> int:
+        """Remove every entry; returns the number removed."""
+        removed = 0
+        for path in self.directory.glob("*.json"):
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+_DESIGN_CACHE = None
+
+
+def design_cache() -> DesignSystemCache:
+    global _DESIGN_CACHE
+    if _DESIGN_CACHE is None or _DESIGN_CACHE.directory != DESIGN_CACHE_DIR:
+        _DESIGN_CACHE = DesignSystemCache()
+    return _DESIGN_CACHE
+
+
+def generate_with_sources(query: str, project_name: str = None, use_cache: bool = True) -> tuple:
+    """(design_system, {domain: row ids}) served from the disk cache when the inputs are unchanged."""
+    cache = design_cache() if use_cache else None
+    key = cache.key(query, project_name) if cache else None
+    entry = cache.get(key) if cache else None
+    if entry is None:
+        generator = DesignSystemGenerator()
+        entry = {"design_system": generator.generate(query, project_name), "sources": generator.sources}
+        if cache:
+            cache.put(key, entry)
+    design_system = entry["design_system"]
+    # The default project name echoes the query as typed, which normalization hides
+    design_system["project_name"] = project_name or query.upper()
+    return design_system, entry["sources"]
+
+
+def cached_generate(query: str, project_name: str = None, use_cache: bool = True) -> dict:
+    """DesignSystemGenerator().generate, served from the disk cache when the inputs are unchanged."""
+    return generate_with_sources(query, project_name, use_cache)[0]
 
 
 # ============ MAIN ENTRY POINT ============
 def generate_design_system(query: str, project_name: str = None, output_format: str = "ascii", 
-                           persist: bool = False, page: str = None, output_dir: str = None) -> str:
+                           persist: bool = False, page: str = None, output_dir: str = None,
+                           pages: list = None, use_cache: bool = True) -> str:
     """
     Main entry point for design system generation.
 
@@ -471,16 +905,17 @@ def generate_design_system(query: str, project_name: str = None, output_format:
         persist: If True, save design system to design-system/ folder
         page: Optional page name for page-specific override file
         output_dir: Optional output directory (defaults to current working directory)
+        pages: Optional list of further page names, all generated in one pass
+        use_cache: Serve repeat generations from the disk cache (see DesignSystemCache)
 
     Returns:
         Formatted design system string
     """
-    generator = DesignSystemGenerator()
-    design_system = generator.generate(query, project_name)
+    design_system, sources = generate_with_sources(query, project_name, use_cache)
     
     # Persist to files if requested
     if persist:
-        persist_design_system(design_system, page, output_dir, query)
+        persist_design_system(design_system, page, output_dir, query, pages, sources)
 
     if output_format == "markdown":
         return format_markdown(design_system)
@@ -488,7 +923,12 @@ def generate_design_system(query: str, project_name: str = None, output_format:
 
 
 # ============ PERSISTENCE FUNCTIONS ============
-def persist_design_system(design_system: dict, page: str = None, output_dir: str = None, page_query: str = None) -> dict:
+def _slug(name: str) -> str:
+    return name.lower().replace(' ', '-')
+
+
+def persist_design_system(design_system: dict, page: str = None, output_dir: str = None, page_query: str = None,
+                          pages: list = None, sources: dict = None, master: bool = True) -> dict:
     """
     Persist design system to design-system/<project>/ folder using Master + Overrides pattern.
     
@@ -497,15 +937,27 @@ def persist_design_system(design_system: dict, page: str = None, output_dir: str
         page: Optional page name for page-specific override file
         output_dir: Optional output directory (defaults to current working directory)
         page_query: Optional query string for intelligent page override generation
+        pages: Optional list of further page names; MASTER.md is still written once and
+            the page searches run batched per domain
+        sources: Optional {domain: row ids} from the generator (see generate_with_sources);
+            when given with page_query, a .sources.json sidecar records the query, data files
+            and rows MASTER.md and each written page were built from, so --refresh can rebuild
+            them when those change. Pages persisted by earlier runs keep their own records.
+        master: Write MASTER.md (False regenerates only the given pages)
+    
+    Files whose content (ignoring the timestamp) is unchanged are left untouched; the
+    rest are written atomically and their hashes kept in design-system/<project>/.hashes.json.
+    Files edited by hand since they were written are skipped with a warning.
     
     Returns:
-        dict with created file paths and status
+        dict with status and file paths (created_files = written + unchanged, written_files,
+        unchanged_files, skipped_files = edited by hand)
     """
     base_dir = Path(output_dir) if output_dir else Path.cwd()
     
     # Use project name for project-specific folder
     project_name = design_system.get("project_name", "default")
-    project_slug = project_name.lower().replace(' ', '-')
+    project_slug = _slug(project_name)
     
     design_system_dir = base_dir / "design-system" / project_slug
     pages_dir = design_system_dir / "pages"
@@ -517,299 +969,471 @@ def persist_design_system(design_system: dict, page: str = None, output_dir: str
     pages_dir.mkdir(parents=True, exist_ok=True)
     
     master_file = design_system_dir / "MASTER.md"
+    hashes = _load_hashes(design_system_dir)
+    saved_hashes = dict(hashes)
+    written_files = []
+    skipped_files = []
+    
+    def write(path, content):
+        status = _write_if_changed(design_system_dir, path, content, hashes)
+        if status == "edited":
+            skipped_files.append(str(path))
+            print(f"Warning: {path} was edited since it was generated; left as is (delete it to regenerate)",
+                  file=sys.stderr)
+            return False
+        if status == "written":
+            written_files.append(str(path))
+        created_files.append(str(path))
+        return True
     
-    # Generate and write MASTER.md
-    master_content = format_master_md(design_system)
-    with open(master_file, 'w', encoding='utf-8') as f:
-        f.write(master_content)
-    created_files.append(str(master_file))
+    # Generate and write MASTER.md (skipped when only the timestamp would change)
+    master_kept = master and write(master_file, format_master_md(design_system))
     
-    # If page is specified, create page override file with intelligent content
-    if page:
-        page_file = pages_dir / f"{page.lower().replace(' ', '-')}.md"
-        page_content = format_page_override_md(design_system, page, page_query)
-        with open(page_file, 'w', encoding='utf-8') as f:
-            f.write(page_content)
-        created_files.append(str(page_file))
+    # Create page override files with intelligent content, one per distinct page slug
+    page_files = {}
+    for name in ([page] if page else []) + list(pages or []):
+        page_files.setdefault(pages_dir / f"{_slug(name)}.md", name)
+    names = list(page_files.values())
+    searches = _page_override_searches(names, page_query) if names else []
+    if len(names) > 1:
+        contents = list(_fanout_pool().map(format_page_override_md, [design_system] * len(names), names,
+                                           [page_query] * len(names), searches))
+    else:
+        contents = [format_page_override_md(design_system, names[0], page_query, searches[0])] if names else []
+    kept = [write(page_file, page_content) for page_file, page_content in zip(page_files, contents)]
+    
+    if hashes != saved_hashes:
+        _save_hashes(design_system_dir, hashes)
+    if sources is not None and page_query:
+        # Only what this call wrote (or found current) is re-recorded under this query
+        sidecar = _load_sources(design_system_dir) or {}
+        recorded = {name: entry for name, entry in sidecar.get("pages", {}).items()
+                    if not any(_slug(name) == _slug(other) for other, ok in zip(names, kept) if ok)}
+        for name, search, ok in zip(names, searches, kept):
+            if ok:
+                recorded[name] = {"query": page_query, "files": _file_sources(sources, [search])}
+        if master_kept or not sidecar:
+            sidecar.update(query=page_query, project_name=design_system.get("project_name"),
+                           files=_file_sources(sources, []))
+        _save_sources(design_system_dir, dict(sidecar, pages=recorded))
     
     return {
         "status": "success",
         "design_system_dir": str(design_system_dir),
-        "created_files": created_files
+        "created_files": created_files,
+        "written_files": written_files,
+        "unchanged_files": [path for path in created_files if path not in written_files],
+        "skipped_files": skipped_files
     }
 
 
-def format_master_md(design_system: dict) -> str:
-    """Format design system as MASTER.md with hierarchical override logic."""
-    project = design_system.get("project_name", "PROJECT")
-    pattern = design_system.get("pattern", {})
-    style = design_system.get("style", {})
-    colors = design_system.get("colors", {})
-    typography = design_system.get("typography", {})
-    effects = design_system.get("key_effects", "")
-    anti_patterns = design_system.get("anti_patterns", "")
-    
+# Per-project record of persisted content hashes, next to MASTER.md
+HASH_MANIFEST = ".hashes.json"
+HASH_MANIFEST_VERSION = 1
+# The generation timestamp alone never counts as a change
+_TIMESTAMP_LINE = re.compile(r"^(>? ?\*\*Generated:\*\*).*$", re.MULTILINE)
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 of persisted content with its "Generated:" timestamp blanked out."""
+    return hashlib.sha256(_TIMESTAMP_LINE.sub(r"\1", content).encode('utf-8')).hexdigest()
+
+
+def _atomic_write(path: Path, content: str):
+    """Write through a temp file in the same directory and rename it over path."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}-")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _load_hashes(design_system_dir: Path) -> dict:
+    try:
+        with open(design_system_dir / HASH_MANIFEST, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data.get("files", {}) if data.get("version") == HASH_MANIFEST_VERSION else {}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def _save_hashes(design_system_dir: Path, hashes: dict):
+    _atomic_write(design_system_dir / HASH_MANIFEST,
+                  json.dumps({"version": HASH_MANIFEST_VERSION, "files": hashes}, indent=2, sort_keys=True) + "\n")
+
+
+def _write_if_changed(design_system_dir: Path, path: Path, content: str, hashes: dict) -> str:
+    """
+    Atomically write content unless the file already holds it (timestamp aside).
+
+    The manifest's size and mtime vouch for the file without reading it; otherwise the
+    file is read and compared. A file that no longer matches the hash recorded when it
+    was written has been edited since, and is left alone.
+    Returns "written", "unchanged" or "edited".
+    """
+    key = path.relative_to(design_system_dir).as_posix()
+    digest = content_hash(content)
+    entry = hashes.get(key) or {}
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        stat = None
+    if stat is not None:
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            if entry.get("sha256") == digest:
+                return "unchanged"
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                on_disk = content_hash(f.read())
+            if on_disk == digest:
+                hashes[key] = {"sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+                return "unchanged"
+            if entry and on_disk != entry.get("sha256"):
+                return "edited"
+    _atomic_write(path, content)
+    stat = path.stat()
+    hashes[key] = {"sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    return "written"
+
+
+# Per-project record of the inputs a persisted design system was built from
+SOURCES_MANIFEST = ".sources.json"
+SOURCES_MANIFEST_VERSION = 2
+
+
+@manifest_batch()
+def _file_sources(sources: dict, page_searches: list) -> dict:
+    """
+    {data file: {"sha256", "rows", "rows_sha256"}} for the rows behind a project.
+
+    Covers the generator's domain searches and every page's override searches; the
+    reasoning and page rule files are recorded whole ("rows": None), since any rule may apply.
+    """
+    used = {}
+    for domain, ids in list(sources.items()) + [(domain, result.get("ids", []))
+                                                 for searches in page_searches
+                                                 for domain, result in searches.items()]:
+        used.setdefault(domain, set()).update(ids)
+    files = {}
+    for domain in sorted(used):
+        config = CSV_CONFIG[domain]
+        filepath = DATA_DIR / config["file"]
+        if not filepath.exists():
+            continue
+        data, _, _ = _get_index(filepath, config["search_cols"])
+        ids = sorted(i for i in used[domain] if i < len(data))
+        rows = json.dumps([data[i] for i in ids], ensure_ascii=False, sort_keys=True)
+        files[config["file"]] = {"sha256": _file_digest(filepath), "rows": ids,
+                                 "rows_sha256": hashlib.sha256(rows.encode('utf-8')).hexdigest()}
+    files[REASONING_FILE] = {"sha256": _file_digest(DATA_DIR / REASONING_FILE), "rows": None}
+    if page_searches:
+        files[PAGE_RULES_FILE] = {"sha256": _file_digest(DATA_DIR / PAGE_RULES_FILE), "rows": None}
+    return files
+
+
+def _valid_sources(data) -> bool:
+    """Structural check of a .sources.json sidecar: the project's query and files, and per page its own."""
+    def record(entry):
+        return (isinstance(entry, dict) and isinstance(entry.get("query"), str) and bool(entry["query"])
+                and isinstance(entry.get("files"), dict) and all(isinstance(f, dict) for f in entry["files"].values()))
+    return (record(data) and data.get("version") == SOURCES_MANIFEST_VERSION
+            and isinstance(data.get("project_name"), str) and isinstance(data.get("pages"), dict)
+            and all(record(entry) for entry in data["pages"].values()))
+
+
+def _load_sources(design_system_dir: Path) -> dict:
+    """The project's sidecar; None when missing, unreadable or not in the current format."""
+    try:
+        with open(design_system_dir / SOURCES_MANIFEST, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if _valid_sources(data) else None
+
+
+def _save_sources(design_system_dir: Path, manifest: dict):
+    content = json.dumps(dict(manifest, version=SOURCES_MANIFEST_VERSION), indent=2, sort_keys=True) + "\n"
+    if _load_sources(design_system_dir) != json.loads(content):
+        _atomic_write(design_system_dir / SOURCES_MANIFEST, content)
+
+
+def _master_header(design_system: dict) -> str:
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    lines = []
-    
-    # Logic header
-    lines.append("# Design System Master File")
-    lines.append("")
-    lines.append("> **LOGIC:** When building a specific page, first check `design-system/pages/[page-name].md`.")
-    lines.append("> If that file exists, its rules **override** this Master file.")
-    lines.append("> If not, strictly follow the rules below.")
-    lines.append("")
-    lines.append("---")
-    lines.append("")
-    lines.append(f"**Project:** {project}")
-    lines.append(f"**Generated:** {timestamp}")
-    lines.append(f"**Category:** {design_system.get('category', 'General')}")
-    lines.append("")
-    lines.append("---")
-    lines.append("")
-    
-    # Global Rules section
-    lines.append("## Global Rules")
-    lines.append("")
-    
-    # Color Palette
-    lines.append("### Color Palette")
-    lines.append("")
-    lines.append("| Role | Hex | CSS Variable |")
-    lines.append("|------|-----|--------------|")
-    lines.append(f"| Primary | `{colors.get('primary', '#2563EB')}` | `--color-primary` |")
-    lines.append(f"| Secondary | `{colors.get('secondary', '#3B82F6')}` | `--color-secondary` |")
-    lines.append(f"| CTA/Accent | `{colors.get('cta', '#F97316')}` | `--color-cta` |")
-    lines.append(f"| Background | `{colors.get('background', '#F8FAFC')}` | `--color-background` |")
-    lines.append(f"| Text | `{colors.get('text', '#1E293B')}` | `--color-text` |")
-    lines.append("")
+    return (f"**Project:** {design_system.get('project_name', 'PROJECT')}\n"
+            f"**Generated:** {timestamp}\n"
+            f"**Category:** {design_system.get('category', 'General')}\n")
+
+
+def _master_colors(design_system: dict) -> str:
+    colors = design_system.get("colors", {})
+    out = [f"| Primary | `{colors.get('primary', '#2563EB')}` | `--color-primary` |\n",
+           f"| Secondary | `{colors.get('secondary', '#3B82F6')}` | `--color-secondary` |\n",
+           f"| CTA/Accent | `{colors.get('cta', '#F97316')}` | `--color-cta` |\n",
+           f"| Background | `{colors.get('background', '#F8FAFC')}` | `--color-background` |\n",
+           f"| Text | `{colors.get('text', '#1E293B')}` | `--color-text` |\n",
+           "\n"]
     if colors.get("notes"):
-        lines.append(f"**Color Notes:** {colors.get('notes', '')}")
-        lines.append("")
-    
-    # Typography
-    lines.append("### Typography")
-    lines.append("")
-    lines.append(f"- **Heading Font:** {typography.get('heading', 'Inter')}")
-    lines.append(f"- **Body Font:** {typography.get('body', 'Inter')}")
+        out.append(f"**Color Notes:** {colors.get('notes', '')}\n\n")
+    return "".join(out)
+
+
+def _master_typography(design_system: dict) -> str:
+    typography = design_system.get("typography", {})
+    out = [f"- **Heading Font:** {typography.get('heading', 'Inter')}\n",
+           f"- **Body Font:** {typography.get('body', 'Inter')}\n"]
     if typography.get("mood"):
-        lines.append(f"- **Mood:** {typography.get('mood', '')}")
+        out.append(f"- **Mood:** {typography.get('mood', '')}\n")
     if typography.get("google_fonts_url"):
-        lines.append(f"- **Google Fonts:** [{typography.get('heading', '')} + {typography.get('body', '')}]({typography.get('google_fonts_url', '')})")
-    lines.append("")
+        out.append(f"- **Google Fonts:** [{typography.get('heading', '')} + {typography.get('body', '')}]"
+                   f"({typography.get('google_fonts_url', '')})\n")
+    out.append("\n")
     if typography.get("css_import"):
-        lines.append("**CSS Import:**")
-        lines.append("```css")
-        lines.append(typography.get("css_import", ""))
-        lines.append("```")
-        lines.append("")
-    
-    # Spacing Variables
-    lines.append("### Spacing Variables")
-    lines.append("")
-    lines.append("| Token | Value | Usage |")
-    lines.append("|-------|-------|-------|")
-    lines.append("| `--space-xs` | `4px` / `0.25rem` | Tight gaps |")
-    lines.append("| `--space-sm` | `8px` / `0.5rem` | Icon gaps, inline spacing |")
-    lines.append("| `--space-md` | `16px` / `1rem` | Standard padding |")
-    lines.append("| `--space-lg` | `24px` / `1.5rem` | Section padding |")
-    lines.append("| `--space-xl` | `32px` / `2rem` | Large gaps |")
-    lines.append("| `--space-2xl` | `48px` / `3rem` | Section margins |")
-    lines.append("| `--space-3xl` | `64px` / `4rem` | Hero padding |")
-    lines.append("")
-    
-    # Shadow Depths
-    lines.append("### Shadow Depths")
-    lines.append("")
-    lines.append("| Level | Value | Usage |")
-    lines.append("|-------|-------|-------|")
-    lines.append("| `--shadow-sm` | `0 1px 2px rgba(0,0,0,0.05)` | Subtle lift |")
-    lines.append("| `--shadow-md` | `0 4px 6px rgba(0,0,0,0.1)` | Cards, buttons |")
-    lines.append("| `--shadow-lg` | `0 10px 15px rgba(0,0,0,0.1)` | Modals, dropdowns |")
-    lines.append("| `--shadow-xl` | `0 20px 25px rgba(0,0,0,0.15)` | Hero images, featured cards |")
-    lines.append("")
-    
-    # Component Specs section
-    lines.append("---")
-    lines.append("")
-    lines.append("## Component Specs")
-    lines.append("")
-    
-    # Buttons
-    lines.append("### Buttons")
-    lines.append("")
-    lines.append("```css")
-    lines.append("/* Primary Button */")
-    lines.append(".btn-primary {")
-    lines.append(f"  background: {colors.get('cta', '#F97316')};")
-    lines.append("  color: white;")
-    lines.append("  padding: 12px 24px;")
-    lines.append("  border-radius: 8px;")
-    lines.append("  font-weight: 600;")
-    lines.append("  transition: all 200ms ease;")
-    lines.append("  cursor: pointer;")
-    lines.append("}")
-    lines.append("")
-    lines.append(".btn-primary:hover {")
-    lines.append("  opacity: 0.9;")
-    lines.append("  transform: translateY(-1px);")
-    lines.append("}")
-    lines.append("")
-    lines.append("/* Secondary Button */")
-    lines.append(".btn-secondary {")
-    lines.append(f"  background: transparent;")
-    lines.append(f"  color: {colors.get('primary', '#2563EB')};")
-    lines.append(f"  border: 2px solid {colors.get('primary', '#2563EB')};")
-    lines.append("  padding: 12px 24px;")
-    lines.append("  border-radius: 8px;")
-    lines.append("  font-weight: 600;")
-    lines.append("  transition: all 200ms ease;")
-    lines.append("  cursor: pointer;")
-    lines.append("}")
-    lines.append("```")
-    lines.append("")
-    
-    # Cards
-    lines.append("### Cards")
-    lines.append("")
-    lines.append("```css")
-    lines.append(".card {")
-    lines.append(f"  background: {colors.get('background', '#FFFFFF')};")
-    lines.append("  border-radius: 12px;")
-    lines.append("  padding: 24px;")
-    lines.append("  box-shadow: var(--shadow-md);")
-    lines.append("  transition: all 200ms ease;")
-    lines.append("  cursor: pointer;")
-    lines.append("}")
-    lines.append("")
-    lines.append(".card:hover {")
-    lines.append("  box-shadow: var(--shadow-lg);")
-    lines.append("  transform: translateY(-2px);")
-    lines.append("}")
-    lines.append("```")
-    lines.append("")
-    
-    # Inputs
-    lines.append("### Inputs")
-    lines.append("")
-    lines.append("```css")
-    lines.append(".input {")
-    lines.append("  padding: 12px 16px;")
-    lines.append("  border: 1px solid #E2E8F0;")
-    lines.append("  border-radius: 8px;")
-    lines.append("  font-size: 16px;")
-    lines.append("  transition: border-color 200ms ease;")
-    lines.append("}")
-    lines.append("")
-    lines.append(".input:focus {")
-    lines.append(f"  border-color: {colors.get('primary', '#2563EB')};")
-    lines.append("  outline: none;")
-    lines.append(f"  box-shadow: 0 0 0 3px {colors.get('primary', '#2563EB')}20;")
-    lines.append("}")
-    lines.append("```")
-    lines.append("")
-    
-    # Modals
-    lines.append("### Modals")
-    lines.append("")
-    lines.append("```css")
-    lines.append(".modal-overlay {")
-    lines.append("  background: rgba(0, 0, 0, 0.5);")
-    lines.append("  backdrop-filter: blur(4px);")
-    lines.append("}")
-    lines.append("")
-    lines.append(".modal {")
-    lines.append("  background: white;")
-    lines.append("  border-radius: 16px;")
-    lines.append("  padding: 32px;")
-    lines.append("  box-shadow: var(--shadow-xl);")
-    lines.append("  max-width: 500px;")
-    lines.append("  width: 90%;")
-    lines.append("}")
-    lines.append("```")
-    lines.append("")
-    
-    # Style section
-    lines.append("---")
-    lines.append("")
-    lines.append("## Style Guidelines")
-    lines.append("")
-    lines.append(f"**Style:** {style.get('name', 'Minimalism')}")
-    lines.append("")
+        out.append(f"**CSS Import:**\n```css\n{typography.get('css_import', '')}\n```\n\n")
+    return "".join(out)
+
+
+def _master_buttons(design_system: dict) -> str:
+    colors = design_system.get("colors", {})
+    primary = colors.get('primary', '#2563EB')
+    return (f"  background: {colors.get('cta', '#F97316')};\n"
+            "  color: white;\n"
+            "  padding: 12px 24px;\n"
+            "  border-radius: 8px;\n"
+            "  font-weight: 600;\n"
+            "  transition: all 200ms ease;\n"
+            "  cursor: pointer;\n"
+            "}\n"
+            "\n"
+            ".btn-primary:hover {\n"
+            "  opacity: 0.9;\n"
+            "  transform: translateY(-1px);\n"
+            "}\n"
+            "\n"
+            "/* Secondary Button */\n"
+            ".btn-secondary {\n"
+            "  background: transparent;\n"
+            f"  color: {primary};\n"
+            f"  border: 2px solid {primary};\n")
+
+
+def _master_style(design_system: dict) -> str:
+    style = design_system.get("style", {})
+    effects = design_system.get("key_effects", "")
+    out = [f"**Style:** {style.get('name', 'Minimalism')}\n\n"]
     if style.get("keywords"):
-        lines.append(f"**Keywords:** {style.get('keywords', '')}")
-        lines.append("")
+        out.append(f"**Keywords:** {style.get('keywords', '')}\n\n")
     if style.get("best_for"):
-        lines.append(f"**Best For:** {style.get('best_for', '')}")
-        lines.append("")
+        out.append(f"**Best For:** {style.get('best_for', '')}\n\n")
     if effects:
-        lines.append(f"**Key Effects:** {effects}")
-        lines.append("")
-    
-    # Layout Pattern
-    lines.append("### Page Pattern")
-    lines.append("")
-    lines.append(f"**Pattern Name:** {pattern.get('name', '')}")
-    lines.append("")
+        out.append(f"**Key Effects:** {effects}\n\n")
+    return "".join(out)
+
+
+def _master_pattern(design_system: dict) -> str:
+    pattern = design_system.get("pattern", {})
+    out = [f"**Pattern Name:** {pattern.get('name', '')}\n\n"]
     if pattern.get('conversion'):
-        lines.append(f"- **Conversion Strategy:** {pattern.get('conversion', '')}")
+        out.append(f"- **Conversion Strategy:** {pattern.get('conversion', '')}\n")
     if pattern.get('cta_placement'):
-        lines.append(f"- **CTA Placement:** {pattern.get('cta_placement', '')}")
-    lines.append(f"- **Section Order:** {pattern.get('sections', '')}")
-    lines.append("")
-    
+        out.append(f"- **CTA Placement:** {pattern.get('cta_placement', '')}\n")
+    out.append(f"- **Section Order:** {pattern.get('sections', '')}\n")
+    return "".join(out)
+
+
+def _master_anti_patterns(design_system: dict) -> str:
+    anti_patterns = design_system.get("anti_patterns", "")
+    if not anti_patterns:
+        return ""
+    return "".join(f"- ❌ {anti}\n" for anti in (a.strip() for a in anti_patterns.split("+")) if anti)
+
+
+_MASTER_TEMPLATE = Template(
+    # Logic header
+    "# Design System Master File\n"
+    "\n"
+    "> **LOGIC:** When building a specific page, first check `design-system/pages/[page-name].md`.\n"
+    "> If that file exists, its rules **override** this Master file.\n"
+    "> If not, strictly follow the rules below.\n"
+    "\n"
+    "---\n"
+    "\n",
+    _master_header,
+    "\n"
+    "---\n"
+    "\n"
+    "## Global Rules\n"
+    "\n"
+    "### Color Palette\n"
+    "\n"
+    "| Role | Hex | CSS Variable |\n"
+    "|------|-----|--------------|\n",
+    _master_colors,
+    "### Typography\n"
+    "\n",
+    _master_typography,
+    "### Spacing Variables\n"
+    "\n"
+    "| Token | Value | Usage |\n"
+    "|-------|-------|-------|\n"
+    "| `--space-xs` | `4px` / `0.25rem` | Tight gaps |\n"
+    "| `--space-sm` | `8px` / `0.5rem` | Icon gaps, inline spacing |\n"
+    "| `--space-md` | `16px` / `1rem` | Standard padding |\n"
+    "| `--space-lg` | `24px` / `1.5rem` | Section padding |\n"
+    "| `--space-xl` | `32px` / `2rem` | Large gaps |\n"
+    "| `--space-2xl` | `48px` / `3rem` | Section margins |\n"
+    "| `--space-3xl` | `64px` / `4rem` | Hero padding |\n"
+    "\n"
+    "### Shadow Depths\n"
+    "\n"
+    "| Level | Value | Usage |\n"
+    "|-------|-------|-------|\n"
+    "| `--shadow-sm` | `0 1px 2px rgba(0,0,0,0.05)` | Subtle lift |\n"
+    "| `--shadow-md` | `0 4px 6px rgba(0,0,0,0.1)` | Cards, buttons |\n"
+    "| `--shadow-lg` | `0 10px 15px rgba(0,0,0,0.1)` | Modals, dropdowns |\n"
+    "| `--shadow-xl` | `0 20px 25px rgba(0,0,0,0.15)` | Hero images, featured cards |\n"
+    "\n"
+    # Component Specs section
+    "---\n"
+    "\n"
+    "## Component Specs\n"
+    "\n"
+    "### Buttons\n"
+    "\n"
+    "```css\n"
+    "/* Primary Button */\n"
+    ".btn-primary {\n",
+    _master_buttons,
+    "  padding: 12px 24px;\n"
+    "  border-radius: 8px;\n"
+    "  font-weight: 600;\n"
+    "  transition: all 200ms ease;\n"
+    "  cursor: pointer;\n"
+    "}\n"
+    "```\n"
+    "\n"
+    "### Cards\n"
+    "\n"
+    "```css\n"
+    ".card {\n",
+    lambda ds: f"  background: {ds.get('colors', {}).get('background', '#FFFFFF')};\n",
+    "  border-radius: 12px;\n"
+    "  padding: 24px;\n"
+    "  box-shadow: var(--shadow-md);\n"
+    "  transition: all 200ms ease;\n"
+    "  cursor: pointer;\n"
+    "}\n"
+    "\n"
+    ".card:hover {\n"
+    "  box-shadow: var(--shadow-lg);\n"
+    "  transform: translateY(-2px);\n"
+    "}\n"
+    "```\n"
+    "\n"
+    "### Inputs\n"
+    "\n"
+    "```css\n"
+    ".input {\n"
+    "  padding: 12px 16px;\n"
+    "  border: 1px solid #E2E8F0;\n"
+    "  border-radius: 8px;\n"
+    "  font-size: 16px;\n"
+    "  transition: border-color 200ms ease;\n"
+    "}\n"
+    "\n"
+    ".input:focus {\n",
+    lambda ds: f"  border-color: {ds.get('colors', {}).get('primary', '#2563EB')};\n",
+    "  outline: none;\n",
+    lambda ds: f"  box-shadow: 0 0 0 3px {ds.get('colors', {}).get('primary', '#2563EB')}20;\n",
+    "}\n"
+    "```\n"
+    "\n"
+    "### Modals\n"
+    "\n"
+    "```css\n"
+    ".modal-overlay {\n"
+    "  background: rgba(0, 0, 0, 0.5);\n"
+    "  backdrop-filter: blur(4px);\n"
+    "}\n"
+    "\n"
+    ".modal {\n"
+    "  background: white;\n"
+    "  border-radius: 16px;\n"
+    "  padding: 32px;\n"
+    "  box-shadow: var(--shadow-xl);\n"
+    "  max-width: 500px;\n"
+    "  width: 90%;\n"
+    "}\n"
+    "```\n"
+    "\n"
+    # Style section
+    "---\n"
+    "\n"
+    "## Style Guidelines\n"
+    "\n",
+    _master_style,
+    # Layout Pattern
+    "### Page Pattern\n"
+    "\n",
+    _master_pattern,
+    "\n"
     # Anti-Patterns section
-    lines.append("---")
-    lines.append("")
-    lines.append("## Anti-Patterns (Do NOT Use)")
-    lines.append("")
-    if anti_patterns:
-        anti_list = [a.strip() for a in anti_patterns.split("+")]
-        for anti in anti_list:
-            if anti:
-                lines.append(f"- ❌ {anti}")
-    lines.append("")
-    lines.append("### Additional Forbidden Patterns")
-    lines.append("")
-    lines.append("- ❌ **Emojis as icons** — Use SVG icons (Heroicons, Lucide, Simple Icons)")
-    lines.append("- ❌ **Missing cursor:pointer** — All clickable elements must have cursor:pointer")
-    lines.append("- ❌ **Layout-shifting hovers** — Avoid scale transforms that shift layout")
-    lines.append("- ❌ **Low contrast text** — Maintain 4.5:1 minimum contrast ratio")
-    lines.append("- ❌ **Instant state changes** — Always use transitions (150-300ms)")
-    lines.append("- ❌ **Invisible focus states** — Focus states must be visible for a11y")
-    lines.append("")
-    
+    "---\n"
+    "\n"
+    "## Anti-Patterns (Do NOT Use)\n"
+    "\n",
+    _master_anti_patterns,
+    "\n"
+    "### Additional Forbidden Patterns\n"
+    "\n"
+    "- ❌ **Emojis as icons** — Use SVG icons (Heroicons, Lucide, Simple Icons)\n"
+    "- ❌ **Missing cursor:pointer** — All clickable elements must have cursor:pointer\n"
+    "- ❌ **Layout-shifting hovers** — Avoid scale transforms that shift layout\n"
+    "- ❌ **Low contrast text** — Maintain 4.5:1 minimum contrast ratio\n"
+    "- ❌ **Instant state changes** — Always use transitions (150-300ms)\n"
+    "- ❌ **Invisible focus states** — Focus states must be visible for a11y\n"
+    "\n"
     # Pre-Delivery Checklist
-    lines.append("---")
-    lines.append("")
-    lines.append("## Pre-Delivery Checklist")
-    lines.append("")
-    lines.append("Before delivering any UI code, verify:")
-    lines.append("")
-    lines.append("- [ ] No emojis used as icons (use SVG instead)")
-    lines.append("- [ ] All icons from consistent icon set (Heroicons/Lucide)")
-    lines.append("- [ ] `cursor-pointer` on all clickable elements")
-    lines.append("- [ ] Hover states with smooth transitions (150-300ms)")
-    lines.append("- [ ] Light mode: text contrast 4.5:1 minimum")
-    lines.append("- [ ] Focus states visible for keyboard navigation")
-    lines.append("- [ ] `prefers-reduced-motion` respected")
-    lines.append("- [ ] Responsive: 375px, 768px, 1024px, 1440px")
-    lines.append("- [ ] No content hidden behind fixed navbars")
-    lines.append("- [ ] No horizontal scroll on mobile")
-    lines.append("")
-    
-    return "\n".join(lines)
+    "---\n"
+    "\n"
+    "## Pre-Delivery Checklist\n"
+    "\n"
+    "Before delivering any UI code, verify:\n"
+    "\n"
+    "- [ ] No emojis used as icons (use SVG instead)\n"
+    "- [ ] All icons from consistent icon set (Heroicons/Lucide)\n"
+    "- [ ] `cursor-pointer` on all clickable elements\n"
+    "- [ ] Hover states with smooth transitions (150-300ms)\n"
+    "- [ ] Light mode: text contrast 4.5:1 minimum\n"
+    "- [ ] Focus states visible for keyboard navigation\n"
+    "- [ ] `prefers-reduced-motion` respected\n"
+    "- [ ] Responsive: 375px, 768px, 1024px, 1440px\n"
+    "- [ ] No content hidden behind fixed navbars\n"
+    "- [ ] No horizontal scroll on mobile\n"
+    "\n"
+)
 
 
-def format_page_override_md(design_system: dict, page_name: str, page_query: str = None) -> str:
+def format_master_md(design_system: dict) -> str:
+    """Format design system as MASTER.md with hierarchical override logic."""
+    return _MASTER_TEMPLATE.render_str(design_system)
+
+
+def format_page_override_md(design_system: dict, page_name: str, page_query: str = None,
+                            searches: dict = None) -> str:
     """Format a page-specific override file with intelligent AI-generated content."""
     project = design_system.get("project_name", "PROJECT")
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     page_title = page_name.replace("-", " ").replace("_", " ").title()
     
     # Detect page type and generate intelligent overrides
-    page_overrides = _generate_intelligent_overrides(page_name, page_query, design_system)
+    page_overrides = _generate_intelligent_overrides(page_name, page_query, design_system, searches)
     
     lines = []
     
@@ -911,23 +1535,38 @@ def format_page_override_md(design_system: dict, page_name: str, page_query: str
     return "\n".join(lines)
 
 
-def _generate_intelligent_overrides(page_name: str, page_query: str, design_system: dict) -> dict:
+def _page_context(page_name: str, page_query: str) -> str:
+    return f"{page_name.lower()} {(page_query or '').lower()}"
+
+
+def _page_override_searches(page_names: list, page_query: str = None) -> list:
+    """Run every page's override searches as one batch per domain; one {domain: result} per page."""
+    contexts = [_page_context(name, page_query) for name in page_names]
+    pool = _fanout_pool()
+    with manifest_batch():
+        futures = {domain: pool.submit(search_many, contexts, domain, config["max_results"])
+                   for domain, config in PAGE_SEARCH_CONFIG.items()}
+        by_domain = {domain: future.result() for domain, future in futures.items()}
+    return [{domain: by_domain[domain][i] for domain in PAGE_SEARCH_CONFIG} for i in range(len(page_names))]
+
+
+def _generate_intelligent_overrides(page_name: str, page_query: str, design_system: dict,
+                                    searches: dict = None) -> dict:
     """
     Generate intelligent overrides based on page type using layered search.
     
     Uses the existing search infrastructure to find relevant style, UX, and layout
-    data instead of hardcoded page types.
+    data instead of hardcoded page types. Pass searches (from _page_override_searches)
+    to reuse results already fetched in a batch.
     """
-    from core import search
-    
-    page_lower = page_name.lower()
-    query_lower = (page_query or "").lower()
-    combined_context = f"{page_lower} {query_lower}"
+    combined_context = _page_context(page_name, page_query)
     
     # Search across multiple domains for page-specific guidance
-    style_search = search(combined_context, "style", max_results=1)
-    ux_search = search(combined_context, "ux", max_results=3)
-    landing_search = search(combined_context, "landing", max_results=1)
+    if searches is None:
+        searches = _page_override_searches([page_name], page_query)[0]
+    style_search = searches["style"]
+    ux_search = searches["ux"]
+    landing_search = searches["landing"]
     
     # Extract results from search response
     style_results = style_search.get("results", [])
@@ -935,7 +1574,8 @@ def _generate_intelligent_overrides(page_name: str, page_query: str, design_syst
     landing_results = landing_search.get("results", [])
     
     # Detect page type from search results or context
-    page_type = _detect_page_type(combined_context, style_results)
+    classifier = load_page_rules()
+    page_type = _detect_page_type(combined_context, style_results, classifier)
     
     # Build overrides from search results
     layout = {}
@@ -954,18 +1594,12 @@ def _generate_intelligent_overrides(page_name: str, page_query: str, design_syst
         best_for = style.get("Best For", "")
         effects = style.get("Effects & Animation", "")
         
-        # Infer layout from style keywords
-        if any(kw in keywords.lower() for kw in ["data", "dense", "dashboard", "grid"]):
-            layout["Max Width"] = "1400px or full-width"
-            layout["Grid"] = "12-column grid for data flexibility"
-            spacing["Content Density"] = "High — optimize for information display"
-        elif any(kw in keywords.lower() for kw in ["minimal", "simple", "clean", "single"]):
-            layout["Max Width"] = "800px (narrow, focused)"
-            layout["Layout"] = "Single column, centered"
-            spacing["Content Density"] = "Low — focus on clarity"
-        else:
-            layout["Max Width"] = "1200px (standard)"
-            layout["Layout"] = "Full-width sections, centered content"
+        # Infer layout from style keywords (layout rules in page-rules.csv)
+        layout_rule = classifier.match("layout", keywords)
+        if layout_rule:
+            sections = {"layout": layout, "spacing": spacing, "typography": typography, "colors": colors}
+            for section, values in layout_rule.traits.items():
+                sections[section].update(values)
         
         if effects:
             recommendations.append(f"Effects: {effects}")
@@ -1017,39 +1651,273 @@ def _generate_intelligent_overrides(page_name: str, page_query: str, design_syst
     }
 
 
-def _detect_page_type(context: str, style_results: list) -> str:
-    """Detect page type from context and search results."""
-    context_lower = context.lower()
-    
-    # Check for common page type patterns
-    page_patterns = [
-        (["dashboard", "admin", "analytics", "data", "metrics", "stats", "monitor", "overview"], "Dashboard / Data View"),
-        (["checkout", "payment", "cart", "purchase", "order", "billing"], "Checkout / Payment"),
-        (["settings", "profile", "account", "preferences", "config"], "Settings / Profile"),
-        (["landing", "marketing", "homepage", "hero", "home", "promo"], "Landing / Marketing"),
-        (["login", "signin", "signup", "register", "auth", "password"], "Authentication"),
-        (["pricing", "plans", "subscription", "tiers", "packages"], "Pricing / Plans"),
-        (["blog", "article", "post", "news", "content", "story"], "Blog / Article"),
-        (["product", "item", "detail", "pdp", "shop", "store"], "Product Detail"),
-        (["search", "results", "browse", "filter", "catalog", "list"], "Search Results"),
-        (["empty", "404", "error", "not found", "zero"], "Empty State"),
-    ]
-    
-    for keywords, page_type in page_patterns:
-        if any(kw in context_lower for kw in keywords):
-            return page_type
+def _detect_page_type(context: str, style_results: list, classifier: PageClassifier = None) -> str:
+    """Detect page type from context and search results (page_type rules in page-rules.csv)."""
+    classifier = classifier or load_page_rules()
+    rule = classifier.match("page_type", context)
     
     # Fallback: try to infer from style results
-    if style_results:
-        style_name = style_results[0].get("Style Category", "").lower()
-        best_for = style_results[0].get("Best For", "").lower()
-        
-        if "dashboard" in best_for or "data" in best_for:
-            return "Dashboard / Data View"
-        elif "landing" in best_for or "marketing" in best_for:
-            return "Landing / Marketing"
+    if rule is None and style_results:
+        rule = classifier.match("page_type_fallback", style_results[0].get("Best For", ""))
     
-    return "General"
+    return rule.label if rule else DEFAULT_PAGE_TYPE
+
+
+# ============ BATCH GENERATION ============
+BATCH_FORMATS = ("ascii", "markdown")
+BATCH_EXTENSIONS = {"ascii": ".txt", "markdown": ".md"}
+# Domains a batch touches: the generator's fan-out plus the page-override searches
+BATCH_DOMAINS = list(SEARCH_CONFIG) + ["ux"]
+# Batch workers start from a clean interpreter: forking a process whose index, manifest
+# and fan-out threads may hold locks can deadlock the child
+BATCH_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def _parse_pages(value) -> list:
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [str(page).strip() for page in value if str(page).strip()]
+
+
+def _parse_job(record: dict, line: int) -> dict:
+    query = str(record.get("query") or "").strip()
+    if not query:
+        raise ValueError(f"job {line}: missing query")
+    output_format = record.get("format") or "ascii"
+    if output_format not in BATCH_FORMATS:
+        raise ValueError(f"job {line}: format must be one of: {', '.join(BATCH_FORMATS)}")
+    pages = _parse_pages(record.get("pages") or record.get("page"))
+    persist = record.get("persist")
+    if isinstance(persist, str):
+        persist = persist.strip().lower() in ("1", "true", "yes", "on")
+    return {
+        "line": line,
+        "query": query,
+        "project_name": record.get("project_name") or record.get("project") or None,
+        "pages": pages,
+        "format": output_format,
+        "persist": bool(pages) if persist is None or persist == "" else bool(persist),
+        "output_dir": record.get("output_dir") or None
+    }
+
+
+def load_jobs(path: str) -> list:
+    """
+    Read batch jobs from a JSONL file (one object per line) or a CSV file (.csv, header row).
+
+    Job keys: query (required), project_name (or project), pages (list or comma-separated),
+    format (ascii | markdown), persist (defaults to true when pages are given), output_dir.
+    """
+    jobs = []
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if Path(path).suffix.lower() == ".csv":
+            for line, row in enumerate(csv.DictReader(f), 2):
+                jobs.append(_parse_job({k.strip(): (v or "").strip() for k, v in row.items() if k}, line))
+        else:
+            for line, text in enumerate(f, 1):
+                if not text.strip():
+                    continue
+                try:
+                    record = json.loads(text)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"job {line}: invalid JSON ({e.msg})")
+                if not isinstance(record, dict):
+                    raise ValueError(f"job {line}: expected a JSON object")
+                jobs.append(_parse_job(record, line))
+    return jobs
+
+
+@manifest_batch()
+def _warm_batch():
+    """Build the indexes and reasoning rules every job shares; runs once per batch process."""
+    for domain in BATCH_DOMAINS:
+        config = CSV_CONFIG[domain]
+        filepath = DATA_DIR / config["file"]
+        if filepath.exists():
+            _get_index(filepath, config["search_cols"])
+    load_reasoning()
+
+
+def _batch_pool(workers: int) -> ProcessPoolExecutor:
+    """Worker processes that each warm their own indexes before taking jobs."""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(BATCH_START_METHOD),
+                               initializer=_warm_batch)
+
+
+def _render_path(job: dict, project_name: str, render_dir: str) -> Path:
+    slug = re.sub(r"[^a-z0-9]+", "-", project_name.lower()).strip("-") or "project"
+    return Path(render_dir) / f"{job['line']:04d}-{slug}{BATCH_EXTENSIONS[job['format']]}"
+
+
+def _run_job(job: dict, output_dir: str = None, render_dir: str = None) -> dict:
+    """
+    Generate (and optionally persist) one batch job; errors are reported, not raised.
+
+    With render_dir, the formatted document is streamed into a file there and the
+    result names it under "output_file" instead of carrying it under "output".
+    """
+    result = {"line": job["line"], "query": job["query"], "project_name": job["project_name"]}
+    try:
+        design_system, sources = generate_with_sources(job["query"], job["project_name"])
+        files, unchanged = [], []
+        if job["persist"]:
+            persisted = persist_design_system(design_system, None, job["output_dir"] or output_dir, job["query"],
+                                              job["pages"], sources)
+            files, unchanged = persisted["created_files"], persisted["unchanged_files"]
+        result.update(project_name=design_system["project_name"], status="ok", format=job["format"])
+        if render_dir:
+            path = _render_path(job, design_system["project_name"], render_dir)
+            with open(path, 'w', encoding='utf-8') as f:
+                render_design_system(design_system, f, job["format"])
+            result["output_file"] = str(path)
+        else:
+            formatter = format_markdown if job["format"] == "markdown" else format_ascii_box
+            result["output"] = formatter(design_system)
+        result.update(files=files, unchanged=unchanged)
+    except Exception as e:
+        result.update(status="error", error=f"{type(e).__name__}: {e}")
+    return result
+
+
+def generate_batch(jobs: list, workers: int = None, output_dir: str = None, render_dir: str = None):
+    """
+    Run many design-system jobs over one set of warm indexes and reasoning rules.
+
+    Indexes are built once per process; with several workers, jobs are spread over
+    freshly started worker processes. Yields one result dict per job, in job order.
+    With render_dir, documents are streamed to files instead of returned in the results.
+    """
+    if not jobs:
+        return
+    if render_dir:
+        Path(render_dir).mkdir(parents=True, exist_ok=True)
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers > 1:
+        with _batch_pool(workers) as pool:
+            yield from pool.map(_run_job, jobs, [output_dir] * len(jobs), [render_dir] * len(jobs))
+    else:
+        _warm_batch()
+        for job in jobs:
+            yield _run_job(job, output_dir, render_dir)
+
+
+# ============ REFRESH ============
+def _inputs_changed(recorded: dict, current: dict) -> bool:
+    """True if the rows a project used (or a whole-file input) differ between two source records."""
+    for name in set(recorded) | set(current):
+        before, after = recorded.get(name) or {}, current.get(name) or {}
+        if before.get("rows") is None or after.get("rows") is None:
+            if before.get("sha256") != after.get("sha256"):
+                return True
+        elif (before["rows"], before.get("rows_sha256")) != (after["rows"], after.get("rows_sha256")):
+            return True
+    return False
+
+
+def _sidecar_fresh(manifest: dict) -> bool:
+    """True when every data file recorded for MASTER.md and each page still hashes the same."""
+    records = [manifest["files"]] + [entry["files"] for entry in manifest["pages"].values()]
+    return all(_file_digest(DATA_DIR / name) == entry.get("sha256")
+               for files in records for name, entry in files.items())
+
+
+def _refresh_project(project_dir: str) -> dict:
+    """
+    Re-run a stale project's searches and re-persist only MASTER.md or the pages whose rows changed.
+
+    MASTER.md is rebuilt from the project query and each page from the query it was
+    persisted with; parts whose rows are unchanged only get their file hashes updated.
+    """
+    project_dir = Path(project_dir)
+    report = {"project": project_dir.name}
+    try:
+        manifest = _load_sources(project_dir)
+        if manifest is None:
+            report.update(status="skipped", reason=f"no valid {SOURCES_MANIFEST}")
+            return report
+        report["query"] = manifest["query"]
+        by_query = {manifest["query"]: []}
+        for name, entry in manifest["pages"].items():
+            by_query.setdefault(entry["query"], []).append(name)
+
+        current, written, skipped, rebuilt = {}, [], [], False
+        for query, names in by_query.items():
+            design_system, sources = generate_with_sources(query, manifest["project_name"])
+            searches = _page_override_searches(names, query) if names else []
+            master = query == manifest["query"]
+            if master:
+                current[None] = _file_sources(sources, [])
+            for name, search in zip(names, searches):
+                current[name] = _file_sources(sources, [search])
+            stale = [name for name in names if _inputs_changed(manifest["pages"][name]["files"], current[name])]
+            master = master and _inputs_changed(manifest["files"], current[None])
+            if master or stale:
+                rebuilt = True
+                persisted = persist_design_system(design_system, None, str(project_dir.parent.parent), query, stale,
+                                                  sources, master=master)
+                written += persisted["written_files"]
+                skipped += persisted["skipped_files"]
+                current = {key: files for key, files in current.items()
+                           if key not in stale and not (key is None and master)}
+
+        # Parts that did not need rebuilding keep their rows; only the file hashes move on
+        manifest = _load_sources(project_dir) or manifest
+        if None in current:
+            manifest["files"] = current.pop(None)
+        for name, files in current.items():
+            if name in manifest["pages"]:
+                manifest["pages"][name]["files"] = files
+        _save_sources(project_dir, manifest)
+        report.update(status="refreshed" if rebuilt else "unchanged", written=written)
+        if skipped:
+            report["skipped"] = skipped
+    except Exception as e:
+        report.update(status="error", error=f"{type(e).__name__}: {e}")
+    return report
+
+
+def refresh_design_systems(output_dir: str = None, workers: int = None):
+    """
+    Rebuild the persisted projects under <output_dir>/design-system/ whose data inputs changed.
+
+    Projects whose recorded data files all hash the same are fresh and never regenerated;
+    the rest re-run their searches in parallel (worker processes with warm indexes) and
+    have MASTER.md and each page re-persisted only when the rows it was built from changed.
+    Projects without a valid .sources.json sidecar are skipped, and a project that fails is
+    reported with status "error" without stopping the others. Yields one report per project,
+    in name order.
+    """
+    root = (Path(output_dir) if output_dir else Path.cwd()) / "design-system"
+    projects = sorted(path for path in root.iterdir() if path.is_dir()) if root.is_dir() else []
+    reports, stale = [], []
+    for project_dir in projects:
+        manifest = _load_sources(project_dir)
+        if manifest is None:
+            reports.append({"project": project_dir.name, "status": "skipped", "reason": f"no valid {SOURCES_MANIFEST}"})
+            continue
+        try:
+            fresh = _sidecar_fresh(manifest)
+        except Exception as e:
+            reports.append({"project": project_dir.name, "query": manifest["query"], "status": "error",
+                            "error": f"{type(e).__name__}: {e}"})
+            continue
+        if fresh:
+            reports.append({"project": project_dir.name, "query": manifest["query"], "status": "fresh"})
+        else:
+            reports.append(None)
+            stale.append(str(project_dir))
+    workers = min(workers or os.cpu_count() or 1, len(stale)) if stale else 1
+    if workers > 1:
+        with _batch_pool(workers) as pool:
+            refreshed = pool.map(_refresh_project, stale)
+            yield from (report if report is not None else next(refreshed) for report in reports)
+    else:
+        if stale:
+            _warm_batch()
+        refreshed = map(_refresh_project, stale)
+        yield from (report if report is not None else next(refreshed) for report in reports)
 
 
 # ============ CLI SUPPORT ============
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Query Log Replay - drives logged queries against the search engine and reports
+throughput and latency percentiles.
+
+Usage: python replay.py <query.log> [--concurrency 8] [--repeat 1] [--limit N] [--json]
+       python replay.py <query.log> --url http://127.0.0.1:8765 [--concurrency 32] [--pipeline 8]
+       python replay.py <query.log> --reload-ms 5 [--concurrency 32] [--repeat 20]
+
+Capture a log first with: python search.py "<query>" --query-log query.log
+(or set UIPRO_QUERY_LOG for any process that imports core).
+
+Targets:
+  (default)    Call core.search / search_stack / search_stacks in-process
+  --url URL    Send GET /search and /search/stack requests to a running search server
+               (start one with: python server.py); --pipeline N writes N requests
+               back to back on each connection before reading the responses
+
+Reload stress (--reload-ms N):
+  While the log replays in-process, a background thread hot-swaps every index
+  (core.reload_indexes) every N ms. Each result must equal the pre-stress
+  baseline; any mismatch or exception counts as an error.
+"""
+
+import argparse
+import http.client
+import json
+import socket
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter_ns
+from urllib.parse import urlencode, urlsplit
+
+import core
+
+
+def load_queries(path, limit=None):
+    """Read query records from a query log (rotated backups are not included)"""
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("query"):
+                records.append(record)
+            if limit and len(records) >= limit:
+                break
+    return records
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+# ============ TARGETS ============
+def _run_library(record):
+    k = record.get("k") or core.MAX_RESULTS
+    kind = record.get("kind")
+    if kind == "stack":
+        return core.search_stack(record["query"], record["stack"], k)
+    if kind == "stacks":
+        return core.search_stacks(record["query"], record["stack"].split(","), k)
+    return core.search(record["query"], record.get("domain"), k)
+
+
+def library_target(record):
+    """Run one logged query in-process; returns True on success"""
+    return "error" not in _run_library(record)
+
+
+def _record_key(record):
+    return record.get("kind"), record["query"], record.get("domain"), record.get("stack"), record.get("k")
+
+
+class ConsistencyTarget:
+    """In-process target that checks every result against a baseline taken before the run"""
+
+    def __init__(self, records):
+        self.expected = {}
+        for record in records:
+            result = _run_library(record)
+            self.expected[_record_key(record)] = (result.get("ids"), result.get("results"))
+
+    def __call__(self, record):
+        result = _run_library(record)
+        return "error" not in result and (result.get("ids"), result.get("results")) == self.expected[_record_key(record)]
+
+
+class Reloader:
+    """Background thread that hot-swaps all indexes every interval until stopped"""
+
+    def __init__(self, interval_ms):
+        self.interval_s = interval_ms / 1000
+        self.reloads = 0
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="index-reloader", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            try:
+                core.reload_indexes()
+                self.reloads += 1
+            except Exception:
+                self.errors += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class HttpTarget:
+    """Replays queries against a search server with one keep-alive connection per thread"""
+
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _path(self, record):
+        k = record.get("k") or core.MAX_RESULTS
+        if record.get("kind") in ("stack", "stacks"):
+            return f"{self.prefix}/search/stack?" + urlencode({"q": record["query"], "stack": record["stack"], "n": k})
+        params = {"q": record["query"], "n": k}
+        if record.get("domain"):
+            params["domain"] = record["domain"]
+        return f"{self.prefix}/search?" + urlencode(params)
+
+    def pipeline(self, records):
+        """Send all requests on one raw keep-alive socket, then read the responses in order"""
+        stream = getattr(self._local, "stream", None)
+        if stream is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            stream = self._local.stream = sock.makefile('rwb')
+        request = "".join(f"GET {self._path(r)} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n\r\n" for r in records)
+        try:
+            stream.write(request.encode('latin-1'))
+            stream.flush()
+            results = []
+            for _ in records:
+                status = int(stream.readline().split()[1])
+                length = 0
+                for line in iter(stream.readline, b"\r\n"):
+                    name, _, value = line.decode('latin-1').partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+                stream.read(length)
+                results.append(status == 200)
+            return results
+        except (OSError, ValueError, IndexError):
+            stream.close()
+            self._local.stream = None
+            return [False] * len(records)
+
+    def __call__(self, record):
+        path = self._path(record)
+        conn = self._connection()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            return response.status == 200
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            return False
+
+
+# ============ REPLAY ============
+def replay(records, target, concurrency=8, repeat=1, pipeline=1):
+    """Drive records through target; returns a report with throughput and latency percentiles.
+
+    With pipeline > 1, each worker hands batches of that many records to
+    target.pipeline() and every request in a batch gets the batch latency.
+    """
+    workload = records * repeat
+    latencies = [0] * len(workload)
+    ok = [False] * len(workload)
+
+    def run(batch):
+        start = perf_counter_ns()
+        try:
+            if pipeline > 1:
+                results = target.pipeline([workload[i] for i in batch])
+            else:
+                results = [target(workload[batch[0]])]
+        except Exception:
+            results = [False] * len(batch)
+        elapsed = perf_counter_ns() - start
+        for i, result in zip(batch, results):
+            ok[i] = result
+            latencies[i] = elapsed
+
+    batches = [range(i, min(i + pipeline, len(workload))) for i in range(0, len(workload), pipeline)]
+    start = perf_counter_ns()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run, batches))
+    wall_ns = perf_counter_ns() - start
+
+    ms = sorted(ns / 1e6 for ns in latencies)
+    wall_s = wall_ns / 1e9
+    return {
+        "requests": len(workload),
+        "errors": ok.count(False),
+        "concurrency": concurrency,
+        "pipeline": pipeline,
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(len(workload) / wall_s, 1) if wall_s else 0.0,
+        "latency_ms": {
+            "mean": round(sum(ms) / len(ms), 3) if ms else 0.0,
+            "p50": round(percentile(ms, 50), 3),
+            "p95": round(percentile(ms, 95), 3),
+            "p99": round(percentile(ms, 99), 3),
+            "max": round(ms[-1], 3) if ms else 0.0
+        }
+    }
+
+
+def format_report(report, target_name):
+    """Format a replay report for the terminal"""
+    lat = report["latency_ms"]
+    return "\n".join([
+        f"## Replay Report ({target_name})",
+        f"**Requests:** {report['requests']} | **Errors:** {report['errors']} | **Concurrency:** {report['concurrency']}"
+        f" | **Pipeline:** {report['pipeline']}",
+        f"**Wall:** {report['wall_s']}s | **Throughput:** {report['throughput_rps']} req/s",
+        f"**Latency (ms):** mean {lat['mean']} | p50 {lat['p50']} | p95 {lat['p95']} | p99 {lat['p99']} | max {lat['max']}"
+    ] + ([f"**Reloads:** {report['reloads']} | **Reload errors:** {report['reload_errors']}"]
+         if "reloads" in report else []))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a UI Pro Max query log")
+    parser.add_argument("log", help="Query log written via --query-log / UIPRO_QUERY_LOG")
+    parser.add_argument("--url", type=str, default=None, help="Search server base URL (default: in-process library)")
+    parser.add_argument("--concurrency", "-c", type=int, default=8, help="Concurrent workers (default: 8)")
+    parser.add_argument("--repeat", "-r", type=int, default=1, help="Replay the log this many times (default: 1)")
+    parser.add_argument("--limit", type=int, default=None, help="Only replay the first N records")
+    parser.add_argument("--reload-ms", type=float, default=None, metavar="N",
+                        help="Stress test: hot-swap all indexes every N ms and verify results stay identical")
+    parser.add_argument("--pipeline", type=int, default=1, metavar="N",
+                        help="Pipeline N requests per connection round trip (requires --url)")
+    parser.add_argument("--json", action="store_true", help="Output report as JSON")
+    args = parser.parse_args()
+    if args.reload_ms is not None and args.url:
+        parser.error("--reload-ms runs in-process and cannot be combined with --url")
+    if args.pipeline > 1 and not args.url:
+        parser.error("--pipeline requires --url")
+
+    records = load_queries(args.log, args.limit)
+    if not records:
+        print(f"Error: no query records in {args.log}", file=sys.stderr)
+        sys.exit(1)
+
+    # Never log the replayed traffic back into the workload
+    core.disable_query_log()
+    if args.reload_ms is not None:
+        target = ConsistencyTarget(records)
+        with Reloader(max(0.0, args.reload_ms)) as reloader:
+            report = replay(records, target, max(1, args.concurrency), max(1, args.repeat))
+        report["reloads"] = reloader.reloads
+        report["reload_errors"] = reloader.errors
+    else:
+        target = HttpTarget(args.url) if args.url else library_target
+        report = replay(records, target, max(1, args.concurrency), max(1, args.repeat), max(1, args.pipeline))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report, args.url or "library"))
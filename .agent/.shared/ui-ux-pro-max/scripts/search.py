@@ -3,20 +3,88 @@
 """
 UI/UX Pro Max Search - BM25 search engine for UI/UX style guides
 Usage: python search.py "<query>" [--domain <domain>] [--stack <stack>] [--max-results 3]
+       python search.py "<query>" --stack all | --stack react,nextjs,jetpack-compose
+       python search.py "<query>" --pack <name>
+       python search.py "<query>" [--domain <domain> | --stack <stacks> | --pack <name>] --jsonl
+       python search.py --similar <row_id> --domain <domain> [-n 3]
+       python search.py --index-stats [--json]
        python search.py "<query>" --design-system [-p "Project Name"]
        python search.py "<query>" --design-system --persist [-p "Project Name"] [--page "dashboard"]
+       python search.py "<query>" --design-system --persist [-p "Project Name"] --pages dashboard,checkout,settings
+       python search.py --design-system --batch jobs.jsonl [--workers N] [-o <output_dir>] [--batch-output DIR]
+       python search.py --refresh <output_dir> [--workers N]
 
 Domains: style, prompt, color, chart, landing, product, ux, typography
-Stacks: html-tailwind, react, nextjs
+Stacks: html-tailwind, react, nextjs, vue, nuxtjs, nuxt-ui, svelte, swiftui,
+        react-native, flutter, shadcn, jetpack-compose
+        (use "all" or a comma-separated list to search several stacks concurrently)
+
+Data packs:
+  Drop large guideline CSVs into data/packs/ (or $UIPRO_PACKS_DIR) and search them with
+  --pack <name>. Appended rows are indexed incrementally as new segments.
+
+More like this:
+  --similar ID Rank rows related to row ID of --domain (ids are listed under "ids" in --json
+               output); the query is built from that row's top tf-idf terms
+
+Near-duplicates:
+  --dedup      Collapse near-identical hits (MinHash, see dedup.py) so every result slot is distinct
+
+Output:
+  --json       Full result as one indented JSON document
+  --jsonl      Stream one compact JSON hit per line as soon as it is ranked
+               (keys: domain, stack, file, rank, id, score, result)
+
+Query log:
+  --query-log FILE   Append anonymized query records to a rolling log (or set UIPRO_QUERY_LOG);
+                     replay them with replay.py
+
+Snippets:
+  --snippet-window N Cut long fields to the N-char window with the most query matches
+                     (default 300 for text output, full fields for --json)
+  --highlight        Wrap matched terms in **bold**
+
+Index stats:
+  --index-stats      Per domain/stack: rows, vocabulary, avg doc length, postings-length
+                     distribution, rarest/commonest terms, estimated memory and build time
+                     (add --tracemalloc FILE to also measure bytes allocated per build)
+
+Profiling:
+  --profile          Print a per-stage timing breakdown (embedded as "timings" with --json)
+  --cprofile FILE    Dump cProfile stats to FILE (inspect with python -m pstats)
+  --tracemalloc FILE Write the top memory allocations to FILE
 
 Persistence (Master + Overrides pattern):
   --persist    Save design system to design-system/MASTER.md
   --page       Also create a page-specific override file in design-system/pages/
+  --pages      Comma-separated pages, generated in one pass (batched searches, MASTER.md written once)
+
+Design-system cache:
+  Generated design systems are cached on disk (data/.design-cache, or $UIPRO_DESIGN_CACHE_DIR)
+  keyed by normalized query, project name and a hash of the data files; --no-cache bypasses it
+
+Batch design systems:
+  --batch FILE Run every job in FILE (JSONL, or CSV with a header row) over one set of warm
+               indexes, spread across --workers processes (default: one per CPU). Job keys:
+               query, project_name, pages (list or comma-separated), format, persist, output_dir.
+               Jobs with pages are persisted to design-system/<project>/ under --output-dir.
+               Prints one JSON result per job, in input order.
+  --batch-output DIR  Stream each job's document into DIR/<line>-<project>.txt|.md instead of
+                      embedding it in the result (reported as "output_file")
+
+Refresh:
+  --refresh DIR  Find every persisted DIR/design-system/<project>/ and regenerate, in parallel,
+                 only the MASTER.md and pages whose data rows changed (per the .sources.json
+                 sidecar written on persist); files edited by hand are skipped with a warning.
+                 Prints one JSON report per project
 """
 
 import argparse
-from core import CSV_CONFIG, AVAILABLE_STACKS, MAX_RESULTS, search, search_stack
-from design_system import generate_design_system, persist_design_system
+import json
+import sys
+from core import (CSV_CONFIG, AVAILABLE_STACKS, MAX_RESULTS, SNIPPET_WINDOW, search, search_stack, search_stacks,
+                  search_pack, similar, index_stats, iter_search, iter_search_stacks, iter_search_pack, span, enable_timings, capture_profile, enable_query_log)
+from design_system import generate_design_system, persist_design_system, load_jobs, generate_batch, refresh_design_systems
 
 
 def format_output(result):
@@ -25,7 +93,16 @@ def format_output(result):
         return f"Error: {result['error']}"
 
     output = []
-    if result.get("stack"):
+    if result.get("pack"):
+        output.append(f"## UI Pro Max Data Pack Results")
+        output.append(f"**Pack:** {result['pack']} | **Query:** {result['query']}")
+    elif result.get("stacks"):
+        output.append(f"## UI Pro Max Multi-Stack Guidelines")
+        output.append(f"**Stacks:** {', '.join(result['stacks'])} | **Query:** {result['query']}")
+    elif "source_id" in result:
+        output.append(f"## UI Pro Max Similar Rows")
+        output.append(f"**Domain:** {result['domain']} | **Similar to:** row {result['source_id']} | **Terms:** {result['query']}")
+    elif result.get("stack"):
         output.append(f"## UI Pro Max Stack Guidelines")
         output.append(f"**Stack:** {result['stack']} | **Query:** {result['query']}")
     else:
@@ -34,24 +111,99 @@ def format_output(result):
     output.append(f"**Source:** {result['file']} | **Found:** {result['count']} results\n")
 
     for i, row in enumerate(result['results'], 1):
-        output.append(f"### Result {i}")
+        if "source_id" in result:
+            output.append(f"### Result {i} (row {result['ids'][i - 1]})")
+        else:
+            output.append(f"### Result {i}")
         for key, value in row.items():
             value_str = str(value)
-            if len(value_str) > 300:
-                value_str = value_str[:300] + "..."
+            # Snippet results are already cut around the query matches
+            if not result.get("snippet_window") and len(value_str) > SNIPPET_WINDOW:
+                value_str = value_str[:SNIPPET_WINDOW] + "..."
             output.append(f"- **{key}:** {value_str}")
         output.append("")
 
+    if result.get("per_stack"):
+        output.append("### Top Hit per Stack")
+        for stack, stack_result in result["per_stack"].items():
+            hits = stack_result["results"]
+            if hits:
+                top = hits[0]
+                output.append(f"- **{stack}:** {top.get('Category', '')} - {top.get('Guideline', '')}")
+            else:
+                output.append(f"- **{stack}:** no match")
+        output.append("")
+
     return "\n".join(output)
 
 
+def emit_jsonl(records, stream=sys.stdout):
+    """Write each record as one compact JSON line, flushing so consumers see it immediately"""
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        stream.flush()
+
+
+def format_timings(timings):
+    """Format a Timings report as an aligned per-stage breakdown"""
+    output = ["## Timing Breakdown", f"{'stage':<14} {'calls':>6} {'total ms':>10} {'mean ms':>10}"]
+    for name, stage in timings.items():
+        output.append(f"{name:<14} {stage['calls']:>6} {stage['total_ms']:>10.3f} {stage['mean_ms']:>10.3f}")
+    return "\n".join(output)
+
+
+def format_index_stats(report):
+    """Format an index_stats report as a per-corpus table plus term samples"""
+    output = ["## Index Stats",
+              f"{'corpus':<20} {'rows':>6} {'vocab':>6} {'avg len':>8} {'postings':>9} {'df p50/p90/max':>15} "
+              f"{'singletons':>10} {'memory KB':>10} {'build ms':>9}"]
+    for label, stats in report.items():
+        df = stats["postings_length"]
+        df_spread = f"{df['p50']}/{df['p90']}/{df['max']}"
+        output.append(f"{label:<20} {stats['rows']:>6} {stats['vocabulary']:>6} {stats['avg_doc_length']:>8} "
+                      f"{stats['postings']:>9} {df_spread:>15} "
+                      f"{stats['singleton_terms']:>10} {stats['memory_bytes']['total'] / 1024:>10.1f} "
+                      f"{stats['build_ms']:>9.3f}")
+    total = sum(stats["memory_bytes"]["total"] for stats in report.values())
+    output.append(f"\n**Total estimated memory:** {total / 1024:.1f} KB across {len(report)} corpora\n")
+
+    for label, stats in report.items():
+        output.append(f"### {label} ({stats['file']})")
+        memory = ", ".join(f"{name} {size / 1024:.1f}" for name, size in stats["memory_bytes"].items() if name != "total")
+        output.append(f"- **Memory KB:** {memory}")
+        output.append(f"- **Top idf:** {', '.join(t['term'] for t in stats['top_idf_terms'])}")
+        common = ", ".join(f"{t['term']} ({t['df']})" for t in stats["top_df_terms"])
+        output.append(f"- **Top df:** {common}")
+        if "traced_build_bytes" in stats:
+            output.append(f"- **Traced build:** {stats['traced_build_bytes'] / 1024:.1f} KB")
+        output.append("")
+    return "\n".join(output)
+
+
+def parse_stacks(value):
+    """Parse --stack value: a single stack, "all", or a comma-separated list"""
+    if value == "all":
+        return list(AVAILABLE_STACKS)
+    stacks = [s.strip() for s in value.split(",") if s.strip()]
+    unknown = [s for s in stacks if s not in AVAILABLE_STACKS]
+    if not stacks or unknown:
+        raise argparse.ArgumentTypeError(
+            f"invalid stack: {', '.join(unknown) or value!r} (choose from all, {', '.join(AVAILABLE_STACKS)})")
+    return stacks
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="UI Pro Max Search")
-    parser.add_argument("query", help="Search query")
+    parser.add_argument("query", nargs="?", default=None, help="Search query")
     parser.add_argument("--domain", "-d", choices=list(CSV_CONFIG.keys()), help="Search domain")
-    parser.add_argument("--stack", "-s", choices=AVAILABLE_STACKS, help="Stack-specific search (html-tailwind, react, nextjs)")
+    parser.add_argument("--stack", "-s", type=parse_stacks, help="Stack-specific search: one stack, \"all\", or a comma-separated list")
+    parser.add_argument("--pack", type=str, default=None, help="Search an external data pack in data/packs/")
+    parser.add_argument("--similar", type=int, default=None, metavar="ID", help="Find rows similar to row ID of --domain")
+    parser.add_argument("--index-stats", action="store_true", help="Report index size and shape per domain and stack")
     parser.add_argument("--max-results", "-n", type=int, default=MAX_RESULTS, help="Max results (default: 3)")
+    parser.add_argument("--dedup", action="store_true", help="Collapse near-duplicate hits")
     parser.add_argument("--json", action="store_true", help="Output as JSON")
+    parser.add_argument("--jsonl", action="store_true", help="Stream one JSON hit per line")
     # Design system generation
     parser.add_argument("--design-system", "-ds", action="store_true", help="Generate complete design system recommendation")
     parser.add_argument("--project-name", "-p", type=str, default=None, help="Project name for design system output")
@@ -59,48 +211,149 @@ if __name__ == "__main__":
     # Persistence (Master + Overrides pattern)
     parser.add_argument("--persist", action="store_true", help="Save design system to design-system/MASTER.md (creates hierarchical structure)")
     parser.add_argument("--page", type=str, default=None, help="Create page-specific override file in design-system/pages/")
+    parser.add_argument("--pages", type=str, default=None, help="Comma-separated pages to create override files for in one pass")
+    parser.add_argument("--no-cache", action="store_true", help="Regenerate the design system instead of using the disk cache")
+    parser.add_argument("--batch", type=str, default=None, metavar="FILE", help="Generate design systems for every job in a JSONL/CSV file")
+    parser.add_argument("--batch-output", type=str, default=None, metavar="DIR", help="Write each --batch document to a file in DIR")
+    parser.add_argument("--workers", type=int, default=None, metavar="N", help="Worker processes for --batch/--refresh (default: one per CPU)")
+    parser.add_argument("--refresh", type=str, default=None, metavar="DIR", help="Regenerate persisted design systems under DIR whose data changed")
     parser.add_argument("--output-dir", "-o", type=str, default=None, help="Output directory for persisted files (default: current directory)")
 
+    parser.add_argument("--query-log", type=str, default=None, metavar="FILE", help="Append anonymized query records to FILE")
+    # Snippets
+    parser.add_argument("--snippet-window", type=int, default=None, metavar="N", help=f"Query-aware snippet size in chars (default: {SNIPPET_WINDOW} for text output)")
+    parser.add_argument("--highlight", action="store_true", help="Highlight query matches in snippets")
+    # Profiling
+    parser.add_argument("--profile", action="store_true", help="Print per-stage timings (embedded under \"timings\" with --json)")
+    parser.add_argument("--cprofile", type=str, default=None, metavar="FILE", help="Write cProfile stats to FILE")
+    parser.add_argument("--tracemalloc", type=str, default=None, metavar="FILE", help="Write top memory allocations to FILE")
+
     args = parser.parse_args()
+    if args.similar is not None:
+        if not args.domain:
+            parser.error("--similar requires --domain")
+        if args.stack or args.pack or args.jsonl or args.design_system:
+            parser.error("--similar cannot be combined with --stack, --pack, --jsonl or --design-system")
+    elif args.batch:
+        if not args.design_system:
+            parser.error("--batch requires --design-system")
+        if args.query or args.persist or args.page or args.pages or args.json or args.jsonl:
+            parser.error("--batch takes its queries, pages and formats from the jobs file")
+    elif args.batch_output:
+        parser.error("--batch-output requires --batch")
+    elif args.refresh:
+        if args.query or args.design_system or args.stack or args.pack or args.json or args.jsonl:
+            parser.error("--refresh takes no query and cannot be combined with other modes")
+    elif args.query is None and not args.index_stats:
+        parser.error("the following arguments are required: query")
+    if args.snippet_window is not None and args.snippet_window <= 0:
+        parser.error("--snippet-window must be positive")
+    if args.jsonl and (args.json or args.design_system):
+        parser.error("--jsonl cannot be combined with --json or --design-system")
+    if args.dedup and (args.jsonl or args.pack or args.similar is not None):
+        parser.error("--dedup is not supported with --jsonl, --pack or --similar")
+    if args.workers is not None and args.workers <= 0:
+        parser.error("--workers must be positive")
+    pages = [p.strip() for p in (args.pages or "").split(",") if p.strip()]
+    snippet_window = args.snippet_window or (None if args.json or args.jsonl else SNIPPET_WINDOW)
+    timings = enable_timings() if args.profile else None
+    if args.query_log:
+        enable_query_log(args.query_log)
 
-    # Design system takes priority
-    if args.design_system:
-        result = generate_design_system(
-            args.query, 
-            args.project_name, 
-            args.format,
-            persist=args.persist,
-            page=args.page,
-            output_dir=args.output_dir
-        )
-        print(result)
-        
-        # Print persistence confirmation
-        if args.persist:
-            project_slug = args.project_name.lower().replace(' ', '-') if args.project_name else "default"
-            print("\n" + "=" * 60)
-            print(f"✅ Design system persisted to design-system/{project_slug}/")
-            print(f"   📄 design-system/{project_slug}/MASTER.md (Global Source of Truth)")
-            if args.page:
-                page_filename = args.page.lower().replace(' ', '-')
-                print(f"   📄 design-system/{project_slug}/pages/{page_filename}.md (Page Overrides)")
-            print("")
-            print(f"📖 Usage: When building a page, check design-system/{project_slug}/pages/[page].md first.")
-            print(f"   If exists, its rules override MASTER.md. Otherwise, use MASTER.md.")
-            print("=" * 60)
-    # Stack search
-    elif args.stack:
-        result = search_stack(args.query, args.stack, args.max_results)
-        if args.json:
-            import json
-            print(json.dumps(result, indent=2, ensure_ascii=False))
-        else:
-            print(format_output(result))
-    # Domain search
-    else:
-        result = search(args.query, args.domain, args.max_results)
-        if args.json:
-            import json
-            print(json.dumps(result, indent=2, ensure_ascii=False))
+    with capture_profile(args.cprofile, args.tracemalloc):
+        if args.index_stats:
+            with span("total"):
+                report = index_stats()
+            if args.json:
+                if timings:
+                    report["timings"] = timings.report()
+                print(json.dumps(report, indent=2, ensure_ascii=False))
+            else:
+                print(format_index_stats(report))
+                if timings:
+                    print("\n" + format_timings(timings.report()), file=sys.stderr)
+        elif args.refresh:
+            with span("total"):
+                emit_jsonl(refresh_design_systems(args.refresh, args.workers))
+            if timings:
+                print("\n" + format_timings(timings.report()), file=sys.stderr)
+        elif args.batch:
+            try:
+                jobs = load_jobs(args.batch)
+            except (OSError, ValueError) as e:
+                print(f"Error: {e}", file=sys.stderr)
+                sys.exit(1)
+            with span("total"):
+                emit_jsonl(generate_batch(jobs, args.workers, args.output_dir, args.batch_output))
+            if timings:
+                print("\n" + format_timings(timings.report()), file=sys.stderr)
+        # Design system takes priority
+        elif args.design_system:
+            with span("total"):
+                result = generate_design_system(
+                    args.query,
+                    args.project_name,
+                    args.format,
+                    persist=args.persist,
+                    page=args.page,
+                    output_dir=args.output_dir,
+                    pages=pages,
+                    use_cache=not args.no_cache
+                )
+            print(result)
+
+            # Print persistence confirmation
+            if args.persist:
+                project_slug = args.project_name.lower().replace(' ', '-') if args.project_name else "default"
+                print("\n" + "=" * 60)
+                print(f"✅ Design system persisted to design-system/{project_slug}/")
+                print(f"   📄 design-system/{project_slug}/MASTER.md (Global Source of Truth)")
+                for page_filename in dict.fromkeys(p.lower().replace(' ', '-') for p in [args.page or ""] + pages if p):
+                    print(f"   📄 design-system/{project_slug}/pages/{page_filename}.md (Page Overrides)")
+                print("")
+                print(f"📖 Usage: When building a page, check design-system/{project_slug}/pages/[page].md first.")
+                print(f"   If exists, its rules override MASTER.md. Otherwise, use MASTER.md.")
+                print("=" * 60)
+            if timings:
+                print("\n" + format_timings(timings.report()), file=sys.stderr)
+        elif args.jsonl:
+            with span("total"):
+                if args.pack:
+                    emit_jsonl(iter_search_pack(args.query, args.pack, args.max_results))
+                elif args.stack:
+                    emit_jsonl(iter_search_stacks(args.query, args.stack, args.max_results,
+                                                  snippet_window, args.highlight))
+                else:
+                    emit_jsonl(iter_search(args.query, args.domain, args.max_results, snippet_window, args.highlight))
+            if timings:
+                print("\n" + format_timings(timings.report()), file=sys.stderr)
         else:
-            print(format_output(result))
+            with span("total"):
+                # More like this
+                if args.similar is not None:
+                    result = similar(args.domain, args.similar, args.max_results)
+                # Data pack search
+                elif args.pack:
+                    result = search_pack(args.query, args.pack, args.max_results)
+                # Stack search
+                elif args.stack:
+                    if len(args.stack) == 1:
+                        result = search_stack(args.query, args.stack[0], args.max_results,
+                                              snippet_window, args.highlight, args.dedup)
+                    else:
+                        result = search_stacks(args.query, args.stack, args.max_results,
+                                               snippet_window, args.highlight, args.dedup)
+                # Domain search
+                else:
+                    result = search(args.query, args.domain, args.max_results, snippet_window, args.highlight,
+                                    args.dedup)
+
+                with span("format_output"):
+                    output = json.dumps(result, indent=2, ensure_ascii=False) if args.json else format_output(result)
+            if timings and args.json:
+                # Embed the same spans --profile prints, including format_output and total
+                result["timings"] = timings.report()
+                output = json.dumps(result, indent=2, ensure_ascii=False)
+            print(output)
+            if timings and not args.json:
+                print("\n" + format_timings(timings.report()), file=sys.stderr)
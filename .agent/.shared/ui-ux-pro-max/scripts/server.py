@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UI Pro Max Search Server - asyncio HTTP/1.1 JSON API over the cached indexes (stdlib only)
+
+Usage: python server.py [--host 127.0.0.1] [--port 8765] [--workers N] [--max-inflight 64] [--no-warm]
+
+Endpoints (GET with query parameters; POST with a JSON object body is also accepted):
+  /search          q, domain?, n?, snippet?, highlight?, dedup?
+  /search/stack    q, stack (one stack, comma-separated list or "all"), n?, dedup?
+  /design-system   q, project?, format? (json | markdown | ascii)
+  /suggest         q (the last word is completed), domain?, n?
+
+Connections are kept alive (HTTP/1.1) and may pipeline requests; responses come back
+in request order. Searches run in a thread pool over the shared index snapshots, at
+most --max-inflight at a time, so the event loop only parses and writes. Design
+systems are served from the same disk cache as search.py --design-system.
+
+Load test: python replay.py <query.log> --url http://127.0.0.1:8765 -c 32 [--pipeline 8]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import traceback
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import core
+from design_system import cached_generate, format_ascii_box, format_markdown
+
+# ============ CONFIGURATION ============
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_INFLIGHT = 64
+# Requests read ahead on one connection before the reader waits for responses to drain
+PIPELINE_DEPTH = 16
+KEEPALIVE_TIMEOUT_S = 15.0
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+MAX_N = 50
+
+Request = namedtuple("Request", ["method", "path", "params", "keep_alive"])
+
+
+class HttpError(Exception):
+    """Client error reported as a JSON {"error": message} body"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ============ HANDLERS ============
+def _str_param(params, name):
+    """A string parameter, stripped; None when absent (JSON bodies may carry any type)"""
+    value = params.get(name)
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise HttpError(400, f"{name} must be a string")
+    return value.strip()
+
+
+def _query(params):
+    query = _str_param(params, "q")
+    if not query:
+        raise HttpError(400, "Missing required parameter: q")
+    return query
+
+
+def _int_param(params, name, default, high=MAX_N):
+    value = params.get(name)
+    if value is None or value == "":
+        return default
+    # bool is an int subclass and floats would truncate; query strings arrive as str
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise HttpError(400, f"{name} must be an integer")
+    try:
+        value = int(value)
+    except ValueError:
+        raise HttpError(400, f"{name} must be an integer")
+    if not 1 <= value <= high:
+        raise HttpError(400, f"{name} must be between 1 and {high}")
+    return value
+
+
+def _flag(params, name):
+    value = params.get(name)
+    return value is True or str(value).lower() in ("1", "true", "yes", "on")
+
+
+def _domain(params):
+    domain = _str_param(params, "domain") or None
+    if domain is not None and domain not in core.CSV_CONFIG:
+        raise HttpError(400, f"Unknown domain: {domain}. Available: {', '.join(core.CSV_CONFIG)}")
+    return domain
+
+
+def handle_search(params):
+    return core.search(_query(params), _domain(params), _int_param(params, "n", core.MAX_RESULTS),
+                       _int_param(params, "snippet", None, high=100000), _flag(params, "highlight"),
+                       _flag(params, "dedup"))
+
+
+def handle_search_stack(params):
+    query = _query(params)
+    stack = _str_param(params, "stack")
+    if not stack:
+        raise HttpError(400, "Missing required parameter: stack")
+    stacks = list(core.AVAILABLE_STACKS) if stack == "all" else [s.strip() for s in stack.split(",") if s.strip()]
+    unknown = [s for s in stacks if s not in core.STACK_CONFIG]
+    if unknown:
+        raise HttpError(400, f"Unknown stack: {', '.join(unknown)}. Available: {', '.join(core.AVAILABLE_STACKS)}")
+    n = _int_param(params, "n", core.MAX_RESULTS)
+    if len(stacks) == 1:
+        return core.search_stack(query, stacks[0], n, dedup=_flag(params, "dedup"))
+    return core.search_stacks(query, stacks, n, dedup=_flag(params, "dedup"))
+
+
+def handle_design_system(params):
+    query = _query(params)
+    output_format = _str_param(params, "format") or "json"
+    if output_format not in ("json", "markdown", "ascii"):
+        raise HttpError(400, "format must be one of: json, markdown, ascii")
+    # Same disk cache as the CLI, keyed by query, project and data version
+    design_system = cached_generate(query, _str_param(params, "project") or None)
+    if output_format == "json":
+        return design_system
+    formatter = format_markdown if output_format == "markdown" else format_ascii_box
+    return {"format": output_format, "output": formatter(design_system)}
+
+
+def handle_suggest(params):
+    return core.suggest(_query(params), _domain(params), _int_param(params, "n", 10))
+
+
+ROUTES = {
+    "/search": handle_search,
+    "/search/stack": handle_search_stack,
+    "/design-system": handle_design_system,
+    "/suggest": handle_suggest
+}
+
+
+def _execute(handler, params):
+    """Run a handler in a worker thread; returns (status, JSON body bytes)"""
+    try:
+        result = handler(params)
+        status = 500 if "error" in result else 200
+    except HttpError as e:
+        status, result = e.status, {"error": e.message}
+    except Exception:
+        traceback.print_exc(file=sys.stderr)
+        status, result = 500, {"error": "Internal server error"}
+    return status, json.dumps(result, ensure_ascii=False).encode('utf-8')
+
+
+# ============ HTTP ============
+def _error_body(message):
+    return json.dumps({"error": message}).encode('utf-8')
+
+
+def _response(status, body, keep_alive):
+    head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+
+async def read_request(reader):
+    """Parse one request from the stream; None on a clean EOF between requests"""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise HttpError(400, "Incomplete request")
+    except asyncio.LimitOverrunError:
+        raise HttpError(431, "Request header too large")
+
+    lines = head.decode('latin-1').split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    if "transfer-encoding" in headers:
+        raise HttpError(501, "Chunked request bodies are not supported")
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HttpError(400, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+
+    url = urlsplit(target)
+    params = {name: values[-1] for name, values in parse_qs(url.query, keep_blank_values=True).items()}
+    if body:
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            raise HttpError(400, "Body must be a JSON object")
+        if not isinstance(payload, dict):
+            raise HttpError(400, "Body must be a JSON object")
+        params.update(payload)
+    return Request(method, url.path.rstrip("/") or "/", params, keep_alive)
+
+
+class SearchServer:
+    """Keep-alive, pipelining JSON server; handlers run in a bounded thread pool"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, max_inflight=MAX_INFLIGHT,
+                 pipeline_depth=PIPELINE_DEPTH):
+        self.host = host
+        self.port = port
+        self.max_inflight = max_inflight
+        self.pipeline_depth = pipeline_depth
+        self._executor = ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) + 4),
+                                            thread_name_prefix="search")
+        self._slots = None
+        self._server = None
+
+    async def start(self):
+        """Bind and start accepting; with port 0 the chosen port is stored in self.port"""
+        self._slots = asyncio.Semaphore(self.max_inflight)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_HEADER_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._executor.shutdown(wait=False)
+
+    async def warm(self):
+        """Build every domain and stack index before taking traffic"""
+        loop = asyncio.get_running_loop()
+        with core.manifest_batch():
+            await asyncio.gather(*(loop.run_in_executor(self._executor, core._get_index, filepath, search_cols)
+                                   for _, filepath, search_cols in core._all_corpora()))
+
+    async def _dispatch(self, request):
+        handler = ROUTES.get(request.path)
+        if handler is None:
+            return 404, _error_body(f"Unknown endpoint: {request.path}. Available: {', '.join(ROUTES)}")
+        if request.method not in ("GET", "POST"):
+            return 405, _error_body("Method not allowed (use GET or POST)")
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, _execute, handler,
+                                                                    request.params)
+
+    async def _handle(self, reader, writer):
+        """Read requests back to back and queue their responses in arrival order"""
+        loop = asyncio.get_running_loop()
+        responses = asyncio.Queue(maxsize=self.pipeline_depth)
+        sender = asyncio.create_task(self._send(responses, writer))
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), KEEPALIVE_TIMEOUT_S)
+                except HttpError as e:
+                    failed = loop.create_future()
+                    failed.set_result((e.status, _error_body(e.message)))
+                    await responses.put((failed, False))
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                if request is None:
+                    break
+                await responses.put((asyncio.ensure_future(self._dispatch(request)), request.keep_alive))
+                if not request.keep_alive:
+                    break
+        finally:
+            await responses.put(None)
+            await sender
+            writer.close()
+
+    async def _send(self, responses, writer):
+        """Write responses in request order; after a write error, keep draining so the reader never blocks"""
+        broken = False
+        while True:
+            item = await responses.get()
+            if item is None:
+                return
+            pending, keep_alive = item
+            status, body = await pending
+            if broken:
+                continue
+            try:
+                writer.write(_response(status, body, keep_alive))
+                await writer.drain()
+            except ConnectionError:
+                broken = True
+
+
+async def main(args):
+    server = SearchServer(args.host, args.port, args.workers, args.max_inflight)
+    await server.start()
+    if not args.no_warm:
+        await server.warm()
+    print(f"UI Pro Max search server on http://{server.host}:{server.port} "
+          f"(endpoints: {', '.join(ROUTES)})", file=sys.stderr)
+    await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="UI Pro Max HTTP JSON API")
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST, help=f"Bind address (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port, 0 for any free port (default: {DEFAULT_PORT})")
+    parser.add_argument("--workers", type=int, default=None, help="Search worker threads (default: min(32, CPUs + 4))")
+    parser.add_argument("--max-inflight", type=int, default=MAX_INFLIGHT,
+                        help=f"Maximum concurrent searches across all connections (default: {MAX_INFLIGHT})")
+    parser.add_argument("--no-warm", action="store_true", help="Skip building all indexes at startup")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the design-system disk cache: LRU eviction by entry count and bytes, and
+invalidation when the query, project or data files change
+
+Run: python -m unittest discover -s .agent/.shared/ui-ux-pro-max/tests
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import design_system
+from design_system import DesignSystemCache
+
+
+class DesignCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.past = 1_000_000_000 * 10 ** 9
+
+    def _put(self, cache, name, value=None, age=0):
+        """Store an entry last used in the past; a larger age means more recently used"""
+        cache.put(name, value if value is not None else {"name": name})
+        stamp = self.past + age
+        os.utime(cache._path(name), ns=(stamp, stamp))
+
+    def _names(self, cache):
+        return sorted(path.stem for path in cache.directory.glob("*.json"))
+
+    def test_evicts_least_recently_used_past_max_entries(self):
+        cache = DesignSystemCache(self.tmp, max_entries=3)
+        for i, name in enumerate(["a", "b", "c"]):
+            self._put(cache, name, age=i)
+        # A hit makes "a" the most recently used, so "b" goes first
+        self.assertEqual(cache.get("a"), {"name": "a"})
+        cache.put("d", {"name": "d"})
+        self.assertEqual(self._names(cache), ["a", "c", "d"])
+        self.assertIsNone(cache.get("b"))
+
+    def test_evicts_past_max_bytes(self):
+        value = {"payload": "x" * 1000}
+        size = len(json.dumps(value, separators=(",", ":")))
+        cache = DesignSystemCache(self.tmp, max_bytes=size * 2 + size // 2)
+        for i, name in enumerate(["a", "b", "c"]):
+            self._put(cache, name, value, age=i)
+        cache.put("d", value)
+        self.assertEqual(self._names(cache), ["c", "d"])
+
+    def test_unreadable_entries_and_directories_miss(self):
+        cache = DesignSystemCache(self.tmp)
+        cache._path("bad").write_text("{truncated", encoding='utf-8')
+        self.assertIsNone(cache.get("bad"))
+        self.assertIsNone(cache.get("missing"))
+
+        blocked = DesignSystemCache(self.tmp / "bad.json" / "cache")
+        blocked.put("key", {"name": "key"})
+        self.assertIsNone(blocked.get("key"))
+
+        self._put(cache, "a")
+        self.assertEqual(cache.clear(), 2)
+        self.assertEqual(self._names(cache), [])
+
+    def test_key_normalizes_query_and_separates_projects(self):
+        key = DesignSystemCache.key
+        self.assertEqual(key("Beauty  Spa ", version="v"), key("beauty spa", version="v"))
+        self.assertNotEqual(key("beauty spa", version="v"), key("beauty spa", "Serenity", version="v"))
+        self.assertNotEqual(key("beauty spa", version="v"), key("beauty spa", version="w"))
+
+    def test_data_change_invalidates_entries(self):
+        data_dir = self.tmp / "data"
+        shutil.copytree(design_system.DATA_DIR, data_dir)
+        with mock.patch.object(design_system, "DATA_DIR", data_dir), \
+                mock.patch.object(design_system, "DESIGN_CACHE_DIR", self.tmp / "cache"):
+            first = design_system.cached_generate("beauty spa")
+            with mock.patch.object(design_system, "DesignSystemGenerator",
+                                   side_effect=AssertionError("regenerated on a cache hit")):
+                # The default project name echoes the query as typed, even on a hit
+                self.assertEqual(design_system.cached_generate("Beauty Spa"), dict(first, project_name="BEAUTY SPA"))
+
+            with open(data_dir / design_system.CSV_CONFIG["style"]["file"], 'a', encoding='utf-8') as f:
+                f.write("\n")
+            with mock.patch.object(design_system, "DesignSystemGenerator",
+                                   wraps=design_system.DesignSystemGenerator) as generator:
+                self.assertEqual(design_system.cached_generate("beauty spa"), first)
+                self.assertEqual(generator.call_count, 1)
+            self.assertEqual(len(list((self.tmp / "cache").glob("*.json"))), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Storage tests for the search indexes: every layout must rank exactly like in-memory BM25,
+and the corpus manifest must be built from the rows an index build loads
+
+Run: python -m unittest discover -s .agent/.shared/ui-ux-pro-max/tests
+"""
+
+import csv
+import json
+import random
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import core
+
+QUERIES_PER_DOMAIN = 100
+K = 5
+
+
+def _text(row, search_cols):
+    return " ".join(str(row.get(col, "")) for col in search_cols)
+
+
+def _corpora():
+    """(domain, rows, search_cols) for every bundled domain CSV"""
+    for domain, config in core.CSV_CONFIG.items():
+        filepath = core.DATA_DIR / config["file"]
+        if filepath.exists():
+            yield domain, filepath, core._load_csv(filepath), config["search_cols"]
+
+
+def _queries(domain, rows, search_cols):
+    """Deterministic 1-3 term queries drawn from the corpus vocabulary, plus one that cannot match"""
+    vocabulary = sorted({token for row in rows for token in core.tokenize(_text(row, search_cols))})
+    rng = random.Random(domain)
+    queries = [" ".join(rng.sample(vocabulary, rng.randint(1, 3))) for _ in range(QUERIES_PER_DOMAIN)]
+    return queries + ["zzqx nonexistent"]
+
+
+def _reference(rows, search_cols):
+    bm25 = core.BM25()
+    bm25.fit([_text(row, search_cols) for row in rows])
+    return lambda query: [(idx, score) for idx, score in bm25.score(query) if score > 0][:K]
+
+
+class RankingAssertions:
+    def assertRanksLikeBm25(self, index, reference, queries, label):
+        mismatches = [query for query in queries
+                      if [(row_id, score) for row_id, score, _ in index.score(query, K)] != reference(query)]
+        self.assertEqual(mismatches, [], f"{label}: {len(mismatches)} of {len(queries)} queries rank differently")
+
+
+class PostingsTest(unittest.TestCase):
+    def test_round_trip(self):
+        rng = random.Random(0)
+        cases = [
+            [],
+            [(0, 1)],
+            [(5, 3), (6, 1), (200, 2)],
+            # Multi-byte doc-id deltas and a multi-byte count
+            [(i * 1000 + rng.randint(0, 999), rng.randint(1, 50)) for i in range(300)],
+            [(i, 1) for i in range(128)],
+            [(2 ** 40, 1), (2 ** 40 + 2 ** 21, 7)],
+        ]
+        for pairs in cases:
+            with self.subTest(count=len(pairs)):
+                self.assertEqual(list(core.decode_postings(core.encode_postings(pairs))), pairs)
+
+    def test_known_encoding(self):
+        # varint(count) + tf bytes + varint deltas: 300 = 0xAC 0x02
+        self.assertEqual(core.encode_postings([(1, 2), (301, 4)]), bytes([2, 2, 4, 1, 0xAC, 0x02]))
+
+    def test_tf_is_capped(self):
+        pairs = [(0, core.POSTING_TF_MAX + 100), (3, 1)]
+        self.assertEqual(list(core.decode_postings(core.encode_postings(pairs))), [(0, core.POSTING_TF_MAX), (3, 1)])
+
+
+class SegmentedIndexTest(RankingAssertions, unittest.TestCase):
+    def test_segments_rank_like_bm25(self):
+        for domain, _, rows, search_cols in _corpora():
+            with self.subTest(domain=domain):
+                reference = _reference(rows, search_cols)
+                queries = _queries(domain, rows, search_cols)
+                index = core.SegmentedIndex(search_cols, max_segments=len(rows))
+                for start in range(0, len(rows), 7):
+                    index.add_rows(rows[start:start + 7])
+                self.assertGreater(len(index.segments), 1)
+                self.assertRanksLikeBm25(index, reference, queries, f"{domain} segmented")
+
+                vectors = [index.term_vector(i) for i in range(len(rows))]
+                index.compact()
+                self.assertEqual(len(index.segments), 1)
+                self.assertRanksLikeBm25(index, reference, queries, f"{domain} compacted")
+                self.assertEqual([index.term_vector(i) for i in range(len(rows))], vectors)
+                for query in queries[:10]:
+                    self.assertEqual([row for _, _, row in index.score(query, K)],
+                                     [rows[idx] for idx, _ in reference(query)])
+
+    def test_background_merge(self):
+        _, _, rows, search_cols = next(_corpora())
+        index = core.SegmentedIndex(search_cols, max_segments=3)
+        for start in range(0, len(rows), 4):
+            index.add_rows(rows[start:start + 4])
+        deadline = time.monotonic() + 10
+        while len(index.segments) > 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertLessEqual(len(index.segments), 3)
+        self.assertEqual(index.N, len(rows))
+        self.assertEqual(sum(len(segment) for segment in index.segments), len(rows))
+
+
+class StreamingIndexTest(RankingAssertions, unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_spill_and_merge_ranks_like_bm25(self):
+        for domain, filepath, rows, search_cols in _corpora():
+            with self.subTest(domain=domain):
+                # Small chunks force several spill files through the k-way merge
+                index = core.build_streaming_index(filepath, search_cols, chunk_rows=16, spill_dir=self.tmp)
+                segment = index.segments[0]
+                self.assertIsInstance(segment, core.DiskSegment)
+                self.addCleanup(segment.close)
+                self.assertRanksLikeBm25(index, _reference(rows, search_cols), _queries(domain, rows, search_cols),
+                                         f"{domain} streaming")
+                self.assertEqual([segment.rows[i] for i in range(len(rows))], rows)
+                self.assertEqual(segment.end_offset, filepath.stat().st_size)
+
+    def test_quoted_multiline_rows_and_bom(self):
+        filepath = self.tmp / "pack.csv"
+        rows = [{"Name": f"row {i}", "Notes": f"line one\nline two, \"quoted\" {i}" if i % 3 else f"plain {i}"}
+                for i in range(40)]
+        with open(filepath, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=["Name", "Notes"])
+            writer.writeheader()
+            writer.writerows(rows)
+        index = core.build_streaming_index(filepath, chunk_rows=7, spill_dir=self.tmp)
+        self.addCleanup(index.segments[0].close)
+        self.assertEqual([index.segments[0].rows[i] for i in range(len(rows))], rows)
+        self.assertRanksLikeBm25(index, _reference(rows, ["Name", "Notes"]), ["quoted", "plain", "line two", "row"],
+                                 "multiline")
+
+    def test_streamed_pack_takes_appends(self):
+        filepath = self.tmp / "big.csv"
+        with open(filepath, 'w', encoding='utf-8', newline='') as f:
+            f.write("Title,Body\n" + "".join(f"item {i},alpha beta {i}\n" for i in range(50)))
+        with mock.patch.object(core, "PACKS_DIR", self.tmp), mock.patch.object(core, "PACK_STREAM_BYTES", 0), \
+                mock.patch.dict(core._PACK_INDEXES, clear=True):
+            base = core._get_pack("big").index.segments[0]
+            self.assertIsInstance(base, core.DiskSegment)
+            self.addCleanup(base.close)
+            with open(filepath, 'a', encoding='utf-8', newline='') as f:
+                f.write("appended,gamma delta\n")
+            result = core.search_pack("gamma", "big")
+            self.assertEqual((result["count"], result["results"][0]["Title"], result["ids"]), (1, "appended", [50]))
+            self.assertEqual(core.search_pack("alpha", "big", 100)["count"], 50)
+
+
+class ManifestTest(unittest.TestCase):
+    COLS = ["Name", "Notes"]
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        for patcher in (mock.patch.object(core, "MANIFEST_FILE", self.tmp / "manifest.json"),
+                        mock.patch.object(core, "_MANIFEST", None),
+                        mock.patch.object(core, "_MANIFEST_SAVE_FAILED", False),
+                        mock.patch.dict(core._INDEX_CACHE, clear=True),
+                        mock.patch.dict(core._BLOOMS, clear=True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.files = []
+        for i in range(3):
+            filepath = self.tmp / f"corpus{i}.csv"
+            with open(filepath, 'w', encoding='utf-8', newline='') as f:
+                f.write("Name,Notes\n" + "".join(f"item{i} {j},alpha beta{j}\n" for j in range(20)))
+            self.files.append(filepath)
+
+    def _rank(self, filepath, query):
+        return [row_id for row_id, _, _ in core._iter_ranked(filepath, self.COLS, self.COLS, query, K)]
+
+    def test_cold_start_parses_once(self):
+        filepath = self.files[0]
+        with mock.patch.object(core, "_load_csv", wraps=core._load_csv) as load:
+            self.assertEqual(len(self._rank(filepath, "alpha")), K)
+            self.assertEqual(load.call_count, 1)
+            _, entry = core._corpus_entry(filepath, self.COLS)
+            self.assertEqual(load.call_count, 1)
+        rows = core._load_csv(filepath)
+        self.assertEqual((entry["rows"], entry["df"]["alpha"], entry["df"]["beta3"], entry["title_df"]["item0"]),
+                         (len(rows), 20, 1, 20))
+
+    def test_bloom_skips_non_matching_corpus(self):
+        filepath = self.files[0]
+        self._rank(filepath, "alpha")
+        core._INDEX_CACHE.clear()
+        with mock.patch.object(core, "_get_index", side_effect=AssertionError("index loaded")):
+            self.assertEqual(self._rank(filepath, "zzqx nonexistent"), [])
+        self.assertEqual(len(self._rank(filepath, "beta7 nonexistent")), 1)
+
+    def test_batch_writes_manifest_once(self):
+        with mock.patch.object(core, "_save_manifest", wraps=core._save_manifest) as save:
+            with core.manifest_batch():
+                for filepath in self.files:
+                    core._get_index(filepath, self.COLS)
+                self.assertEqual(save.call_count, 0)
+            self.assertEqual(save.call_count, 1)
+            core._get_index(self.files[0], self.COLS)
+            self.assertEqual(save.call_count, 1)
+        with open(core.MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            saved = json.load(f)["corpora"]
+        self.assertEqual(sorted(saved), sorted(core._corpus_key(filepath, self.COLS) for filepath in self.files))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for persisted design systems: which pages a persist rewrites, the .sources.json
+sidecar records, hand-edited files, and --refresh over stale and broken projects
+
+Run: python -m unittest discover -s .agent/.shared/ui-ux-pro-max/tests
+"""
+
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import design_system
+from design_system import SOURCES_MANIFEST, generate_with_sources, persist_design_system, refresh_design_systems
+
+PROJECT = "Serenity"
+
+
+class PersistTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.out = Path(tmp.name)
+        patcher = mock.patch.object(design_system, "DESIGN_CACHE_DIR", self.out / "cache")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.project = self.out / "design-system" / PROJECT.lower()
+
+    def _persist(self, query, pages=(), **kwargs):
+        generated, sources = generate_with_sources(query, PROJECT)
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            result = persist_design_system(generated, None, str(self.out), query, list(pages), sources, **kwargs)
+        return result, stderr.getvalue()
+
+    def _sidecar(self):
+        with open(self.project / SOURCES_MANIFEST, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_sidecar(self, sidecar):
+        with open(self.project / SOURCES_MANIFEST, 'w', encoding='utf-8') as f:
+            json.dump(sidecar, f)
+
+    def _page(self, name):
+        return (self.project / "pages" / f"{name}.md").read_text(encoding='utf-8')
+
+    def _refresh(self):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            reports = list(refresh_design_systems(str(self.out), workers=1))
+        return reports, stderr.getvalue()
+
+    def test_plain_persist_leaves_earlier_pages_and_their_records(self):
+        self._persist("beauty spa", ["dashboard", "checkout"])
+        pages = {name: self._page(name) for name in ("dashboard", "checkout")}
+        records = self._sidecar()["pages"]
+
+        result, _ = self._persist("luxury wellness retreat")
+        self.assertEqual(result["created_files"], [str(self.project / "MASTER.md")])
+        self.assertEqual({name: self._page(name) for name in pages}, pages)
+        sidecar = self._sidecar()
+        self.assertEqual(sidecar["query"], "luxury wellness retreat")
+        self.assertEqual(sidecar["pages"], records)
+        self.assertEqual({entry["query"] for entry in records.values()}, {"beauty spa"})
+
+        self._persist("luxury wellness retreat", ["settings"])
+        self.assertEqual({name: entry["query"] for name, entry in self._sidecar()["pages"].items()},
+                         {"dashboard": "beauty spa", "checkout": "beauty spa", "settings": "luxury wellness retreat"})
+
+    def test_edited_file_is_skipped_with_a_warning(self):
+        self._persist("beauty spa", ["dashboard"])
+        record = self._sidecar()["pages"]["dashboard"]
+        edited = self._page("dashboard") + "\nHand-written note\n"
+        (self.project / "pages" / "dashboard.md").write_text(edited, encoding='utf-8')
+
+        result, warning = self._persist("luxury wellness retreat", ["dashboard"])
+        path = str(self.project / "pages" / "dashboard.md")
+        self.assertEqual(result["skipped_files"], [path])
+        self.assertNotIn(path, result["created_files"])
+        self.assertIn(path, warning)
+        self.assertEqual(self._page("dashboard"), edited)
+        self.assertEqual(self._sidecar()["pages"]["dashboard"], record)
+
+    def test_refresh_rebuilds_only_stale_pages_from_their_own_query(self):
+        self._persist("beauty spa", ["dashboard", "checkout"])
+        self._persist("luxury wellness retreat")
+        master = (self.project / "MASTER.md").stat().st_mtime_ns
+        sidecar = self._sidecar()
+        dashboard = sidecar["pages"]["dashboard"]
+        files = sidecar["pages"]["checkout"]["files"]
+        name = next(name for name, entry in files.items() if entry["rows"])
+        files[name].update(sha256="stale", rows_sha256="stale")
+        self._write_sidecar(sidecar)
+        (self.project / "pages" / "checkout.md").unlink()
+
+        reports, _ = self._refresh()
+        self.assertEqual(reports, [{"project": PROJECT.lower(), "query": "luxury wellness retreat",
+                                    "status": "refreshed", "written": [str(self.project / "pages" / "checkout.md")]}])
+        self.assertEqual((self.project / "MASTER.md").stat().st_mtime_ns, master)
+        refreshed = self._sidecar()["pages"]
+        self.assertEqual((refreshed["checkout"]["query"], refreshed["dashboard"]), ("beauty spa", dashboard))
+        self.assertEqual(self._refresh()[0][0]["status"], "fresh")
+
+    def test_refresh_reports_stale_edited_pages(self):
+        self._persist("beauty spa", ["dashboard"])
+        sidecar = self._sidecar()
+        for entry in sidecar["pages"]["dashboard"]["files"].values():
+            if entry["rows"] is not None:
+                entry["sha256"] = "stale"
+        self._write_sidecar(sidecar)
+        (self.project / "pages" / "dashboard.md").write_text("Hand-written page\n", encoding='utf-8')
+
+        # Rows are unchanged, so only the digests move on and the edit is never touched
+        self.assertEqual([self._refresh()[0][0]["status"] for _ in range(2)], ["unchanged", "fresh"])
+        self.assertEqual(self._page("dashboard"), "Hand-written page\n")
+
+        sidecar = self._sidecar()
+        for entry in sidecar["pages"]["dashboard"]["files"].values():
+            if entry["rows"]:
+                entry.update(sha256="stale", rows_sha256="stale")
+        self._write_sidecar(sidecar)
+        path = str(self.project / "pages" / "dashboard.md")
+        for _ in range(2):
+            (report,), warning = self._refresh()
+            self.assertEqual((report["status"], report["skipped"]), ("refreshed", [path]))
+            self.assertIn(path, warning)
+
+    def test_bad_sidecars_are_reported_per_project(self):
+        self._persist("beauty spa")
+        root = self.out / "design-system"
+        sidecar = self._sidecar()
+        invalid = [("a-legacy", dict(sidecar, version=1)), ("b-pages-list", dict(sidecar, pages=["dashboard"])),
+                   ("c-not-json", None), ("d-no-sidecar", False),
+                   ("e-bad-file", dict(sidecar, files={"bad\0name.csv": {"sha256": "x"}}))]
+        for name, content in invalid:
+            (root / name).mkdir()
+            if content is None:
+                (root / name / SOURCES_MANIFEST).write_text("{", encoding='utf-8')
+            elif content:
+                (root / name / SOURCES_MANIFEST).write_text(json.dumps(content), encoding='utf-8')
+
+        reports = {report["project"]: report for report in self._refresh()[0]}
+        self.assertEqual({name: report["status"] for name, report in reports.items()},
+                         {"a-legacy": "skipped", "b-pages-list": "skipped", "c-not-json": "skipped",
+                          "d-no-sidecar": "skipped", "e-bad-file": "error", PROJECT.lower(): "fresh"})
+        self.assertIn("ValueError", reports["e-bad-file"]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stress test for index hot-swap: searches racing reload_indexes() must keep returning
+exactly what they returned before the run
+
+Run: python -m unittest discover -s .agent/.shared/ui-ux-pro-max/tests
+"""
+
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import core
+
+READERS = 8
+ROUNDS = 15
+# Readers keep going until this many full reloads have swapped every index under them
+MIN_RELOADS = 5
+
+# (function, args, kwargs); snippets and highlighting exercise the cached offsets too
+CALLS = [
+    (core.search, ("glassmorphism", "style", 3), {}),
+    (core.search, ("dark mode",), {"snippet_window": 60, "highlight": True}),
+    (core.search, ("saas dashboard", "product", 5), {}),
+    (core.search, ("pie chart trend", "chart", 3), {"snippet_window": 40}),
+    (core.search, ("font pairing serif", "typography", 3), {}),
+    (core.search, ("accessibility keyboard", "ux", 5), {"dedup": True}),
+    (core.search, ("xyzzy nothing", "style"), {}),
+    (core.search_stack, ("form validation", "react", 3), {}),
+    (core.search_stack, ("image optimization", "nextjs", 3), {"highlight": True, "snippet_window": 50}),
+    (core.search_stack, ("state management", "vue", 3), {}),
+]
+
+
+class ReloadStressTest(unittest.TestCase):
+    def test_searches_during_reloads_match_baseline(self):
+        baseline = [function(*args, **kwargs) for function, args, kwargs in CALLS]
+        self.assertTrue(any(result.get("count") for result in baseline))
+
+        done = threading.Event()
+        lock = threading.Lock()
+        mismatches = []
+        errors = []
+        reloads = []
+
+        def reader(offset):
+            try:
+                rounds = 0
+                while (rounds < ROUNDS or len(reloads) < MIN_RELOADS) and not errors:
+                    rounds += 1
+                    for i in range(len(CALLS)):
+                        j = (i + offset) % len(CALLS)
+                        function, args, kwargs = CALLS[j]
+                        result = function(*args, **kwargs)
+                        if result != baseline[j]:
+                            with lock:
+                                mismatches.append((function.__name__, args, kwargs))
+            except Exception as exc:
+                with lock:
+                    errors.append(repr(exc))
+
+        def reloader():
+            try:
+                while not done.is_set():
+                    reloads.append(core.reload_indexes())
+            except Exception as exc:
+                with lock:
+                    errors.append(repr(exc))
+
+        before = dict(core._INDEX_CACHE)
+        readers = [threading.Thread(target=reader, args=(i,)) for i in range(READERS)]
+        swapper = threading.Thread(target=reloader)
+        swapper.start()
+        for thread in readers:
+            thread.start()
+        for thread in readers:
+            thread.join()
+        done.set()
+        swapper.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(mismatches, [])
+        self.assertGreaterEqual(len(reloads), MIN_RELOADS)
+        self.assertTrue(all(reloaded >= len(before) for reloaded in reloads))
+        self.assertTrue(all(core._INDEX_CACHE[key] is not snapshot for key, snapshot in before.items()))
+
+
+if __name__ == "__main__":
+    unittest.main()
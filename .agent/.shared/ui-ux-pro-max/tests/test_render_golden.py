@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Golden tests for the compiled streaming renderer (ascii box, markdown, MASTER.md)
+
+Run: python -m unittest discover -s .agent/.shared/ui-ux-pro-max/tests
+Regenerate fixtures after an intended output or data change: UIPRO_UPDATE_GOLDEN=1 (same command)
+"""
+
+import io
+import os
+import re
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from design_system import (DesignSystemGenerator, format_ascii_box, format_markdown, format_master_md,
+                           render_design_system)
+
+GOLDEN_DIR = Path(__file__).resolve().parent / "golden"
+UPDATE_ENV = "UIPRO_UPDATE_GOLDEN"
+
+# (fixture name, query, project name)
+GOLDEN_QUERIES = [
+    ("beauty-spa", "beauty spa wellness service", "Serenity Spa"),
+    ("fintech-crypto", "fintech crypto dashboard", None),
+    ("saas-analytics", "saas analytics", "Metrics Hub"),
+    ("luxury-ecommerce", "e-commerce luxury fashion", None),
+    ("healthcare", "healthcare app", "Care Plus"),
+    ("kids-education", "kids education playful", None),
+    ("no-match", "xyzzy nothing", None),
+]
+
+# Data-independent inputs: missing sections, and every optional field with long text to wrap
+SYNTHETIC = {
+    "empty": {},
+    "full": {
+        "project_name": "Synthetic",
+        "category": "Test",
+        "pattern": {"name": "Pattern", "conversion": "Convert", "cta_placement": "Above fold",
+                    "sections": "Hero > Features > CTA"},
+        "style": {"name": "S" * 200, "keywords": "alpha, beta", "best_for": "Tests", "performance": "Fast",
+                  "accessibility": "AA"},
+        "colors": {"primary": "#000000", "notes": "Notes"},
+        "typography": {"mood": "Calm", "google_fonts_url": "https://fonts.example", "css_import": "@import x;"},
+        "key_effects": "effect " * 40,
+        "anti_patterns": "first + second + + third",
+        "decision_rules": {"if": "then"},
+        "severity": "HIGH"
+    }
+}
+
+FORMATS = [
+    ("ascii", "txt", format_ascii_box),
+    ("markdown", "md", format_markdown),
+    ("master", "master.md", format_master_md),
+]
+
+_TIMESTAMP = re.compile(r"^(\*\*Generated:\*\*) .*$", re.MULTILINE)
+
+
+def _mask(text):
+    return _TIMESTAMP.sub(r"\1 <timestamp>", text)
+
+
+def _cases():
+    generator = DesignSystemGenerator()
+    for name, query, project_name in GOLDEN_QUERIES:
+        yield name, generator.generate(query, project_name)
+    yield from SYNTHETIC.items()
+
+
+class RenderGoldenTest(unittest.TestCase):
+    maxDiff = None
+
+    def test_output_matches_golden(self):
+        update = bool(os.environ.get(UPDATE_ENV))
+        for name, design_system in _cases():
+            for output_format, suffix, formatter in FORMATS:
+                path = GOLDEN_DIR / f"{name}.{suffix}"
+                with self.subTest(fixture=path.name):
+                    rendered = _mask(formatter(design_system))
+                    stream = io.StringIO()
+                    render_design_system(design_system, stream, output_format)
+                    self.assertEqual(_mask(stream.getvalue()), rendered)
+                    if update:
+                        GOLDEN_DIR.mkdir(exist_ok=True)
+                        path.write_bytes(rendered.encode('utf-8'))
+                    self.assertEqual(rendered.encode('utf-8'), path.read_bytes())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Regression table for auto-domain routing (core.route_domains / detect_domain)
+
+Run: python -m unittest discover -s .agent/.shared/ui-ux-pro-max/tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import core
+
+# Canonical query -> domain the router must pick
+ROUTING_CASES = [
+    ("glassmorphism", "style"),
+    ("minimalism", "style"),
+    ("neumorphism", "style"),
+    ("brutalism", "style"),
+    ("dark mode", "style"),
+    ("aurora gradient", "style"),
+    ("saas", "product"),
+    ("crypto", "product"),
+    ("fintech banking", "product"),
+    ("healthcare clinic", "product"),
+    ("ecommerce store", "product"),
+    ("#ff0000 hex", "color"),
+    ("color palette", "color"),
+    ("rgb brand", "color"),
+    ("pie chart", "chart"),
+    ("trend visualization", "chart"),
+    ("hero section", "landing"),
+    ("pricing testimonial", "landing"),
+    ("tailwind prompt", "prompt"),
+    ("css variable", "prompt"),
+    ("font pairing", "typography"),
+    ("serif heading", "typography"),
+    ("svg icon", "icons"),
+    ("lucide icons", "icons"),
+    ("react suspense waterfall", "react"),
+    ("useeffect rerender", "react"),
+    ("autocomplete form input", "web"),
+    ("aria focus outline", "web"),
+    ("scroll animation mobile", "ux"),
+    ("keyboard navigation accessibility", "ux"),
+]
+
+
+class RoutingTest(unittest.TestCase):
+    def test_canonical_queries(self):
+        for query, domain in ROUTING_CASES:
+            with self.subTest(query=query):
+                self.assertEqual(core.detect_domain(query), domain)
+
+    def test_search_uses_routed_domain(self):
+        for query, domain in ROUTING_CASES:
+            with self.subTest(query=query):
+                self.assertEqual(core.search(query)["domain"], domain)
+
+    def test_keyword_routing_without_persisted_manifest(self):
+        # A read-only DATA_DIR without fresh manifest entries must not parse the CSVs to route
+        with mock.patch.object(core, "_manifest_persists", return_value=False), \
+                mock.patch.object(core, "_MANIFEST", {}), \
+                mock.patch.object(core, "_load_csv", side_effect=AssertionError("CSV parsed while routing")):
+            for query, domain in ROUTING_CASES:
+                with self.subTest(query=query):
+                    self.assertEqual(core.detect_domain(query), domain)
+            self.assertEqual(core.route_domains("xyzzy"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+End-to-end tests for the JSON search server: pipelining, keep-alive, parameter errors
+and max_inflight backpressure, against a SearchServer bound to an ephemeral port
+
+Run: python -m unittest discover -s .agent/.shared/ui-ux-pro-max/tests
+"""
+
+import asyncio
+import json
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import core
+import design_system
+import server
+
+TIMEOUT_S = 30
+
+
+class _Running:
+    """A SearchServer serving from its own event loop thread"""
+
+    def __init__(self, **kwargs):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.server = server.SearchServer(port=0, **kwargs)
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result(TIMEOUT_S)
+
+    def connect(self):
+        return socket.create_connection(("127.0.0.1", self.server.port), timeout=TIMEOUT_S)
+
+    async def _shutdown(self):
+        await self.server.close()
+        # Connection handlers outlive the listening socket; let them see their clients' EOF
+        handlers = asyncio.all_tasks() - {asyncio.current_task()}
+        if handlers:
+            await asyncio.wait(handlers, timeout=TIMEOUT_S)
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(TIMEOUT_S * 2)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(TIMEOUT_S)
+        self.loop.close()
+
+
+def _request(method, path, body=None, close=False):
+    payload = json.dumps(body).encode('utf-8') if body is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(payload)}\r\n"
+    if close:
+        head += "Connection: close\r\n"
+    return head.encode('latin-1') + b"\r\n" + payload
+
+
+def _read_response(stream):
+    """(status, headers, parsed JSON body) of the next response on a socket file"""
+    status_line = stream.readline().decode('latin-1')
+    if not status_line:
+        return None
+    headers = {}
+    for line in iter(stream.readline, b"\r\n"):
+        name, _, value = line.decode('latin-1').partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = stream.read(int(headers["content-length"]))
+    return int(status_line.split(" ")[1]), headers, json.loads(body)
+
+
+def _expected(result):
+    return json.loads(json.dumps(result, ensure_ascii=False))
+
+
+class ServerTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(design_system, "DESIGN_CACHE_DIR", Path(tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _start(self, **kwargs):
+        running = _Running(**kwargs)
+        self.addCleanup(running.close)
+        return running
+
+    def test_pipelined_responses_in_request_order(self):
+        running = self._start()
+        requests = [
+            (_request("GET", "/search?q=glassmorphism&n=2"),
+             200, _expected(core.search("glassmorphism", None, 2))),
+            (_request("POST", "/search/stack", {"q": "form validation", "stack": "react", "n": 3}),
+             200, _expected(core.search_stack("form validation", "react", 3))),
+            (_request("POST", "/search", {"q": "pie chart", "domain": "chart", "n": 1}),
+             200, _expected(core.search("pie chart", "chart", 1))),
+            (_request("POST", "/design-system", {"q": "beauty spa", "project": "Serenity"}),
+             200, _expected(design_system.cached_generate("beauty spa", "Serenity"))),
+            (_request("POST", "/design-system", {"q": "beauty spa", "project": "Serenity", "format": "markdown"}),
+             200, {"format": "markdown",
+                   "output": design_system.format_markdown(design_system.cached_generate("beauty spa", "Serenity"))}),
+            (_request("GET", "/search?q=glass&n=0"), 400, {"error": "n must be between 1 and 50"}),
+            (_request("GET", "/search?q=glass&n=x"), 400, {"error": "n must be an integer"}),
+            (_request("POST", "/search", {"q": "glass", "n": True}), 400, {"error": "n must be an integer"}),
+            (_request("POST", "/search", {"q": "glass", "n": 2.5}), 400, {"error": "n must be an integer"}),
+            (_request("POST", "/search", {"q": ["glass"]}), 400, {"error": "q must be a string"}),
+            (_request("GET", "/nope"), 404,
+             {"error": f"Unknown endpoint: /nope. Available: {', '.join(server.ROUTES)}"}),
+            (_request("GET", "/search?q=dark+mode&n=1", close=True),
+             200, _expected(core.search("dark mode", None, 1))),
+        ]
+        with running.connect() as sock, sock.makefile('rb') as stream:
+            sock.sendall(b"".join(request for request, _, _ in requests))
+            for i, (_, status, body) in enumerate(requests):
+                with self.subTest(request=i):
+                    response = _read_response(stream)
+                    self.assertIsNotNone(response)
+                    self.assertEqual((response[0], response[2]), (status, body))
+                    last = i == len(requests) - 1
+                    self.assertEqual(response[1]["connection"], "close" if last else "keep-alive")
+            self.assertIsNone(_read_response(stream))
+
+    def test_keep_alive_serves_sequential_requests(self):
+        running = self._start()
+        with running.connect() as sock, sock.makefile('rb') as stream:
+            for query in ("glassmorphism", "saas", "serif"):
+                sock.sendall(_request("GET", f"/search?q={query}&n=1"))
+                status, headers, body = _read_response(stream)
+                self.assertEqual((status, headers["connection"]), (200, "keep-alive"))
+                self.assertEqual(body, _expected(core.search(query, None, 1)))
+
+    def test_max_inflight_bounds_concurrent_handlers(self):
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def slow(params):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.1)
+            with lock:
+                state["active"] -= 1
+            return {"id": params["id"]}
+
+        with mock.patch.dict(server.ROUTES, {"/slow": slow}):
+            running = self._start(workers=8, max_inflight=2)
+            results = {}
+
+            def client(i):
+                with running.connect() as sock, sock.makefile('rb') as stream:
+                    sock.sendall(_request("GET", f"/slow?id={i}", close=True))
+                    results[i] = _read_response(stream)
+
+            clients = [threading.Thread(target=client, args=(i,)) for i in range(6)]
+            for thread in clients:
+                thread.start()
+            for thread in clients:
+                thread.join(TIMEOUT_S)
+
+        self.assertEqual({i: (status, body) for i, (status, _, body) in results.items()},
+                         {i: (200, {"id": str(i)}) for i in range(6)})
+        self.assertEqual(state["peak"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()